@@ -0,0 +1,297 @@
+"""
+End-to-end benchmark on a synthetic workload (pipeline/synth.py) with the local DuckDB engine.
+
+Stages timed:
+    generate   writing the GH Archive files (skipped when the workdir already has the same workload)
+    parse      streaming ingester over the last day's hour files (pipeline/ingest.py)
+    extract    raw events for the whole range, one wildcard query
+    transform  every model; `aggregation` (staging + daily_repo_activity) and `baseline_scoring`
+               (rolling baseline state + trending_repos_daily) are broken out of it
+    numpy_scoring
+               pipeline.scoring over the same activity (scoring only, the load is not timed)
+    alerts     compute for every burst date
+    api        latency of each endpoint, with the response cache disabled
+
+Serialization CPU per 1,000 API rows, before and after the columnar / fast JSON path, is reported
+separately (benchmarks/serialization.py), and so is the cold start of the API and the daily job
+(benchmarks/startup.py).
+
+The planted trending repos double as a correctness check: each must rank in the top --top of
+trending_repos_daily on its burst date, or the run exits with status 1.
+
+Results are written to JSON (default local/bench/<timestamp>-<commit>.json); --compare prints the
+change against an earlier result file.
+
+    python -m benchmarks.run --events-per-day 100000 --days 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+import urllib.request
+from dataclasses import asdict
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from benchmarks.serialization import bench_serialization
+from benchmarks.startup import bench_startup
+from pipeline.synth import SynthConfig, generate, planted_repos
+
+ENDPOINTS = ["/trending/repos?limit=50", "/trending/languages?limit=20", "/alerts?limit=50", "/summary"]
+
+TOP_REPOS_SQL = """
+SELECT n.repo_name
+FROM `${MART_DATASET}.trending_repos_daily` t
+JOIN `${STG_DATASET}.repo_names` n ON t.repo_id = n.repo_id
+WHERE t.event_date = DATE(@date)
+ORDER BY t.trend_score DESC
+LIMIT @top
+"""
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def timed(stages: dict[str, dict], name: str, fn: Callable[[], Any], events: int | None = None) -> Any:
+    print(f"\n== {name}")
+    started = time.perf_counter()
+    value = fn()
+    seconds = time.perf_counter() - started
+    stages[name] = {"seconds": round(seconds, 4)}
+    if events is not None:
+        stages[name]["events_per_s"] = round(events / seconds) if seconds else None
+    print(f"== {name}: {seconds:.2f}s")
+    return value
+
+
+def step_seconds(results: list, steps: list[str]) -> float:
+    return sum(r.wall_ms for r in results if r.step in steps) / 1000
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def bench_api(day: date, requests: int) -> dict[str, dict]:
+    """Start the API in a thread and time `requests` calls of every endpoint."""
+    import uvicorn
+
+    from pipeline.serve import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    out = {}
+    try:
+        for endpoint in ENDPOINTS:
+            url = f"http://127.0.0.1:{port}{endpoint}{'&' if '?' in endpoint else '?'}date={day.isoformat()}"
+            latencies = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                with urllib.request.urlopen(url) as response:
+                    response.read()
+                latencies.append((time.perf_counter() - started) * 1000)
+            out[endpoint.split("?")[0]] = {
+                "p50_ms": round(percentile(latencies, 0.5), 2),
+                "p95_ms": round(percentile(latencies, 0.95), 2),
+                "max_ms": round(max(latencies), 2),
+            }
+            print(f" - {endpoint}: p50 {out[endpoint.split('?')[0]]['p50_ms']} ms")
+    finally:
+        server.should_exit = True
+        thread.join()
+    return out
+
+
+def compare(previous: dict, current: dict) -> None:
+    print(f"\nCompared with {previous.get('commit')} ({previous.get('created_at')}):")
+    for name, stage in current["stages"].items():
+        before = previous.get("stages", {}).get(name, {}).get("seconds")
+        if not before or "seconds" not in stage:
+            continue
+        print(f" - {name}: {before:.2f}s -> {stage['seconds']:.2f}s ({stage['seconds'] / before - 1:+.0%})")
+    for table, stats in current.get("serialization", {}).items():
+        if not isinstance(stats, dict):
+            continue
+        before = previous.get("serialization", {}).get(table, {}).get("after", {}).get("total")
+        if before:
+            after = stats["after"]["total"]
+            print(f" - serialization {table}: {before} -> {after} ms CPU per 1k rows ({after / before - 1:+.0%})")
+    for target, stats in current.get("startup", {}).items():
+        key = "cold_start_ms" if "cold_start_ms" in stats else "import_ms"
+        before = previous.get("startup", {}).get(target, {}).get(key)
+        if before:
+            print(f" - startup {target} {key}: {before} -> {stats[key]} ms ({stats[key] / before - 1:+.0%})")
+    for endpoint, stats in current.get("api", {}).items():
+        before = previous.get("api", {}).get(endpoint, {}).get("p50_ms")
+        if before:
+            print(f" - api {endpoint}: p50 {before} -> {stats['p50_ms']} ms ({stats['p50_ms'] / before - 1:+.0%})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workdir", default="local/bench/work", help="Synthetic data and DuckDB file go here.")
+    parser.add_argument("--output", help="Result JSON (default: local/bench/<timestamp>-<commit>.json).")
+    parser.add_argument("--compare", help="Earlier result JSON to compare with.")
+    parser.add_argument("--from", dest="date_from", default="2025-10-01", help="First synthetic day.")
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--events-per-day", type=int, default=100_000)
+    parser.add_argument("--trending", type=int, default=5, help="Planted trending repos.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--top", type=int, default=10, help="Rank a planted repo must reach on its burst date.")
+    parser.add_argument("--jobs", type=int, default=4, help="Concurrent transform/compute jobs.")
+    parser.add_argument("--api-requests", type=int, default=20, help="Requests per endpoint.")
+    args = parser.parse_args()
+
+    config = SynthConfig(
+        seed=args.seed,
+        start=date.fromisoformat(args.date_from),
+        days=args.days,
+        events_per_day=args.events_per_day,
+        trending=args.trending,
+    )
+    workdir = Path(args.workdir)
+    data_dir = workdir / "data"
+    db_path = workdir / "bench.duckdb"
+    # Settings are read from the environment; point them at the benchmark's own files
+    os.environ.update({
+        "PIPELINE_ENGINE": "duckdb",
+        "LOCAL_DB_PATH": str(db_path),
+        "LOCAL_DATA_DIR": str(data_dir),
+        "RUN_MANIFEST_DIR": str(workdir / "runs"),
+        "REPO_CACHE_PATH": str(workdir / "repo_cache.sqlite"),
+        "RECORD_RUNS": "false",
+        "SNAPSHOT_DIR": "",
+        "API_URL": "",
+        "CACHE_MAX_ENTRIES": "0",
+    })
+
+    from pipeline.bq import BQQueryRunner
+    from pipeline.compute import compute_date
+    from pipeline.config import Settings
+    from pipeline.extract import extract_range
+    from pipeline.ingest import aggregate_files, hour_files
+    from pipeline.scoring import load_activity, score_activity
+    from pipeline.setup import run_setup
+    from pipeline.transform import run_transform
+
+    stages: dict[str, dict] = {}
+    total_events = config.days * config.events_per_day
+    synth_file = data_dir / "synth.json"
+    expected = json.loads(json.dumps({"config": asdict(config)}, default=str))["config"]
+    if synth_file.exists() and json.loads(synth_file.read_text(encoding="utf-8"))["config"] == expected:
+        print(f"Reusing the synthetic workload in {data_dir}")
+        stages["generate"] = {"reused": True}
+    else:
+        timed(stages, "generate", lambda: generate(config, data_dir), events=total_events)
+
+    last_day = config.dates[-1].isoformat()
+    counters = timed(
+        stages, "parse",
+        lambda: aggregate_files(hour_files(data_dir / "day", last_day), last_day, workers=1),
+        events=config.events_per_day,
+    )
+    stages["parse"]["repos"] = len(counters)
+
+    db_path.unlink(missing_ok=True)
+    settings = Settings.load()
+    bq = BQQueryRunner(settings)
+    timed(stages, "setup", lambda: run_setup(bq, settings))
+    first, last = config.dates[0], config.dates[-1]
+    timed(stages, "extract", lambda: extract_range(bq, settings, first, last), events=total_events)
+
+    before = len(bq.results)
+    timed(stages, "transform", lambda: run_transform(bq, settings, first, last, jobs=args.jobs), events=total_events)
+    transform_results = bq.results[before:]
+    stages["aggregation"] = {"seconds": step_seconds(
+        transform_results, ["10_staging/stg_github_events.sql", "20_models/daily_repo_activity.sql"]
+    )}
+    stages["baseline_scoring"] = {"seconds": step_seconds(
+        transform_results, ["20_models/repo_baseline_state.sql", "30_marts/00_trending_repos_daily.sql"]
+    )}
+
+    activity = load_activity(bq, first, last, settings.lookback_days)
+    timed(stages, "numpy_scoring", lambda: score_activity(
+        activity, first, last, settings.lookback_days, settings.trend_weights, settings.min_events_threshold
+    ))
+    repo_days = len(activity.day)
+    stages["numpy_scoring"]["repo_days"] = repo_days
+    seconds = stages["numpy_scoring"]["seconds"]
+    stages["numpy_scoring"]["repo_days_per_s"] = round(repo_days / seconds) if seconds else None
+
+    planted = planted_repos(config)
+    burst_dates = sorted({p.burst_date for p in planted})
+    timed(stages, "alerts", lambda: [compute_date(bq, settings, d.isoformat(), args.jobs) for d in burst_dates])
+    stages["alerts"]["dates"] = len(burst_dates)
+
+    missing = []
+    for p in planted:
+        top = [r["repo_name"] for r in bq.query(TOP_REPOS_SQL, params={"date": p.burst_date.isoformat(), "top": args.top})]
+        if p.repo_name not in top:
+            missing.append(asdict(p))
+    checks = {"planted": len(planted), "top": args.top, "missing": missing, "ok": not missing}
+
+    print("\n== serialization (ms CPU per 1,000 rows, before -> after)")
+    serialization = bench_serialization(bq, first.isoformat(), last.isoformat())
+
+    # The API opens the database itself
+    bq.engine.con.close()
+    print(f"\n== api ({args.api_requests} requests per endpoint, {last_day})")
+    api = bench_api(config.dates[-1], args.api_requests)
+
+    # The API's engine still holds the database in this process; the fresh interpreters open it
+    import pipeline.serve
+
+    pipeline.serve.bq_runner.engine.con.close()
+    print("\n== startup (fresh interpreters)")
+    startup = bench_startup(last_day)
+
+    result = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "workload": {**expected, "total_events": total_events},
+        "stages": stages,
+        "api": api,
+        "serialization": serialization,
+        "startup": startup,
+        "checks": checks,
+    }
+    output = Path(args.output or f"local/bench/{datetime.now():%Y%m%dT%H%M%S}-{result['commit']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, default=str), encoding="utf-8")
+    print(f"\nResults: {output}")
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text(encoding="utf-8")), result)
+
+    if missing:
+        print(f"\nCHECK FAILED: {len(missing)} planted trending repos are not in the top {args.top}:")
+        for p in missing:
+            print(f" - {p['repo_name']} on {p['burst_date']}")
+        raise SystemExit(1)
+    print(f"\nCheck OK: all {len(planted)} planted trending repos are in the top {args.top} on their burst date.")
+
+
+if __name__ == "__main__":
+    main()
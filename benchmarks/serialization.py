@@ -0,0 +1,110 @@
+"""
+CPU spent turning mart rows into API response bytes, per 1,000 rows, on the old and the new path.
+
+    before  rows fetched as tuples and zipped into dicts, then what FastAPI does for a response_model:
+            pydantic validation, a JSON-mode dump and json.dumps
+    after   rows fetched as an Arrow table and decoded column by column, then pipeline.encoding.dumps
+
+`fetch` includes running the query, which is the same on both paths. The rows are the API columns
+of trending_repos_enriched, trending_languages_daily and alerts_daily for a whole date range, read
+with one query per table, so the numbers do not depend on an endpoint's limit. benchmarks/run.py
+runs this on its database; on its own:
+
+    python -m benchmarks.serialization --from 2025-10-01 --to 2025-10-20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Callable
+
+from pydantic import BaseModel, TypeAdapter
+
+from pipeline.api_models import AlertItem, TrendingLanguage, TrendingRepo
+from pipeline.encoding import dumps, orjson
+from pipeline.snapshot import SNAPSHOT_QUERIES
+
+TABLES: dict[str, tuple[str, type[BaseModel]]] = {
+    # The snapshot queries select what the endpoints return, in the same order
+    name: (
+        SNAPSHOT_QUERIES[query].replace(
+            "event_date = DATE(@date)", "event_date BETWEEN DATE(@date_from) AND DATE(@date_to)"
+        ),
+        model,
+    )
+    for name, query, model in [
+        ("trending_repos", "repos", TrendingRepo),
+        ("trending_languages", "languages", TrendingLanguage),
+        ("alerts", "alerts", AlertItem),
+    ]
+}
+
+
+def cpu_ms(fn: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    """Process CPU milliseconds of one fn() call (best of repeat), and its value."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        value = fn()
+        best = min(best, (time.process_time() - started) * 1000)
+    return best, value
+
+
+def _fastapi_encode(adapter: TypeAdapter, rows: list[dict]) -> bytes:
+    # fastapi.routing.serialize_response, then JSONResponse.render
+    content = adapter.dump_python(adapter.validate_python(rows), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def bench_serialization(bq, date_from: str, date_to: str, repeat: int = 5) -> dict[str, Any]:
+    """ms of CPU per 1,000 rows for each table and path; see the module docstring."""
+    out: dict[str, Any] = {"encoder": "orjson" if orjson is not None else "json"}
+    for name, (sql, model) in TABLES.items():
+        adapter = TypeAdapter(list[model])
+
+        def fetch(columnar: bool) -> list[dict]:
+            job = bq.submit_query(sql, params={"date_from": date_from, "date_to": date_to})
+            return job.arrow().to_pylist() if columnar else job.result()
+
+        fetch_before, rows = cpu_ms(lambda: fetch(False), repeat)
+        fetch_after, _ = cpu_ms(lambda: fetch(True), repeat)
+        if not rows:
+            continue
+        encode_before, _ = cpu_ms(lambda: _fastapi_encode(adapter, rows), repeat)
+        encode_after, _ = cpu_ms(lambda: dumps(rows), repeat)
+        per_1k = 1000 / len(rows)
+        out[name] = {
+            "rows": len(rows),
+            "before": {"fetch": fetch_before * per_1k, "encode": encode_before * per_1k},
+            "after": {"fetch": fetch_after * per_1k, "encode": encode_after * per_1k},
+        }
+        for path in ("before", "after"):
+            stats = out[name][path]
+            stats["total"] = stats["fetch"] + stats["encode"]
+            out[name][path] = {k: round(v, 3) for k, v in stats.items()}
+        before, after = out[name]["before"]["total"], out[name]["after"]["total"]
+        print(
+            f" - {name} ({len(rows):,} rows): {before:.2f} -> {after:.2f} ms CPU per 1k rows "
+            f"(encode {out[name]['before']['encode']:.2f} -> {out[name]['after']['encode']:.2f})"
+        )
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serialization CPU per 1,000 rows on the configured engine.")
+    parser.add_argument("--from", dest="date_from", required=True, help="YYYY-MM-DD (UTC), inclusive.")
+    parser.add_argument("--to", dest="date_to", required=True, help="YYYY-MM-DD (UTC), inclusive.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from pipeline.bq import BQQueryRunner
+    from pipeline.config import Settings
+
+    bq = BQQueryRunner(Settings.load())
+    print(json.dumps(bench_serialization(bq, args.date_from, args.date_to, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Cold start of the API and the daily job, each measured in fresh interpreters.
+
+    api   import of pipeline.serve, then the first request (GET /trending/repos), which creates the
+          query engine and runs the first query
+    job   import of pipeline.run_daily
+
+Each run also lists which heavy modules (BigQuery client, NumPy, pyarrow, DuckDB) were imported by
+the import alone; they should only load when first used. The best of --repeat runs counts. With
+--budget-ms the command exits with status 1 when the API's import + first request is over budget,
+so it can guard cold starts of autoscaled instances. benchmarks/run.py runs this on its database;
+on its own (with the environment pointing at a database):
+
+    python -m benchmarks.startup --date 2025-10-20 --budget-ms 1500
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HEAVY_MODULES = ["google.cloud.bigquery", "numpy", "pyarrow", "duckdb"]
+DEFAULT_BUDGET_MS = 1500
+
+API_SNIPPET = """
+import json, sys, time
+started = time.perf_counter()
+from pipeline.serve import app
+imported = time.perf_counter()
+heavy = [m for m in HEAVY if m in sys.modules]
+from fastapi.testclient import TestClient
+client = TestClient(app)
+requested = time.perf_counter()
+client.get(PATH).raise_for_status()
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_request_ms": (done - requested) * 1000,
+                  "heavy_on_import": heavy}))
+"""
+
+JOB_SNIPPET = """
+import json, sys, time
+started = time.perf_counter()
+import pipeline.run_daily
+imported = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "heavy_on_import": [m for m in HEAVY if m in sys.modules]}))
+"""
+
+
+def _run(snippet: str, **values) -> tuple[dict, float]:
+    """Run snippet in a new interpreter; its printed JSON and the process wall time in ms."""
+    code = "".join(f"{k} = {v!r}\n" for k, v in {"HEAVY": HEAVY_MODULES, **values}.items()) + snippet
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True,
+        cwd=Path(__file__).resolve().parents[1], env=os.environ.copy(),
+    )
+    if proc.returncode:
+        raise RuntimeError(f"Startup run failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1]), (time.perf_counter() - started) * 1000
+
+
+def bench_startup(date_str: str, repeat: int = 3, budget_ms: float = DEFAULT_BUDGET_MS) -> dict:
+    """Best-of-repeat cold start numbers for the API and the job; see the module docstring."""
+    api_runs, job_runs = [], []
+    for _ in range(repeat):
+        run, wall = _run(API_SNIPPET, PATH=f"/trending/repos?limit=50&date={date_str}")
+        api_runs.append({**run, "process_ms": wall})
+        run, wall = _run(JOB_SNIPPET)
+        job_runs.append({**run, "process_ms": wall})
+
+    def best(runs: list[dict]) -> dict:
+        out = {k: round(min(r[k] for r in runs), 1) for k, v in runs[0].items() if isinstance(v, float)}
+        out["heavy_on_import"] = sorted({m for r in runs for m in r["heavy_on_import"]})
+        return out
+
+    api, job = best(api_runs), best(job_runs)
+    api["cold_start_ms"] = round(api["import_ms"] + api["first_request_ms"], 1)
+    api["budget_ms"] = budget_ms
+    api["within_budget"] = api["cold_start_ms"] <= budget_ms
+    print(
+        f" - api: import {api['import_ms']:.0f} ms + first request {api['first_request_ms']:.0f} ms "
+        f"= {api['cold_start_ms']:.0f} ms (budget {budget_ms:.0f} ms); heavy on import: {api['heavy_on_import'] or 'none'}"
+    )
+    print(f" - job: import {job['import_ms']:.0f} ms; heavy on import: {job['heavy_on_import'] or 'none'}")
+    return {"api": api, "job": job}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold start of the API and the daily job in fresh interpreters.")
+    parser.add_argument("--date", required=True, help="YYYY-MM-DD (UTC) for the first request.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="API import + first request budget.")
+    args = parser.parse_args()
+
+    result = bench_startup(args.date, args.repeat, args.budget_ms)
+    print(json.dumps(result, indent=2))
+    if not result["api"]["within_budget"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
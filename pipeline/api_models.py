@@ -15,6 +15,9 @@ class TrendingRepo(BaseModel):
     growth_events_ratio: Optional[float] = None
     z_events: Optional[float] = None
     trend_score: float
+    # Rolling windows (?window=7d|30d): the *_today fields and trend_score are totals over the window
+    window_days: Optional[int] = None
+    trending_days: Optional[int] = None
 
 class TrendingLanguage(BaseModel):
     event_date: str
@@ -26,6 +29,25 @@ class TrendingLanguage(BaseModel):
     avg_trend_score: float
     total_trend_score: float
     top_repos: Any
+    window_days: Optional[int] = None
+
+class TopRepo(BaseModel):
+    repo_name: str
+    # Upper bound of the repo's total; value - error is a lower bound (0 on the exact path)
+    value: int
+    error: int
+
+class LanguageTopRepos(BaseModel):
+    primary_language: str
+    metric: str
+    date_from: str
+    date_to: str
+    exact: bool
+    # Events or stars of the language's repos over the window
+    total: int
+    # Bound on every error: total / HEAVY_HITTERS_CAPACITY
+    max_error: int
+    repos: list[TopRepo]
 
 class AlertItem(BaseModel):
     event_date: str
@@ -41,9 +63,33 @@ class AlertItem(BaseModel):
     primary_language: Optional[str] = None
     created_at: str
 
+class RepoHistoryPoint(BaseModel):
+    event_date: str
+    events_today: int
+    actors_today: int
+    stars_today: int
+    growth_events_ratio: Optional[float] = None
+    z_events: Optional[float] = None
+    trend_score: float
+
+class RepoHistory(BaseModel):
+    repo_name: str
+    # Days the repo trended, oldest first; days without a point had too few events to be scored
+    points: list[RepoHistoryPoint]
+
 class DailySummary(BaseModel):
     event_date: str
     summary_text: str
     top_repos: list[str]
     top_languages: list[str]
-    created_at: str
\ No newline at end of file
+    created_at: str
+
+
+class IntradayStatus(BaseModel):
+    event_date: str
+    # Hours of the date folded by pipeline.hourly, and the fraction of the day they cover
+    hours: int
+    last_hour: Optional[int] = None
+    day_fraction: float
+    # True while the date's rows are provisional: hours were folded and the daily run has not replaced them
+    provisional: bool
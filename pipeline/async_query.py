@@ -0,0 +1,181 @@
+"""
+Async query layer for the API.
+
+- At most `max_concurrency` jobs run at a time; further requests wait on a semaphore
+  instead of each holding a worker thread. Streamed results (`stream`, the API's exports)
+  hold a slot until they are read to the end or closed.
+- Concurrent identical requests (same SQL + params) share one in-flight job.
+- Every request has a timeout, and a job is cancelled once nobody waits for it any more
+  (all callers timed out or their clients disconnected). A cancelled job holds its slot until
+  its worker thread returns.
+- With `columnar`, results are fetched as Arrow tables and decoded to rows column by column
+  (needs pyarrow), which is cheaper than building each row from the engine's row objects.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from pipeline.bq import BQQueryRunner
+from pipeline.cache import make_key
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+@dataclass
+class QueryStats:
+    jobs: int = 0
+    coalesced: int = 0
+    timeouts: int = 0
+    cancelled: int = 0
+
+
+@dataclass
+class _InFlight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class AsyncQueryRunner:
+    def __init__(
+        self,
+        runner: BQQueryRunner,
+        max_concurrency: int = 8,
+        timeout_s: float = 30.0,
+        poll_interval_s: float = 0.25,
+        columnar: bool = False,
+    ):
+        self.runner = runner
+        self.max_concurrency = max_concurrency
+        self.timeout_s = timeout_s
+        self.poll_interval_s = poll_interval_s
+        self.columnar = columnar
+        self._semaphore: asyncio.Semaphore | None = None
+        self._inflight: dict[tuple, _InFlight] = {}
+        self.stats = QueryStats()
+
+    def _slots(self) -> asyncio.Semaphore:
+        # Created on first use, inside the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _execute(self, sql: str, params: dict[str, Any]) -> list[dict]:
+        async with self._slots():
+            # Cancelling this task does not stop a worker thread, so the threads are shielded and awaited
+            # below: a cancelled query keeps its slot until its thread has returned
+            submit = asyncio.ensure_future(asyncio.to_thread(self.runner.submit_query, sql, params=params))
+            fetch: asyncio.Future | None = None
+            try:
+                job = await asyncio.shield(submit)
+                fetch = asyncio.ensure_future(asyncio.to_thread(self._rows, job))
+                return await asyncio.shield(fetch)
+            except asyncio.CancelledError:
+                # Cancelled while submitting too: cancel the job as soon as it exists
+                await asyncio.wait({submit})
+                if submit.exception() is None:
+                    submit.result().cancel()
+                    self.stats.cancelled += 1
+                if fetch is not None:
+                    # The thread returns once the engine notices the cancel
+                    await asyncio.wait({fetch})
+                    fetch.exception()
+                raise
+
+    async def stream(self, sql: str, params: dict[str, Any], batch_rows: int = 10_000) -> AsyncIterator[Any]:
+        """
+        The rows of `sql` as pyarrow RecordBatches (BQQueryRunner.stream), each read on a worker thread.
+        Holds a slot until the stream is exhausted or closed; not coalesced and without a timeout.
+        """
+        async with self._slots():
+            self.stats.jobs += 1
+            batches = iter(await asyncio.to_thread(self.runner.stream, sql, params=params, batch_rows=batch_rows))
+            try:
+                while True:
+                    read = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+                    try:
+                        batch = await asyncio.shield(read)
+                    except asyncio.CancelledError:
+                        # Keep the slot until the read in progress returns, as _execute does
+                        await asyncio.wait({read})
+                        raise
+                    if batch is None:
+                        return
+                    yield batch
+            finally:
+                if hasattr(batches, "close"):
+                    await asyncio.to_thread(batches.close)
+
+    def _rows(self, job) -> list[dict]:
+        if self.columnar:
+            return job.arrow().to_pylist()
+        return job.result()
+
+    async def query(
+        self,
+        sql: str,
+        params: dict[str, Any],
+        is_disconnected: Callable[[], Awaitable[bool]] | None = None,
+    ) -> list[dict]:
+        """
+        Rows of `sql`, sharing the job with any identical request already in flight.
+        Raises QueryTimeout after timeout_s and ClientDisconnected once is_disconnected() is true.
+        """
+        key = make_key(sql, params)
+        entry = self._inflight.get(key)
+        if entry is None:
+            entry = _InFlight(asyncio.create_task(self._execute(sql, params)))
+            self._inflight[key] = entry
+            entry.task.add_done_callback(lambda _: self._forget(key, entry))
+            self.stats.jobs += 1
+        else:
+            self.stats.coalesced += 1
+
+        entry.waiters += 1
+        try:
+            return await self._wait(entry.task, is_disconnected)
+        finally:
+            entry.waiters -= 1
+            if entry.waiters == 0 and not entry.task.done():
+                entry.task.cancel()
+
+    async def _wait(
+        self,
+        task: asyncio.Task,
+        is_disconnected: Callable[[], Awaitable[bool]] | None,
+    ) -> list[dict]:
+        # asyncio.wait never cancels the shared task, so one caller giving up does not affect the others
+        deadline = asyncio.get_running_loop().time() + self.timeout_s
+        while True:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                self.stats.timeouts += 1
+                raise QueryTimeout(f"Query did not finish within {self.timeout_s:g}s")
+            await asyncio.wait({task}, timeout=min(remaining, self.poll_interval_s))
+            if task.done():
+                return task.result()
+            if is_disconnected is not None and await is_disconnected():
+                raise ClientDisconnected()
+
+    def _forget(self, key: tuple, entry: _InFlight) -> None:
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "max_concurrency": self.max_concurrency,
+            "columnar": self.columnar,
+            "jobs": self.stats.jobs,
+            "coalesced": self.stats.coalesced,
+            "timeouts": self.stats.timeouts,
+            "cancelled": self.stats.cancelled,
+        }
@@ -0,0 +1,162 @@
+"""
+Backfill a date range: extract, transform and compute, resumable.
+
+1. extract   - one wildcard-table query per batch of up to --batch-days days
+2. transform - one DAG run from the first day that is not transformed yet up to --to
+3. compute   - dates in parallel (--jobs)
+4. rollups   - the rolling 7/30-day windows, one date after the other from the first gap to --to
+
+Each stage writes a row per finished date to stg_github.backfill_checkpoints; a rerun skips what
+is already done. Redoing a stage for a date clears the later stages' checkpoints of that date.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from pipeline.bq import BQQueryRunner
+from pipeline.compute import compute_date, update_rollups
+from pipeline.config import Settings
+from pipeline.extract import extract_range
+from pipeline.telemetry import record_run
+from pipeline.transform import run_transform
+from pipeline.utils.dates import iter_dates
+
+STAGES = ["extract", "transform", "compute", "rollups"]
+
+CHECKPOINTS_SQL = """
+SELECT event_date, stage
+FROM `${STG_DATASET}.backfill_checkpoints`
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
+"""
+
+CLEAR_CHECKPOINTS_SQL = """
+DELETE FROM `${STG_DATASET}.backfill_checkpoints`
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
+  AND stage IN (${STAGES});
+"""
+
+MARK_SQL = """
+INSERT INTO `${STG_DATASET}.backfill_checkpoints` (event_date, stage, completed_at)
+SELECT DATE(d), "${STAGE}", CURRENT_TIMESTAMP()
+FROM UNNEST([${DATES}]) AS d;
+"""
+
+
+def batches(days: list[date], max_days: int) -> list[tuple[date, date]]:
+    """Contiguous runs of days, split so no batch is longer than max_days."""
+    out: list[tuple[date, date]] = []
+    for d in days:
+        if out and d - out[-1][1] == timedelta(days=1) and (d - out[-1][0]).days < max_days:
+            out[-1] = (out[-1][0], d)
+        else:
+            out.append((d, d))
+    return out
+
+
+class Checkpoints:
+    def __init__(self, bq: BQQueryRunner, date_from: date, date_to: date):
+        self.bq = bq
+        self.range = {"DATE_FROM": date_from.isoformat(), "DATE_TO": date_to.isoformat()}
+        self.done: dict[str, set[date]] = {stage: set() for stage in STAGES}
+        # Dates this run did any work for, for the throughput report
+        self.processed: set[date] = set()
+        for row in bq.query(CHECKPOINTS_SQL, extra=self.range):
+            if row["stage"] in self.done:
+                self.done[row["stage"]].add(row["event_date"])
+
+    def pending(self, stage: str, days: list[date]) -> list[date]:
+        return [d for d in days if d not in self.done[stage]]
+
+    def clear(self, stages: list[str], date_from: date, date_to: date) -> None:
+        if not stages:
+            return
+        self.bq.run(CLEAR_CHECKPOINTS_SQL, extra={
+            "DATE_FROM": date_from.isoformat(),
+            "DATE_TO": date_to.isoformat(),
+            "STAGES": ", ".join(f'"{s}"' for s in stages),
+        }, step="backfill_checkpoints")
+        for stage in stages:
+            self.done[stage] = {d for d in self.done[stage] if not date_from <= d <= date_to}
+
+    def mark(self, stage: str, days: list[date]) -> None:
+        if not days:
+            return
+        dates = ", ".join(f'"{d.isoformat()}"' for d in days)
+        self.bq.run(MARK_SQL, extra={"STAGE": stage, "DATES": dates}, step="backfill_checkpoints")
+        self.done[stage].update(days)
+        self.processed.update(days)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--from", dest="date_from", required=True, help="YYYY-MM-DD (UTC), inclusive.")
+    parser.add_argument("--to", dest="date_to", required=True, help="YYYY-MM-DD (UTC), inclusive.")
+    parser.add_argument("--batch-days", type=int, default=31, help="Days of GH Archive per extract query.")
+    parser.add_argument("--jobs", type=int, help="Dates computed concurrently (default: MAX_JOBS).")
+    parser.add_argument("--restart", action="store_true", help="Ignore existing checkpoints and redo the whole range.")
+    args = parser.parse_args()
+
+    date_from, date_to = date.fromisoformat(args.date_from), date.fromisoformat(args.date_to)
+    if date_from > date_to:
+        parser.error("--from must not be after --to.")
+
+    settings = Settings.load()
+    bq = BQQueryRunner(settings)
+    jobs = args.jobs or settings.max_jobs
+    days = iter_dates(date_from, date_to)
+    started = time.monotonic()
+
+    with record_run(bq, settings, "backfill", vars(args)):
+        checkpoints = Checkpoints(bq, date_from, date_to)
+        if args.restart:
+            checkpoints.clear(STAGES, date_from, date_to)
+
+        # 1. extract
+        for start, end in batches(checkpoints.pending("extract", days), args.batch_days):
+            print(f"\nExtracting {start} .. {end} ...")
+            res = extract_range(bq, settings, start, end)
+            print(f"Done. job_id={res.job_id} processed={res.bytes_processed} billed={res.bytes_billed}")
+            checkpoints.clear(["transform", "compute", "rollups"], start, end)
+            checkpoints.mark("extract", iter_dates(start, end))
+
+        # 2. transform: the rolling baseline needs days in order, so rerun from the first gap to the end
+        todo = checkpoints.pending("transform", days)
+        if todo:
+            print(f"\nTransforming {todo[0]} .. {date_to} ...")
+            run_transform(bq, settings, todo[0], date_to, jobs=jobs)
+            checkpoints.clear(["compute", "rollups"], todo[0], date_to)
+            checkpoints.mark("transform", iter_dates(todo[0], date_to))
+
+        # 3. compute: dates are independent
+        todo = checkpoints.pending("compute", days)
+        if todo:
+            print(f"\nComputing {len(todo)} dates with up to {jobs} in parallel ...")
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                futures = {pool.submit(compute_date, bq, settings, d.isoformat(), 2, False): d for d in todo}
+                for future in as_completed(futures):
+                    future.result()
+                    checkpoints.mark("compute", [futures[future]])
+            checkpoints.clear(["rollups"], todo[0], date_to)
+
+        # 4. rollups: each date rolls the previous date's windows forward, so rerun from the first gap in order
+        todo = checkpoints.pending("rollups", days)
+        if todo:
+            print(f"\nUpdating rolling windows {todo[0]} .. {date_to} ...")
+            for d in iter_dates(todo[0], date_to):
+                update_rollups(bq, settings, d.isoformat(), jobs)
+                checkpoints.mark("rollups", [d])
+
+    hours = (time.monotonic() - started) / 3600
+    processed = len(checkpoints.processed)
+    print(
+        f"\nBackfill done: {processed} of {len(days)} days processed in {hours * 60:.1f} min "
+        f"({processed / hours if hours else 0:.0f} days/hour)."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,207 @@
 from __future__ import annotations
 
+import copy
+import threading
+import time
 from dataclasses import dataclass
-from typing import Optional
-
-from google.cloud import bigquery
+from typing import TYPE_CHECKING, Any, Iterator, Optional
 
 from pipeline.config import Settings
 
+if TYPE_CHECKING:
+    # Imported where it is used: google.cloud.bigquery takes about 0.4s to import and the local
+    # engine never needs it
+    from google.cloud import bigquery
+
 @dataclass
 class QueryResult:
     job_id: str
     bytes_processed: int
     bytes_billed: int
+    # Rows read by the query; only reported by the local engine
+    rows_processed: int = 0
+    # Telemetry for the run manifest (see pipeline/telemetry.py)
+    step: str = ""
+    wall_ms: int = 0
+    queue_ms: int = 0
+    slot_ms: int = 0
+    rows_affected: int = 0
+    cache_hit: bool = False
+    # Dry-run estimate checked against the step's byte budget (0 = no budget, no dry run)
+    estimated_bytes: int = 0
 
 
-class BQQueryRunner:
+class BytesBudgetExceeded(RuntimeError):
+    """A step's dry-run estimate is above its MAX_BYTES_* budget; nothing was run."""
+
+    def __init__(self, step: str, estimated_bytes: int, max_bytes: int):
+        super().__init__(
+            f"Step '{step or '(unnamed)'}' would scan {estimated_bytes:,} bytes, "
+            f"over its budget of {max_bytes:,} bytes. Nothing was run."
+        )
+        self.step = step
+        self.estimated_bytes = estimated_bytes
+        self.max_bytes = max_bytes
+
+
+def _millis(start, end) -> int:
+    if start is None or end is None:
+        return 0
+    return int((end - start).total_seconds() * 1000)
+
+
+def _with_options(job_config: Optional[bigquery.QueryJobConfig], **options) -> bigquery.QueryJobConfig:
+    """A copy of job_config (labels included) with options set; the caller's config is left alone."""
+    from google.cloud import bigquery
+
+    config = bigquery.QueryJobConfig()
+    if job_config is not None:
+        config = bigquery.QueryJobConfig.from_api_repr(copy.deepcopy(job_config.to_api_repr()))
+    for name, value in options.items():
+        setattr(config, name, value)
+    return config
+
+
+def _parameter_type(value: Any) -> str:
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, int):
+        return "INT64"
+    if isinstance(value, float):
+        return "FLOAT64"
+    return "STRING"
+
+
+def _query_parameter(name: str, value: Any) -> bigquery.ScalarQueryParameter | bigquery.ArrayQueryParameter:
+    from google.cloud import bigquery
+
+    if isinstance(value, (list, tuple)):
+        # Element type from the first value; an empty array is an ARRAY<STRING>
+        return bigquery.ArrayQueryParameter(name, _parameter_type(value[0]) if value else "STRING", list(value))
+    return bigquery.ScalarQueryParameter(name, _parameter_type(value), value)
+
+
+class BigQueryJob:
+    """Handle of a submitted SELECT; result() blocks, cancel() asks BigQuery to stop the job."""
+
+    def __init__(self, job: bigquery.QueryJob):
+        self.job = job
+
+    def result(self) -> list[dict]:
+        return [dict(row) for row in self.job.result()]
+
+    def arrow(self) -> Any:
+        """result() as a pyarrow Table. API results are small, so they are read over REST, not the Storage API."""
+        return self.job.result().to_arrow(create_bqstorage_client=False)
+
+    def cancel(self) -> None:
+        self.job.cancel()
+
+
+class BigQueryEngine:
     def __init__(self, settings: Settings):
-        self.settings = settings
+        from google.cloud import bigquery
+
         self.client = bigquery.Client(project=settings.gcp_project_id, location=settings.bq_location)
+        # Storage Read API client for stream(); None until first used, False when not installed
+        self._read_client: Any = None
+
+    def run(self, sql: str, job_config: Optional[bigquery.QueryJobConfig] = None) -> QueryResult:
+        started = time.monotonic()
+        job = self.client.query(sql, job_config=job_config)
+        job.result() # Wait for completion
+        stats = job._properties.get("statistics", {}).get("query", {})
+        billed = int(stats.get("totalBytesBilled", 0))
+        processed = int(stats.get("totalBytesProcessed", 0))
+        return QueryResult(
+            job_id=job.job_id,
+            bytes_processed=processed,
+            bytes_billed=billed,
+            wall_ms=int((time.monotonic() - started) * 1000),
+            queue_ms=_millis(job.created, job.started),
+            slot_ms=int(job.slot_millis or 0),
+            rows_affected=int(job.num_dml_affected_rows or 0),
+            cache_hit=bool(job.cache_hit),
+        )
+
+    def dry_run(self, sql: str, job_config: Optional[bigquery.QueryJobConfig] = None) -> int:
+        """Bytes BigQuery estimates the statement (or script) will process; dry runs are free."""
+        job = self.client.query(sql, job_config=_with_options(job_config, dry_run=True, use_query_cache=False))
+        return int(job.total_bytes_processed or 0)
+
+    def submit(self, sql: str, params: dict[str, Any] | None = None) -> BigQueryJob:
+        from google.cloud import bigquery
+
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[_query_parameter(k, v) for k, v in (params or {}).items()]
+        )
+        return BigQueryJob(self.client.query(sql, job_config=job_config))
+
+    def query(self, sql: str, params: dict[str, Any] | None = None) -> list[dict]:
+        return self.submit(sql, params).result()
+
+    def _storage_client(self):
+        if self._read_client is None:
+            try:
+                from google.cloud import bigquery_storage  # optional: google-cloud-bigquery-storage
+            except ImportError:
+                self._read_client = False
+            else:
+                self._read_client = bigquery_storage.BigQueryReadClient(credentials=self.client._credentials)
+        return self._read_client or None
+
+    def stream(self, sql: str, params: dict[str, Any] | None = None, batch_rows: int = 10_000) -> Iterator[Any]:
+        """
+        A SELECT's rows as pyarrow RecordBatches. Large results are read from the job's destination table
+        through the Storage Read API when google-cloud-bigquery-storage is installed, otherwise page by
+        page over REST; either way only a few batches are held at a time.
+        """
+        rows = self.submit(sql, params).job.result(page_size=batch_rows)
+        return rows.to_arrow_iterable(bqstorage_client=self._storage_client())
+
+    def load_rows(self, table: str, rows: list[dict], partition_date: str | None = None) -> QueryResult:
+        from google.cloud import bigquery
+
+        destination = self.client.get_table(table)
+        target = f"{destination.project}.{destination.dataset_id}.{destination.table_id}"
+        if partition_date:
+            # Partition decorator + WRITE_TRUNCATE swaps the whole partition in one load job
+            target += "$" + partition_date.replace("-", "")
+        job_config = bigquery.LoadJobConfig(
+            schema=destination.schema,
+            write_disposition="WRITE_TRUNCATE" if partition_date else "WRITE_APPEND",
+        )
+        job = self.client.load_table_from_json(rows, target, job_config=job_config)
+        job.result()
+        # Load jobs are free; nothing is scanned
+        return QueryResult(job_id=job.job_id, bytes_processed=0, bytes_billed=0, rows_affected=len(rows))
+
+
+def make_engine(settings: Settings):
+    if settings.engine == "duckdb":
+        from pipeline.local_engine import LocalEngine
+
+        return LocalEngine(settings)
+    return BigQueryEngine(settings)
+
+
+class BQQueryRunner:
+    def __init__(self, settings: Settings, engine=None):
+        self.settings = settings
+        # Created on first use, so importing a module or starting the API opens no client or database
+        self._engine = engine
+        self._engine_lock = threading.Lock()
+        # Every QueryResult of this runner, in completion order; read by pipeline.telemetry
+        self.results: list[QueryResult] = []
+        self._results_lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    self._engine = make_engine(self.settings)
+        return self._engine
 
     def render_sql(self, sql: str, extra: dict[str, str] | None = None) -> str:
         """
@@ -29,13 +213,36 @@ class BQQueryRunner:
             "STG_DATASET": self.settings.stg_dataset,
             "MART_DATASET": self.settings.mart_dataset,
             "GCP_PROJECT_ID": self.settings.gcp_project_id,
+            # Dataset of SOURCE_REPOS_TABLE, which also holds the languages and licenses tables
+            "SOURCE_REPOS_DATASET": self.settings.source_repos_table.rsplit(".", 1)[0],
+            "REPO_DIM_REFRESH_DAYS": str(self.settings.repo_dim_refresh_days),
             "LOOKBACK_DAYS": str(self.settings.lookback_days),
             "MIN_EVENTS_THRESHOLD": str(self.settings.min_events_threshold),
 
+            "HLL_PRECISION": str(self.settings.hll_precision),
+            "HEAVY_HITTERS_CAPACITY": str(self.settings.heavy_hitters_capacity),
+            "ACTORS_UNIQUE": (
+                "COUNT(DISTINCT actor_id)" if self.settings.exact_actor_counts
+                else f"HLL_COUNT.EXTRACT(HLL_COUNT.INIT(actor_id, {self.settings.hll_precision}))"
+            ),
+
+            "TREND_WEIGHT_EVENTS": str(self.settings.trend_weights[0]),
+            "TREND_WEIGHT_ACTORS": str(self.settings.trend_weights[1]),
+            "TREND_WEIGHT_STARS": str(self.settings.trend_weights[2]),
+
+            "SEVERITY_Z_HIGH": str(self.settings.severity_z_high),
+            "SEVERITY_Z_MEDIUM": str(self.settings.severity_z_medium),
+            "SEVERITY_GROWTH_HIGH": str(self.settings.severity_growth_high),
+            "SEVERITY_GROWTH_MEDIUM": str(self.settings.severity_growth_medium),
+            "LANGUAGE_SEVERITY_HIGH": str(self.settings.language_severity_high),
+            "LANGUAGE_SEVERITY_MEDIUM": str(self.settings.language_severity_medium),
             "ALERT_Z_THRESHOLD_LOW": str(self.settings.alert_z_threshold_low),
             "ALERT_GROWTH_THRESHOLD_LOW": str(self.settings.alert_growth_threshold_low),
             "MAX_REPO_ALERTS": str(self.settings.max_repo_alerts),
             "MAX_LANGUAGE_ALERTS": str(self.settings.max_language_alerts),
+
+            # Typed payload columns, as a ", a, b" suffix for column lists
+            "PAYLOAD_COLUMNS": "".join(f", {f.column}" for f in self.settings.payload_fields),
             }
         if extra:
             mapping.update(extra)
@@ -45,17 +252,91 @@ class BQQueryRunner:
             rendered = rendered.replace(f"${{{key}}}", val)
         return rendered
     
-    def run(self, sql: str, extra: dict[str, str] | None = None, job_config: Optional[bigquery.QueryJobConfig] = None) -> QueryResult:
+    def run(
+        self,
+        sql: str,
+        extra: dict[str, str] | None = None,
+        job_config: Optional[bigquery.QueryJobConfig] = None,
+        step: str | None = None,
+        max_bytes: int = 0,
+        labels: dict[str, str] | None = None,
+    ) -> QueryResult:
+        """
+        Run a statement or script. `step` names it in the run manifest (default: the "step" job label).
+        `labels` are added to the job's labels. With max_bytes the statement is dry-run first and
+        rejected with BytesBudgetExceeded if the estimate is over budget; the budget is also set as
+        maximum_bytes_billed, so BigQuery enforces it.
+        """
         rendered = self.render_sql(sql, extra=extra)
-        # print(f"Running SQL:\n{rendered}\n")
-        # return
-        job = self.client.query(rendered, job_config=job_config)
-        job.result() # Wait for completion
-        stats = job._properties.get("statistics", {}).get("query", {})
-        billed = int(stats.get("totalBytesBilled", 0))
-        processed = int(stats.get("totalBytesProcessed", 0))
-        return QueryResult(
-            job_id=job.job_id,
-            bytes_processed=processed,
-            bytes_billed=billed,
-        )
\ No newline at end of file
+        # The local engine has no job options, so it runs without importing the BigQuery client
+        job_options = getattr(self.engine, "job_options", True)
+        labels = {**(job_config.labels if job_config is not None else {}), **(labels or {})}
+        if labels and job_options:
+            job_config = _with_options(job_config, labels=labels)
+        step = step or labels.get("step", "")
+        estimated = 0
+        if max_bytes:
+            estimated = self.engine.dry_run(rendered, job_config=job_config)
+            if estimated > max_bytes:
+                raise BytesBudgetExceeded(step, estimated, max_bytes)
+            if job_options:
+                job_config = _with_options(job_config, maximum_bytes_billed=max_bytes)
+        result = self.engine.run(rendered, job_config=job_config)
+        result.step = step
+        result.estimated_bytes = estimated
+        with self._results_lock:
+            self.results.append(result)
+        return result
+
+    def dry_run(
+        self,
+        sql: str,
+        extra: dict[str, str] | None = None,
+        job_config: Optional[bigquery.QueryJobConfig] = None,
+    ) -> int:
+        """Estimated bytes processed of a statement or script, without running it."""
+        return self.engine.dry_run(self.render_sql(sql, extra=extra), job_config=job_config)
+
+    def query(
+        self,
+        sql: str,
+        extra: dict[str, str] | None = None,
+        params: dict[str, Any] | None = None,
+    ) -> list[dict]:
+        """Run a SELECT and return its rows as dicts. `params` are bound as @name query parameters."""
+        rendered = self.render_sql(sql, extra=extra)
+        return self.engine.query(rendered, params=params)
+
+    def stream(
+        self,
+        sql: str,
+        extra: dict[str, str] | None = None,
+        params: dict[str, Any] | None = None,
+        batch_rows: int = 10_000,
+    ) -> Iterator[Any]:
+        """Like query(), but yields pyarrow RecordBatches of about batch_rows rows (needs pyarrow)."""
+        rendered = self.render_sql(sql, extra=extra)
+        return self.engine.stream(rendered, params=params, batch_rows=batch_rows)
+
+    def submit_query(
+        self,
+        sql: str,
+        extra: dict[str, str] | None = None,
+        params: dict[str, Any] | None = None,
+    ):
+        """Like query(), but returns a job handle with result() and cancel() instead of waiting."""
+        rendered = self.render_sql(sql, extra=extra)
+        return self.engine.submit(rendered, params=params)
+
+    def load_rows(self, table: str, rows: list[dict], partition_date: str | None = None) -> QueryResult:
+        """
+        Bulk-load rows into `table` (e.g. "${STG_DATASET}.daily_repo_activity").
+        With partition_date the rows replace that event_date partition, otherwise they are appended.
+        """
+        started = time.monotonic()
+        result = self.engine.load_rows(self.render_sql(table), rows, partition_date=partition_date)
+        result.step = f"load {self.render_sql(table)}"
+        result.wall_ms = int((time.monotonic() - started) * 1000)
+        with self._results_lock:
+            self.results.append(result)
+        return result
@@ -0,0 +1,154 @@
+"""
+In-process response cache for the API.
+
+Mart rows for a date do not change once the daily compute has published it, so the API stores those
+entries as final: they live for final_ttl_s and are otherwise dropped by LRU eviction or an explicit
+invalidation (pipeline.compute calls POST /cache/invalidate after it rewrites a date). The TTL is long
+but bounded by default because that invalidation is best effort and reaches only the one API at
+API_URL: a recomputed or backfilled date is corrected on the other replicas, or after a missed call,
+within final_ttl_s. final_ttl_s=None keeps final entries until they are evicted or invalidated. Finality
+comes from the data, not the clock: a date pipeline.hourly is still folding, or one whose daily run has
+not finished, is volatile however old it is. Volatile entries and empty results get a short TTL.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    size: int
+    event_date: str | None
+    final: bool
+    expires_at: float | None    # None = never expires
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+def make_key(endpoint: str, params: dict) -> tuple[Hashable, ...]:
+    """Endpoint plus parameters in a stable order, so equivalent requests share an entry."""
+    return (endpoint, *sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()))
+
+
+def _estimate_size(value: Any) -> int:
+    return len(json.dumps(value, default=str))
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        volatile_ttl_s: float = 60.0,
+        final_ttl_s: float | None = 86400.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.volatile_ttl_s = volatile_ttl_s
+        self.final_ttl_s = final_ttl_s
+        self._clock = clock
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def _ttl(self, value: Any, final: bool) -> float | None:
+        return self.final_ttl_s if value and final else self.volatile_ttl_s
+
+    def get(self, key: tuple) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at is not None and entry.expires_at <= self._clock():
+                self._remove(key)
+                self.stats.expirations += 1
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return True, entry.value
+
+    def put(self, key: tuple, value: Any, event_date: str | None = None, final: bool = False) -> None:
+        """Store value; final=True when event_date's marts are published and will not change."""
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        ttl = self._ttl(value, final)
+        expires_at = None if ttl is None else self._clock() + ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(value, size, event_date, final, expires_at)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats.evictions += 1
+
+    def get_or_load(
+        self, key: tuple, event_date: str | None, load: Callable[[], Any], final: bool = False
+    ) -> Any:
+        hit, value = self.get(key)
+        if hit:
+            return value
+        value = load()
+        self.put(key, value, event_date, final)
+        return value
+
+    def invalidate(self, event_date: str | None = None) -> int:
+        """Drop every entry for event_date (or everything when no date is given). Returns the count."""
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if event_date is None or e.event_date == event_date]
+            for key in keys:
+                self._remove(key)
+            self.stats.invalidations += len(keys)
+            return len(keys)
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "final_entries": sum(e.final for e in self._entries.values()),
+                "bytes": self._bytes,
+                "hits": self.stats.hits,
+                "misses": self.stats.misses,
+                "evictions": self.stats.evictions,
+                "expirations": self.stats.expirations,
+                "invalidations": self.stats.invalidations,
+            }
+
+
+def notify_invalidate(api_url: str, event_date: str, token: str, timeout_s: float = 5.0) -> bool:
+    """
+    Tell a running API that event_date was rewritten, authenticated with the shared token. Best effort:
+    compute must not fail because the API is down, so errors are reported and swallowed.
+    """
+    url = f"{api_url.rstrip('/')}/cache/invalidate?date={event_date}"
+    request = urllib.request.Request(url, method="POST", headers={"Authorization": f"Bearer {token}"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout_s) as resp:
+            return 200 <= resp.status < 300
+    except OSError as e:
+        print(f"Cache invalidation for {event_date} failed ({url}): {e}")
+        return False
@@ -1,15 +1,96 @@
 from __future__ import annotations
 
 import argparse
+import time
 from datetime import datetime, timezone, date
 
-from google.cloud import bigquery
-
 from pipeline.config import Settings
 from pipeline.bq import BQQueryRunner
+from pipeline.cache import notify_invalidate
+from pipeline.dag import Node, print_report, run_dag
+from pipeline.snapshot import write_snapshot
+from pipeline.telemetry import record_run
+
+# A date's repo and language alerts, built in the publish script's session before anything is replaced
+ALERTS_STAGE_SQL = """
+CREATE TEMP TABLE new_alerts AS
+WITH
+repo_alerts AS (
+    ${REPO_ALERTS}
+),
+language_alerts AS (
+    SELECT
+        l.event_date,
+        'language' AS alert_type,
+        l.primary_language AS entity,
+        CASE
+            WHEN l.avg_trend_score >= ${LANGUAGE_SEVERITY_HIGH} THEN 'high'
+            WHEN l.avg_trend_score >= ${LANGUAGE_SEVERITY_MEDIUM} THEN 'medium'
+            ELSE 'low'
+        END AS severity,
+        l.avg_trend_score AS trend_score,
+        CAST(NULL AS FLOAT64) AS z_events,
+        CAST(NULL AS FLOAT64) AS growth_events_ratio,
+        l.events_today_total AS events_today,
+        l.actors_today_total AS actors_today,
+        l.stars_today_total AS stars_today,
+        l.primary_language,
+        CURRENT_TIMESTAMP() AS created_at
+    FROM `${MART_DATASET}.trending_languages_daily` l
+    WHERE l.event_date = DATE("${DATE}")
+        AND l.primary_language IS NOT NULL
+    QUALIFY
+        ROW_NUMBER() OVER (ORDER BY l.total_trend_score DESC) <= ${MAX_LANGUAGE_ALERTS}
+)
+SELECT * FROM repo_alerts
+UNION ALL
+SELECT * FROM language_alerts;
+"""
+
+REPO_ALERTS_SQL = """
+SELECT
+        t.event_date,
+        'repo' AS alert_type,
+        t.repo_name AS entity,
+        CASE
+            WHEN t.z_events >= ${SEVERITY_Z_HIGH} OR t.growth_events_ratio >= ${SEVERITY_GROWTH_HIGH} THEN 'high'
+            WHEN t.z_events >= ${SEVERITY_Z_MEDIUM} OR t.growth_events_ratio >= ${SEVERITY_GROWTH_MEDIUM} THEN 'medium'
+            ELSE 'low'
+        END AS severity,
+        t.trend_score,
+        t.z_events,
+        t.growth_events_ratio,
+        t.events_today,
+        t.actors_today,
+        t.stars_today,
+        t.primary_language,
+        CURRENT_TIMESTAMP() AS created_at
+    FROM `${MART_DATASET}.trending_repos_enriched` t
+    WHERE t.event_date = DATE("${DATE}")
+        AND (
+            t.z_events >= ${ALERT_Z_THRESHOLD_LOW}
+            OR t.growth_events_ratio >= ${ALERT_GROWTH_THRESHOLD_LOW}
+        )
+    QUALIFY
+        ROW_NUMBER() OVER (ORDER BY t.trend_score DESC) <= ${MAX_REPO_ALERTS}"""
+
+# SCORING_ENGINE=numpy loads its repo alerts into repo_alerts_staging first
+STAGED_REPO_ALERTS_SQL = """
+SELECT
+        event_date, alert_type, entity, severity,
+        trend_score, z_events, growth_events_ratio,
+        events_today, actors_today, stars_today,
+        primary_language, created_at
+    FROM `${STG_DATASET}.repo_alerts_staging`
+    WHERE event_date = DATE("${DATE}")"""
+
+# Replaces the date's alerts and summary in one transaction, so readers see the old date or the new one.
+# The summary counts the staged alerts instead of re-reading alerts_daily.
+PUBLISH_SQL = """
+BEGIN TRANSACTION;
+
+DELETE FROM `${MART_DATASET}.alerts_daily` WHERE event_date = DATE("${DATE}");
 
-ALERTS_INSERT_SQL = """
--- Insert alerts for a given day
 INSERT INTO `${MART_DATASET}.alerts_daily`
 (
     event_date, alert_type, entity, severity,
@@ -18,100 +99,215 @@ INSERT INTO `${MART_DATASET}.alerts_daily`
     primary_language, created_at
 )
 SELECT
-    t.event_date,
-    'repo' AS alert_type,
-    t.repo_name AS entity,
-    CASE
-        WHEN t.z_events >= 6 OR t.growth_events_ratio >= 10 THEN 'high'
-        WHEN t.z_events >= 4 OR t.growth_events_ratio >= 5 THEN 'medium'
-        ELSE 'low'
-    END AS severity,
-    t.trend_score,
-    t.z_events,
-    t.growth_events_ratio,
-    t.events_today,
-    t.actors_today,
-    t.stars_today,
-    t.primary_language,
-    CURRENT_TIMESTAMP() AS created_at
-FROM `${MART_DATASET}.trending_repos_enriched` t
-WHERE t.event_date = DATE("${DATE}")
-    AND (
-        t.z_events >= ${ALERT_Z_THRESHOLD_LOW}
-        OR t.growth_events_ratio >= ${ALERT_GROWTH_THRESHOLD_LOW}
-    )
-QUALIFY
-    ROW_NUMBER() OVER (ORDER BY t.trend_score DESC) <= ${MAX_REPO_ALERTS};
-"""
-
-LANG_ALERTS_INSERT_SQL = """
--- Insert language alerts for a given day
-INSERT INTO `${MART_DATASET}.alerts_daily`
-(
     event_date, alert_type, entity, severity,
     trend_score, z_events, growth_events_ratio,
     events_today, actors_today, stars_today,
     primary_language, created_at
-)
-SELECT
-    l.event_date,
-    'language' AS alert_type,
-    l.primary_language AS entity,
-    CASE
-        WHEN l.avg_trend_score >= 6 THEN 'high'
-        WHEN l.avg_trend_score >= 4 THEN 'medium'
-        ELSE 'low'
-    END AS severity,
-    l.avg_trend_score AS trend_score,
-    NULL AS z_events,
-    NULL AS growth_events_ratio,
-    l.events_today_total AS events_today,
-    l.actors_today_total AS actors_today,
-    l.stars_today_total AS stars_today,
-    l.primary_language,
-    CURRENT_TIMESTAMP() AS created_at
-FROM `${MART_DATASET}.trending_languages_daily` l
-WHERE l.event_date = DATE("${DATE}")
-    AND l.primary_language IS NOT NULL
-QUALIFY
-    ROW_NUMBER() OVER (ORDER BY l.total_trend_score DESC) <= ${MAX_LANGUAGE_ALERTS};
-"""
+FROM new_alerts;
+
+DELETE FROM `${MART_DATASET}.daily_summary` WHERE event_date = DATE("${DATE}");
 
-SUMMARY_INSERT_SQL = """
--- Create daily summary row
 INSERT INTO `${MART_DATASET}.daily_summary`
-(event_date, summary_text, top_repos, top_languages, created_at)
+(event_date, summary_text, top_repos, top_languages, created_at, provisional)
 WITH
-top_repos AS (
-    SELECT ARRAY_AGG(repo_name ORDER BY trend_score DESC LIMIT 5) AS repos
+repos AS (
+    SELECT
+        COUNT(DISTINCT repo_name) AS repo_count,
+        ARRAY_AGG(repo_name ORDER BY trend_score DESC LIMIT 5) AS top_repos
     FROM `${MART_DATASET}.trending_repos_enriched`
     WHERE event_date = DATE("${DATE}")
 ),
-top_langs AS (
-    SELECT ARRAY_AGG(primary_language ORDER BY total_trend_score DESC LIMIT 5) AS langs
+langs AS (
+    SELECT ARRAY_AGG(primary_language ORDER BY total_trend_score DESC LIMIT 5) AS top_languages
     FROM `${MART_DATASET}.trending_languages_daily`
     WHERE event_date = DATE("${DATE}")
 ),
-stats AS (
+alert_counts AS (
     SELECT
-        (SELECT COUNT(DISTINCT repo_name) FROM `${MART_DATASET}.trending_repos_enriched` WHERE event_date = DATE("${DATE}")) AS repo_count,
-        (SELECT COUNT(*) FROM `${MART_DATASET}.alerts_daily` WHERE event_date = DATE("${DATE}") AND alert_type = 'repo') AS repo_alerts,
-        (SELECT COUNT(*) FROM `${MART_DATASET}.alerts_daily` WHERE event_date = DATE("${DATE}") AND alert_type = 'language') AS lang_alerts
+        COUNTIF(alert_type = 'repo') AS repo_alerts,
+        COUNTIF(alert_type = 'language') AS lang_alerts
+    FROM new_alerts
 )
 SELECT
     DATE("${DATE}") AS event_date,
     CONCAT(
         'Daily GitHub trend summary for ', "${DATE}", ': ',
-        'Trending repos analyzed: ', CAST(stats.repo_count AS STRING), '. ',
-        'Repo alerts: ', CAST(stats.repo_alerts AS STRING), '. ',
-        'Language alerts: ', CAST(stats.lang_alerts AS STRING), '.'
+        'Trending repos analyzed: ', CAST(repos.repo_count AS STRING), '. ',
+        'Repo alerts: ', CAST(alert_counts.repo_alerts AS STRING), '. ',
+        'Language alerts: ', CAST(alert_counts.lang_alerts AS STRING), '.'
     ) AS summary_text,
-    top_repos.repos AS top_repos,
-    top_langs.langs AS top_languages,
-    CURRENT_TIMESTAMP() AS created_at
-FROM stats, top_repos, top_langs;
+    repos.top_repos,
+    langs.top_languages,
+    CURRENT_TIMESTAMP() AS created_at,
+    ${PROVISIONAL} AS provisional
+FROM repos, langs, alert_counts;
+
+COMMIT TRANSACTION;
+"""
+
+DELETE_STAGED_ALERTS_SQL = """
+DELETE FROM `${STG_DATASET}.repo_alerts_staging` WHERE event_date = DATE("${DATE}")
+"""
+
+# BigQuery cancels a transaction that mutates a table another transaction is mutating (backfill
+# computes dates in parallel); DuckDB reports a write-write conflict. Both are safe to rerun.
+TRANSACTION_CONFLICTS = ("concurrent update", "transaction conflict")
+TRANSACTION_ATTEMPTS = 5
+
+
+# Rolling windows maintained next to the daily marts; /trending/* serve them with ?window=7d|30d
+ROLLUP_WINDOWS = {"7d": 7, "30d": 30}
+
+# Every this many days (by date) the rollups are summed from scratch instead of rolled forward, so
+# floating-point error from adding and subtracting trend scores cannot accumulate
+ROLLUP_RECOMPUTE_DAYS = 7
+
+REPO_ROLLUP_SQL = """
+-- Per-repo totals over the ${WINDOW_DAYS} days ending on ${DATE}, from trending_repos_enriched.
+-- Rolled forward from the previous day's rollup, so compute dates in order; without one, or when
+-- ${ROLL_FORWARD} is FALSE, the window is summed from scratch. Language and license are the newest day's.
+BEGIN TRANSACTION;
+
+DELETE FROM `${MART_DATASET}.trending_repos_rollup`
+WHERE event_date = DATE("${DATE}") AND window_days = ${WINDOW_DAYS};
+
+IF ${ROLL_FORWARD} AND EXISTS (
+    SELECT 1
+    FROM `${MART_DATASET}.trending_repos_rollup`
+    WHERE event_date = DATE_SUB(DATE("${DATE}"), INTERVAL 1 DAY) AND window_days = ${WINDOW_DAYS}
+) THEN
+    -- Add the day entering the window, subtract the day leaving it
+    INSERT INTO `${MART_DATASET}.trending_repos_rollup`
+    (
+        event_date, window_days, repo_name, primary_language, license,
+        trending_days, events_total, actors_total, stars_total, trend_score
+    )
+    SELECT
+        DATE("${DATE}") AS event_date,
+        ${WINDOW_DAYS} AS window_days,
+        repo_name,
+        -- The entering day's row if there is one, else the previous rollup's (the only other non-NULL row)
+        COALESCE(MAX(IF(entering, primary_language, NULL)), MAX(primary_language)) AS primary_language,
+        COALESCE(MAX(IF(entering, license, NULL)), MAX(license)) AS license,
+        SUM(trending_days) AS trending_days,
+        SUM(events_total) AS events_total,
+        SUM(actors_total) AS actors_total,
+        SUM(stars_total) AS stars_total,
+        SUM(trend_score) AS trend_score
+    FROM (
+        SELECT
+            repo_name, primary_language, license, FALSE AS entering,
+            trending_days, events_total, actors_total, stars_total, trend_score
+        FROM `${MART_DATASET}.trending_repos_rollup`
+        WHERE event_date = DATE_SUB(DATE("${DATE}"), INTERVAL 1 DAY) AND window_days = ${WINDOW_DAYS}
+
+        UNION ALL
+
+        SELECT
+            repo_name, primary_language, license, TRUE,
+            1, events_today, actors_today, stars_today, trend_score
+        FROM `${MART_DATASET}.trending_repos_enriched`
+        WHERE event_date = DATE("${DATE}")
+
+        UNION ALL
+
+        SELECT
+            repo_name, NULL, NULL, FALSE,
+            -1, -events_today, -actors_today, -stars_today, -trend_score
+        FROM `${MART_DATASET}.trending_repos_enriched`
+        WHERE event_date = DATE_SUB(DATE("${DATE}"), INTERVAL ${WINDOW_DAYS} DAY)
+    )
+    GROUP BY repo_name
+    HAVING SUM(trending_days) > 0;
+ELSE
+    INSERT INTO `${MART_DATASET}.trending_repos_rollup`
+    (
+        event_date, window_days, repo_name, primary_language, license,
+        trending_days, events_total, actors_total, stars_total, trend_score
+    )
+    SELECT
+        DATE("${DATE}") AS event_date,
+        ${WINDOW_DAYS} AS window_days,
+        repo_name,
+        MAX(newest_language) AS primary_language,
+        MAX(newest_license) AS license,
+        COUNT(*) AS trending_days,
+        SUM(events_today) AS events_total,
+        SUM(actors_today) AS actors_total,
+        SUM(stars_today) AS stars_total,
+        SUM(trend_score) AS trend_score
+    FROM (
+        SELECT
+            repo_name, events_today, actors_today, stars_today, trend_score,
+            FIRST_VALUE(primary_language) OVER newest AS newest_language,
+            FIRST_VALUE(license) OVER newest AS newest_license
+        FROM `${MART_DATASET}.trending_repos_enriched`
+        WHERE event_date > DATE_SUB(DATE("${DATE}"), INTERVAL ${WINDOW_DAYS} DAY)
+            AND event_date <= DATE("${DATE}")
+        WINDOW newest AS (PARTITION BY repo_name ORDER BY event_date DESC)
+    )
+    GROUP BY repo_name;
+END IF;
+
+COMMIT TRANSACTION;
+"""
+
+LANGUAGE_ROLLUP_SQL = """
+-- Per-language totals over the ${WINDOW_DAYS} days ending on ${DATE}, from that day's repo rollup.
+-- Unique actors merge the languages' daily HLL sketches; without sketches for every day, the sum of repo actors.
+BEGIN TRANSACTION;
+
+DELETE FROM `${MART_DATASET}.trending_languages_rollup`
+WHERE event_date = DATE("${DATE}") AND window_days = ${WINDOW_DAYS};
+
+INSERT INTO `${MART_DATASET}.trending_languages_rollup`
+(
+    event_date, window_days, primary_language, trending_repos_count,
+    events_total, actors_total, stars_total,
+    avg_trend_score, total_trend_score, top_repos
+)
+WITH sketches AS (
+    SELECT
+        primary_language,
+        IF(COUNT(actors_hll) = COUNT(*), HLL_COUNT.MERGE(actors_hll), NULL) AS actors_unique
+    FROM `${MART_DATASET}.trending_languages_daily`
+    WHERE event_date > DATE_SUB(DATE("${DATE}"), INTERVAL ${WINDOW_DAYS} DAY)
+        AND event_date <= DATE("${DATE}")
+    GROUP BY primary_language
+)
+
+SELECT
+    DATE("${DATE}") AS event_date,
+    ${WINDOW_DAYS} AS window_days,
+    r.primary_language,
+    COUNT(*) AS trending_repos_count,
+    SUM(r.events_total) AS events_total,
+    COALESCE(MAX(s.actors_unique), SUM(r.actors_total)) AS actors_total,
+    SUM(r.stars_total) AS stars_total,
+    AVG(r.trend_score) AS avg_trend_score,
+    SUM(r.trend_score) AS total_trend_score,
+    ARRAY_AGG(
+        STRUCT(
+            r.repo_name AS repo_name,
+            r.trend_score AS trend_score,
+            r.events_total AS events_today,
+            r.actors_total AS actors_today,
+            r.stars_total AS stars_today
+        )
+        ORDER BY r.trend_score DESC
+        LIMIT 5
+    ) AS top_repos
+FROM `${MART_DATASET}.trending_repos_rollup` r
+LEFT JOIN sketches s ON s.primary_language = r.primary_language
+WHERE r.event_date = DATE("${DATE}")
+    AND r.window_days = ${WINDOW_DAYS}
+    AND r.primary_language IS NOT NULL
+GROUP BY r.primary_language;
+
+COMMIT TRANSACTION;
 """
 
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--date", required=True, help="YYYY-MM-DD (UTC)")
@@ -119,28 +315,115 @@ def main() -> None:
 
     settings = Settings.load()
     bq = BQQueryRunner(settings)
+    with record_run(bq, settings, "compute", vars(args)):
+        compute_date(bq, settings, args.date)
+    print("Compute done.")
 
 
-    # clean existing rows for this date
-    cleanup_sql = f"""
-    DELETE FROM `{settings.mart_dataset}.alerts_daily` WHERE event_date = DATE("{args.date}");
-    DELETE FROM `{settings.mart_dataset}.daily_summary` WHERE event_date = DATE("{args.date}");
+def rollup_nodes(bq: BQQueryRunner, settings: Settings, date_str: str) -> list[Node]:
     """
+    DAG nodes that roll the 7- and 30-day repo and language windows forward to date_str, or sum them
+    from scratch every ROLLUP_RECOMPUTE_DAYS days. Each node replaces its rows in one transaction.
+    """
+    roll_forward = date.fromisoformat(date_str).toordinal() % ROLLUP_RECOMPUTE_DAYS != 0
 
-    print(f"Cleaning up existing alerts for date {args.date} ...")
-    bq.run(cleanup_sql, job_config=bigquery.QueryJobConfig(labels={"step": "compute_alerts_cleanup"}))
+    def step(name: str, sql: str, days: int):
+        def run() -> None:
+            print(f"Updating {name} for date {date_str} ...")
+            extra = {"DATE": date_str, "WINDOW_DAYS": str(days), "ROLL_FORWARD": str(roll_forward).upper()}
+            run_transaction(bq, settings, sql, extra, f"compute_{name}")
+        return run
 
-    print(f"Inserting repo alerts for date {args.date} ...")
-    bq.run(ALERTS_INSERT_SQL, extra={"DATE": args.date}, job_config=bigquery.QueryJobConfig(labels={"step": "compute_repo_alerts"}))
+    nodes = []
+    for window, days in ROLLUP_WINDOWS.items():
+        nodes.append(Node(f"repo_rollup_{window}", step(f"repo_rollup_{window}", REPO_ROLLUP_SQL, days)))
+        nodes.append(Node(
+            f"language_rollup_{window}", step(f"language_rollup_{window}", LANGUAGE_ROLLUP_SQL, days),
+            deps={f"repo_rollup_{window}"},
+        ))
+    return nodes
 
-    print(f"Inserting language alerts for date {args.date} ...")
-    bq.run(LANG_ALERTS_INSERT_SQL, extra={"DATE": args.date}, job_config=bigquery.QueryJobConfig(labels={"step": "compute_language_alerts"}))
 
-    print(f"Inserting daily summary for date {args.date} ...")
-    bq.run(SUMMARY_INSERT_SQL, extra={"DATE": args.date}, job_config=bigquery.QueryJobConfig(labels={"step": "compute_daily_summary"}))
-    
-    print("Compute done.")
+def update_rollups(bq: BQQueryRunner, settings: Settings, date_str: str, max_jobs: int | None = None) -> None:
+    """Only the rolling windows of one date (see rollup_nodes); backfill runs this in date order."""
+    nodes = rollup_nodes(bq, settings, date_str)
+    run_dag(nodes, max_jobs=max_jobs or settings.max_jobs)
+    if settings.api_url:
+        notify_invalidate(settings.api_url, date_str, settings.cache_invalidate_token)
+
+
+def run_transaction(bq: BQQueryRunner, settings: Settings, script: str, extra: dict, step: str) -> None:
+    """Run a script that writes in one transaction; retry it when a concurrent transaction cancels it."""
+    for attempt in range(1, TRANSACTION_ATTEMPTS + 1):
+        try:
+            bq.run(script, extra=extra, labels={"step": step}, max_bytes=settings.max_bytes_compute)
+            return
+        except Exception as e:
+            if attempt == TRANSACTION_ATTEMPTS or not any(c in str(e).lower() for c in TRANSACTION_CONFLICTS):
+                raise
+            print(f"  transaction conflict in {step}, retrying ({attempt}/{TRANSACTION_ATTEMPTS - 1})")
+            time.sleep(0.5 * 2 ** attempt)
+
+
+def publish_date(
+    bq: BQQueryRunner, settings: Settings, date_str: str, staged: bool = False, provisional: bool = False
+) -> None:
+    """
+    Build the date's alerts and replace its alerts_daily and daily_summary rows in one script
+    (ALERTS_STAGE_SQL + PUBLISH_SQL). With staged=True repo alerts come from repo_alerts_staging.
+    provisional=True marks the summary as a day still in progress (the API caches it briefly).
+    A transaction cancelled by a concurrent one is retried.
+    """
+    repo_alerts = STAGED_REPO_ALERTS_SQL if staged else REPO_ALERTS_SQL
+    script = ALERTS_STAGE_SQL.replace("${REPO_ALERTS}", repo_alerts) + PUBLISH_SQL
+    print(f"Publishing alerts and summary for date {date_str} ...")
+    extra = {"DATE": date_str, "PROVISIONAL": "TRUE" if provisional else "FALSE"}
+    run_transaction(bq, settings, script, extra, "compute_publish")
+
+
+def compute_date(
+    bq: BQQueryRunner, settings: Settings, date_str: str, max_jobs: int | None = None, rollups: bool = True,
+    provisional: bool = False,
+) -> None:
+    """
+    Rebuild alerts and the daily summary (published atomically, see publish_date) and, unless
+    rollups=False, the rolling windows for one date; then publish it to the API. pipeline.hourly
+    passes provisional=True for the day in progress.
+    """
+    def numpy_repo_alerts() -> None:
+        # NumPy is only imported with SCORING_ENGINE=numpy; the API imports this module too
+        from pipeline.scoring import ENRICHED_SQL, repo_alert_rows
+
+        print(f"Staging repo alerts (NumPy) for date {date_str} ...")
+        enriched = bq.query(ENRICHED_SQL, params={"date": date_str})
+        rows = repo_alert_rows(enriched, settings, date_str, datetime.now(timezone.utc).isoformat())
+        if rows:
+            bq.load_rows("${STG_DATASET}.repo_alerts_staging", rows, partition_date=date_str)
+        else:
+            bq.run(DELETE_STAGED_ALERTS_SQL, extra={"DATE": date_str}, labels={"step": "compute_stage_repo_alerts"})
+
+    publish = Node("publish", lambda: publish_date(
+        bq, settings, date_str, staged=settings.scoring_engine == "numpy", provisional=provisional
+    ))
+    nodes = [publish]
+    if settings.scoring_engine == "numpy":
+        nodes.append(Node("repo_alerts", numpy_repo_alerts))
+        publish.deps.add("repo_alerts")
+    if rollups:
+        nodes += rollup_nodes(bq, settings, date_str)
+    started = time.monotonic()
+    run_dag(nodes, max_jobs=max_jobs or settings.max_jobs)
+    print_report(nodes, time.monotonic() - started)
+
+    if settings.snapshot_dir:
+        print(f"Writing serving snapshot for date {date_str} ...")
+        path = write_snapshot(bq, date_str, settings.snapshot_dir)
+        print(f"Snapshot written to {path}")
+
+    if settings.api_url:
+        print(f"Invalidating API cache for date {date_str} ...")
+        notify_invalidate(settings.api_url, date_str, settings.cache_invalidate_token)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -13,8 +13,52 @@ def _opt(name: str, default: str) -> str:
     val = os.getenv(name, "").strip()
     return val if val else default
 
+def _opt_bool(name: str, default: bool) -> bool:
+    return _opt(name, "true" if default else "false").lower() in ("1", "true", "yes")
+
+@dataclass(frozen=True)
+class PayloadField:
+    """A typed column projected out of the event payload at extract time."""
+    column: str
+    bq_type: str
+    event_type: str
+    json_path: str
+
+# column:TYPE:EventType:json.path - the path is relative to the payload root
+DEFAULT_PAYLOAD_FIELDS = (
+    "push_commits:INT64:PushEvent:size,"
+    "pr_action:STRING:PullRequestEvent:action,"
+    "pr_merged:BOOL:PullRequestEvent:pull_request.merged,"
+    "issue_action:STRING:IssuesEvent:action"
+)
+
+def _payload_fields(spec: str) -> tuple[PayloadField, ...]:
+    fields = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        parts = item.split(":")
+        if len(parts) != 4:
+            raise ValueError(f"PAYLOAD_FIELDS entry '{item}' must look like column:TYPE:EventType:json.path")
+        column, bq_type, event_type, path = parts
+        if not column.isidentifier():
+            raise ValueError(f"PAYLOAD_FIELDS entry '{item}' has invalid column name '{column}'")
+        if bq_type.upper() not in ("INT64", "FLOAT64", "STRING", "BOOL"):
+            raise ValueError(f"PAYLOAD_FIELDS entry '{item}' has unsupported type '{bq_type}'")
+        fields.append(PayloadField(column, bq_type.upper(), event_type, f"$.{path}"))
+    return tuple(fields)
+
+def _weights(spec: str) -> tuple[float, float, float]:
+    parts = [float(p) for p in spec.split(",")]
+    if len(parts) != 3:
+        raise ValueError(f"TREND_WEIGHTS must be three comma separated numbers (events,actors,stars), got '{spec}'")
+    return parts[0], parts[1], parts[2]
+
 @dataclass(frozen=True)
 class Settings:
+    # Execution backend: "bigquery" or "duckdb" (local, offline)
+    engine: str
+    local_db_path: str
+    local_data_dir: str
+
     gcp_project_id: str
     bq_location: str
 
@@ -25,22 +69,103 @@ class Settings:
     source_events_project: str
     source_events_dataset: str
     source_repos_table: str
+    # repo_dim looks up repos it has not seen, and existing ones again after this many days (0 = never).
+    # The local engine looks them up through a SQLite cache at repo_cache_path unless repo_cache is off.
+    repo_dim_refresh_days: int
+    repo_cache: bool
+    repo_cache_path: str
+
+    # Payload projection at extract time
+    payload_fields: tuple[PayloadField, ...]
+    keep_raw_payload: bool
 
     lookback_days: int
     min_events_threshold: int
 
+    # Distinct actors: daily_repo_activity keeps an HLL sketch (precision 10-16) of each repo-day's
+    # actors; actors_unique is exact COUNT(DISTINCT) unless EXACT_ACTOR_COUNTS=false (sketch estimate)
+    hll_precision: int
+    exact_actor_counts: bool
+    # Repos kept per language, metric and day (or hour) in language_top_repos (pipeline/heavy_hitters.py)
+    heavy_hitters_capacity: int
+
+    # Trend scoring: "sql" (SQL models) or "numpy" (pipeline/scoring.py); both use the same parameters
+    scoring_engine: str
+    # z-score weights of events, actors and stars in trend_score
+    trend_weights: tuple[float, float, float]
+
     # Alerts
+    severity_z_high: float
+    severity_z_medium: float
+    severity_growth_high: float
+    severity_growth_medium: float
+    # Language alerts are graded on avg_trend_score
+    language_severity_high: float
+    language_severity_medium: float
     alert_z_threshold_low: float
     alert_growth_threshold_low: float
     max_repo_alerts: int
     max_language_alerts: int
 
+    # Byte budgets checked by a dry run before each job and set as maximum_bytes_billed (0 = none).
+    # The extract budget is per extracted day; transform and compute budgets are per job.
+    max_bytes_extract: int
+    max_bytes_transform: int
+    max_bytes_compute: int
+
+    # Run manifests (pipeline/telemetry.py); RECORD_RUNS also appends them to mart_github.pipeline_runs
+    run_manifest_dir: str
+    record_runs: bool
+
+    # Concurrent BigQuery jobs for transform/compute DAG nodes
+    max_jobs: int
+
+    # API response cache
+    cache_max_entries: int
+    cache_max_bytes: int
+    cache_volatile_ttl_s: float
+    # Final (published) dates expire too, since compute's invalidation reaches only API_URL; None = never
+    cache_final_ttl_s: float | None
+    # Repos whose finalized daily points the API keeps for the history endpoints
+    history_cache_max_repos: int
+    # API query concurrency
+    api_max_concurrent_queries: int
+    api_query_timeout_s: float
+    # Rows per chunk streamed by /export/{table}
+    export_batch_rows: int
+
+    # Per-date Arrow snapshots written by compute and served by the API ("" = disabled)
+    snapshot_dir: str
+    # Dates whose snapshots the API keeps memory-mapped
+    snapshot_max_dates: int
+
+    # Base URL of a running API; compute asks it to drop cached entries for rewritten dates
+    api_url: str
+    # Shared secret for POST /cache/invalidate, sent by compute as a bearer token ("" = endpoint disabled)
+    cache_invalidate_token: str
+
     # TODO summary tops
 
     @staticmethod
     def load() -> Settings:
+        engine = _opt("PIPELINE_ENGINE", "bigquery").lower()
+        if engine not in ("bigquery", "duckdb"):
+            raise ValueError(f"PIPELINE_ENGINE must be 'bigquery' or 'duckdb', got '{engine}'.")
+        scoring_engine = _opt("SCORING_ENGINE", "sql").lower()
+        if scoring_engine not in ("sql", "numpy"):
+            raise ValueError(f"SCORING_ENGINE must be 'sql' or 'numpy', got '{scoring_engine}'.")
+
+        hll_precision = int(_opt("HLL_PRECISION", "14"))
+        if not 10 <= hll_precision <= 16:
+            raise ValueError(f"HLL_PRECISION must be between 10 and 16, got {hll_precision}.")
+
         return Settings(
-            gcp_project_id=_req("GCP_PROJECT_ID"),
+            engine=engine,
+            local_db_path=_opt("LOCAL_DB_PATH", "local/pipeline.duckdb"),
+            local_data_dir=_opt("LOCAL_DATA_DIR", "local/data"),
+
+            # The local engine does not talk to GCP, so a project is only required for BigQuery
+            gcp_project_id=_req("GCP_PROJECT_ID") if engine == "bigquery" else _opt("GCP_PROJECT_ID", "local"),
             bq_location=_opt("BQ_LOCATION", "US"),
 
             raw_dataset=_opt("RAW_DATASET", "raw_github"),
@@ -50,12 +175,53 @@ class Settings:
             source_events_project=_opt("SOURCE_EVENTS_PROJECT", "githubarchive"),
             source_events_dataset=_opt("SOURCE_EVENTS_DATASET", "day"),
             source_repos_table=_opt("SOURCE_REPOS_TABLE", "bigquery-public-data.github_repos.sample_repos"),
+            repo_dim_refresh_days=int(_opt("REPO_DIM_REFRESH_DAYS", "30")),
+            repo_cache=_opt_bool("REPO_CACHE", True),
+            repo_cache_path=_opt("REPO_CACHE_PATH", "local/repo_cache.sqlite"),
+
+            payload_fields=_payload_fields(os.getenv("PAYLOAD_FIELDS", DEFAULT_PAYLOAD_FIELDS)),
+            keep_raw_payload=_opt_bool("KEEP_RAW_PAYLOAD", True),
 
             lookback_days=int(_opt("LOOKBACK_DAYS", "14")),
             min_events_threshold=int(_opt("MIN_EVENTS_THRESHOLD", "50")),
 
+            hll_precision=hll_precision,
+            exact_actor_counts=_opt_bool("EXACT_ACTOR_COUNTS", True),
+            heavy_hitters_capacity=int(_opt("HEAVY_HITTERS_CAPACITY", "100")),
+
+            scoring_engine=scoring_engine,
+            trend_weights=_weights(_opt("TREND_WEIGHTS", "0.6,0.3,0.1")),
+
+            severity_z_high=float(_opt("SEVERITY_Z_HIGH", "6")),
+            severity_z_medium=float(_opt("SEVERITY_Z_MEDIUM", "4")),
+            severity_growth_high=float(_opt("SEVERITY_GROWTH_HIGH", "10")),
+            severity_growth_medium=float(_opt("SEVERITY_GROWTH_MEDIUM", "5")),
+            language_severity_high=float(_opt("LANGUAGE_SEVERITY_HIGH", "6")),
+            language_severity_medium=float(_opt("LANGUAGE_SEVERITY_MEDIUM", "4")),
             alert_z_threshold_low=float(_opt("ALERT_Z_THRESHOLD_LOW", "3")),
             alert_growth_threshold_low=float(_opt("ALERT_GROWTH_THRESHOLD_LOW", "3")),
             max_repo_alerts=int(_opt("MAX_REPO_ALERTS", "50")),
             max_language_alerts=int(_opt("MAX_LANGUAGE_ALERTS", "20")),
+
+            max_bytes_extract=int(_opt("MAX_BYTES_EXTRACT", str(200 * 1024**3))),
+            max_bytes_transform=int(_opt("MAX_BYTES_TRANSFORM", str(50 * 1024**3))),
+            max_bytes_compute=int(_opt("MAX_BYTES_COMPUTE", str(5 * 1024**3))),
+
+            run_manifest_dir=_opt("RUN_MANIFEST_DIR", "local/runs"),
+            record_runs=_opt_bool("RECORD_RUNS", False),
+
+            max_jobs=int(_opt("MAX_JOBS", "4")),
+
+            cache_max_entries=int(_opt("CACHE_MAX_ENTRIES", "1024")),
+            cache_max_bytes=int(_opt("CACHE_MAX_MB", "64")) * 1024 * 1024,
+            cache_volatile_ttl_s=float(_opt("CACHE_VOLATILE_TTL_SECONDS", "60")),
+            cache_final_ttl_s=float(_opt("CACHE_FINAL_TTL_SECONDS", "86400")) or None,
+            history_cache_max_repos=int(_opt("HISTORY_CACHE_MAX_REPOS", "10000")),
+            api_max_concurrent_queries=int(_opt("API_MAX_CONCURRENT_QUERIES", "8")),
+            api_query_timeout_s=float(_opt("API_QUERY_TIMEOUT_SECONDS", "30")),
+            export_batch_rows=int(_opt("EXPORT_BATCH_ROWS", "10000")),
+            snapshot_dir=_opt("SNAPSHOT_DIR", ""),
+            snapshot_max_dates=int(_opt("SNAPSHOT_MAX_DATES", "8")),
+            api_url=_opt("API_URL", ""),
+            cache_invalidate_token=_opt("CACHE_INVALIDATE_TOKEN", ""),
         )
\ No newline at end of file
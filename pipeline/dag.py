@@ -0,0 +1,164 @@
+"""
+Dependency-aware parallel executor for SQL models and compute steps.
+
+A SQL file's dependencies come from its `${RAW|STG|MART_DATASET}.table` references: tables it
+INSERTs into, DELETEs from, CREATEs or MERGEs into are its outputs, every other referenced table
+is an input. A node waits for all nodes that write one of its inputs; files that write nothing
+(exploratory queries) are not models and are left out. Ready nodes run concurrently on a thread
+pool; the jobs themselves run in BigQuery (or DuckDB), so threads only wait.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+TABLE_REF = re.compile(r"`\$\{(RAW|STG|MART)_DATASET\}\.(\w+)`")
+WRITE_REF = re.compile(
+    r"\b(?:INSERT\s+INTO|DELETE\s+FROM|MERGE(?:\s+INTO)?|UPDATE|TRUNCATE\s+TABLE"
+    r"|CREATE\s+(?:OR\s+REPLACE\s+)?TABLE(?:\s+IF\s+NOT\s+EXISTS)?)\s+"
+    r"`\$\{(RAW|STG|MART)_DATASET\}\.(\w+)`",
+    re.IGNORECASE,
+)
+
+
+def table_refs(sql: str) -> tuple[set[str], set[str]]:
+    """(reads, writes) as "STG.table" style names. A table the file writes is not also a read."""
+    writes = {f"{ds}.{table}" for ds, table in WRITE_REF.findall(sql)}
+    reads = {f"{ds}.{table}" for ds, table in TABLE_REF.findall(sql)} - writes
+    return reads, writes
+
+
+@dataclass
+class Node:
+    name: str
+    run: Callable[[], Any]
+    deps: set[str] = field(default_factory=set)
+    reads: set[str] = field(default_factory=set)
+    writes: set[str] = field(default_factory=set)
+    started: float | None = None
+    finished: float | None = None
+
+    @property
+    def seconds(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+def link(nodes: list[Node]) -> list[Node]:
+    """
+    Fill in deps from reads/writes. Readers depend on every writer of the table; several writers
+    of one table keep their list order, so a DELETE/CREATE file listed first precedes appenders.
+    """
+    writers: dict[str, list[Node]] = {}
+    for node in nodes:
+        for table in node.writes:
+            previous = writers.setdefault(table, [])
+            node.deps.update(n.name for n in previous)
+            previous.append(node)
+    for node in nodes:
+        for table in node.reads:
+            node.deps.update(n.name for n in writers.get(table, []) if n is not node)
+    check_acyclic(nodes)
+    return nodes
+
+
+def check_acyclic(nodes: list[Node]) -> None:
+    by_name = {n.name: n for n in nodes}
+    for node in nodes:
+        missing = node.deps - by_name.keys()
+        if missing:
+            raise ValueError(f"{node.name} depends on unknown nodes: {sorted(missing)}")
+    done: set[str] = set()
+    remaining = list(nodes)
+    while remaining:
+        ready = [n for n in remaining if n.deps <= done]
+        if not ready:
+            raise ValueError(f"Dependency cycle between: {sorted(n.name for n in remaining)}")
+        done.update(n.name for n in ready)
+        remaining = [n for n in remaining if n.name not in done]
+
+
+def levels(nodes: list[Node]) -> list[list[Node]]:
+    """Nodes grouped into waves that can run together, for printing the plan."""
+    done: set[str] = set()
+    remaining = list(nodes)
+    waves = []
+    while remaining:
+        wave = [n for n in remaining if n.deps <= done]
+        waves.append(wave)
+        done.update(n.name for n in wave)
+        remaining = [n for n in remaining if n.name not in done]
+    return waves
+
+
+def run_dag(nodes: list[Node], max_jobs: int = 4) -> list[Node]:
+    """
+    Run every node once its deps have finished, at most max_jobs at a time.
+    On the first failure no new nodes start; running ones finish and the error is re-raised.
+    """
+    check_acyclic(nodes)
+    pending = list(nodes)
+    done: set[str] = set()
+    running: dict[Future, Node] = {}
+    error: BaseException | None = None
+
+    def call(node: Node) -> None:
+        node.started = time.monotonic()
+        try:
+            node.run()
+        finally:
+            node.finished = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max(max_jobs, 1)) as pool:
+        while pending or running:
+            if error is None:
+                for node in [n for n in pending if n.deps <= done][: max_jobs - len(running)]:
+                    pending.remove(node)
+                    running[pool.submit(call, node)] = node
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                node = running.pop(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                else:
+                    done.add(node.name)
+    if error is not None:
+        raise error
+    return nodes
+
+
+def critical_path(nodes: Iterable[Node]) -> list[Node]:
+    """The chain of dependencies with the largest summed run time (the lower bound on wall time)."""
+    by_name = {n.name: n for n in nodes}
+    cost: dict[str, float] = {}
+    via: dict[str, str | None] = {}
+    for wave in levels(list(by_name.values())):
+        for node in wave:
+            prev = max(node.deps, key=lambda d: cost[d], default=None)
+            cost[node.name] = node.seconds + (cost[prev] if prev else 0.0)
+            via[node.name] = prev
+    if not cost:
+        return []
+    name: str | None = max(cost, key=cost.get)
+    path = []
+    while name is not None:
+        path.append(by_name[name])
+        name = via[name]
+    return path[::-1]
+
+
+def print_report(nodes: list[Node], wall_seconds: float) -> None:
+    print(f"\nNode timings (wall {wall_seconds:.2f}s):")
+    for node in sorted(nodes, key=lambda n: n.started or 0.0):
+        print(f" - {node.name}: {node.seconds:.2f}s")
+    path = critical_path(nodes)
+    print(f"Critical path ({sum(n.seconds for n in path):.2f}s):")
+    for node in path:
+        print(f" - {node.name}: {node.seconds:.2f}s")
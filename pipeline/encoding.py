@@ -0,0 +1,34 @@
+"""
+JSON responses for the API without a second pass through pydantic.
+
+Mart rows already have the shape of the api_models: the table schemas and the endpoint queries fix
+every column's name and type. Endpoints therefore return their rows as a JSONBytesResponse, which
+FastAPI sends as-is instead of validating each row against the response_model and re-encoding it.
+The models still describe the responses in the OpenAPI schema. Rows are encoded with orjson when it
+is installed (poetry install --extras json), and with the json module otherwise.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=str)
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
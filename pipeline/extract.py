@@ -3,54 +3,167 @@ from __future__ import annotations
 import argparse
 from datetime import date
 
-from google.cloud import bigquery
-
 from pipeline.config import Settings
-from pipeline.bq import BQQueryRunner
+from pipeline.bq import BQQueryRunner, QueryResult
+from pipeline import dictionary, ingest
+from pipeline.telemetry import record_run
 
 def yyyymmdd(d: date) -> str:
     return d.strftime("%Y%m%d")
 
-# Query hard coded as it is part of the application logic
+# Query hard coded as it is part of the application logic.
+# ${RECORD_REPOS} records the new repo names of `extracted` in stg.repo_ids (pipeline.dictionary).
 EXTRACT_SQL = """
 -- Extract a single day from GH Archive into the raw table.
-DECLARE target_date DATE DEFAULT DATE("${DATE}");
-
-INSERT INTO `${RAW_DATASET}.events` (event_date, created_at, type, repo_name, actor_login, payload)
+CREATE TEMP TABLE extracted AS
 SELECT
-  target_date AS event_date,
+  DATE("${DATE}") AS event_date,
   created_at,
   type,
   repo.name AS repo_name,
   actor.login AS actor_login,
-  TO_JSON(payload) AS payload
+  ${PAYLOAD_RAW} AS payload${PAYLOAD_SELECT}
 FROM `${SOURCE_PROJECT}.${SOURCE_DATASET}.${SOURCE_TABLE}`
-WHERE DATE(created_at) = target_date;
+WHERE DATE(created_at) = DATE("${DATE}");
+${RECORD_REPOS}
+INSERT INTO `${RAW_DATASET}.events` (event_date, created_at, type, repo_name, actor_login, repo_id, actor_id, payload${PAYLOAD_COLUMNS})
+SELECT
+  event_date, created_at, type, repo_name, actor_login,
+  FARM_FINGERPRINT(repo_name) AS repo_id,
+  FARM_FINGERPRINT(actor_login) AS actor_id,
+  payload${PAYLOAD_COLUMNS}
+FROM extracted;
 """
 
-def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--date", required=True, help="YYYY-MM-DD (UTC)")
-    args = parser.parse_args()
+# Several days in one scan of the wildcard table; deleting the range first makes a rerun idempotent
+EXTRACT_RANGE_SQL = """
+-- Extract an inclusive range of days from GH Archive into the raw table.
+DELETE FROM `${RAW_DATASET}.events`
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}");
 
-    settings = Settings.load()
-    bq_runner = BQQueryRunner(settings)
+CREATE TEMP TABLE extracted AS
+SELECT
+  DATE(created_at) AS event_date,
+  created_at,
+  type,
+  repo.name AS repo_name,
+  actor.login AS actor_login,
+  ${PAYLOAD_RAW} AS payload${PAYLOAD_SELECT}
+FROM `${SOURCE_PROJECT}.${SOURCE_DATASET}.*`
+WHERE _TABLE_SUFFIX BETWEEN "${SUFFIX_FROM}" AND "${SUFFIX_TO}"
+  AND DATE(created_at) BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}");
+${RECORD_REPOS}
+INSERT INTO `${RAW_DATASET}.events` (event_date, created_at, type, repo_name, actor_login, repo_id, actor_id, payload${PAYLOAD_COLUMNS})
+SELECT
+  event_date, created_at, type, repo_name, actor_login,
+  FARM_FINGERPRINT(repo_name) AS repo_id,
+  FARM_FINGERPRINT(actor_login) AS actor_id,
+  payload${PAYLOAD_COLUMNS}
+FROM extracted;
+"""
+
+def payload_projection(settings: Settings) -> dict[str, str]:
+    """
+    SQL fragments that parse the configured payload fields (PAYLOAD_FIELDS) into typed columns.
+    Each column is NULL for other event types; the raw payload is kept only if KEEP_RAW_PAYLOAD is set.
+    """
+    select = "".join(
+        f",\n  IF(type = '{f.event_type}', SAFE_CAST(JSON_VALUE(payload, '{f.json_path}') AS {f.bq_type}), NULL) AS {f.column}"
+        for f in settings.payload_fields
+    )
+    return {
+        "PAYLOAD_SELECT": select,
+        "PAYLOAD_RAW": "TO_JSON(payload)" if settings.keep_raw_payload else "NULL",
+        "RECORD_REPOS": dictionary.record_sql("extracted"),
+    }
 
-    d = date.fromisoformat(args.date)
+def extract_range(bq_runner: BQQueryRunner, settings: Settings, date_from: date, date_to: date) -> QueryResult:
+    """Replace raw events for [date_from, date_to] with one query over the GH Archive wildcard table."""
+    projection = payload_projection(settings)
+    # Substituted first: render_sql replaces the dataset placeholders before the extra keys
+    sql = EXTRACT_RANGE_SQL.replace("${RECORD_REPOS}", projection.pop("RECORD_REPOS"))
+    extra = {
+        **projection,
+        "DATE_FROM": date_from.isoformat(),
+        "DATE_TO": date_to.isoformat(),
+        "SUFFIX_FROM": yyyymmdd(date_from),
+        "SUFFIX_TO": yyyymmdd(date_to),
+        "SOURCE_PROJECT": settings.source_events_project,
+        "SOURCE_DATASET": settings.source_events_dataset,
+    }
+    labels = {"project": "github-trend-pipeline", "step": "extract_range"}
+    days = (date_to - date_from).days + 1
+    return bq_runner.run(sql, extra=extra, labels=labels, max_bytes=settings.max_bytes_extract * days)
+
+def extract_date(bq_runner: BQQueryRunner, settings: Settings, date_str: str) -> QueryResult:
+    """Copy one day of GH Archive events (githubarchive.day.YYYYMMDD) into raw_github.events."""
     # Target github archive table
-    src_table = yyyymmdd(d)
+    src_table = yyyymmdd(date.fromisoformat(date_str))
+    projection = payload_projection(settings)
 
     sql = (EXTRACT_SQL
-           .replace("${DATE}", args.date)
+           .replace("${PAYLOAD_SELECT}", projection["PAYLOAD_SELECT"])
+           .replace("${PAYLOAD_RAW}", projection["PAYLOAD_RAW"])
+           .replace("${RECORD_REPOS}", projection["RECORD_REPOS"])
+           .replace("${DATE}", date_str)
            .replace("${SOURCE_PROJECT}", settings.source_events_project)
            .replace("${SOURCE_DATASET}", settings.source_events_dataset)
            .replace("${SOURCE_TABLE}", src_table))
-    
-    # User job config with labels - helps with cost tracking
-    job_config = bigquery.QueryJobConfig(labels={"project": "github-trend-pipeline", "step": "extract"})
 
-    print(f"Extracting {args.date} from `githubarchive.day.{src_table}` into `{settings.raw_dataset}.events` ...")
-    res = bq_runner.run(sql, job_config=job_config)
+    # Job labels - helps with cost tracking
+    labels = {"project": "github-trend-pipeline", "step": "extract"}
+
+    print(f"Extracting {date_str} from `githubarchive.day.{src_table}` into `{settings.raw_dataset}.events` ...")
+    return bq_runner.run(sql, labels=labels, max_bytes=settings.max_bytes_extract)
+
+def extract_files(args: argparse.Namespace, settings: Settings) -> None:
+    """
+    Alternate mode: aggregate local GH Archive hour files straight into daily_repo_activity rows,
+    skipping raw_github.events and the staging model entirely. New repo names are recorded in
+    stg.repo_ids, also with --output.
+    """
+    files = ingest.hour_files(args.source_dir, args.date)
+    if not files:
+        raise SystemExit(f"No GH Archive files for {args.date} under: {args.source_dir}")
+
+    bq_runner = BQQueryRunner(settings)
+    repos = dictionary.RepoNames(bq_runner)
+
+    def encode(partial: dict[str, ingest.RepoCounters]) -> dict[int, ingest.RepoCounters]:
+        return ingest.encode_ids(partial, repos.ids(partial, args.date))
+
+    with record_run(bq_runner, settings, "extract", vars(args)):
+        print(f"Aggregating {len(files)} hour files from {args.source_dir} ...")
+        counters = ingest.aggregate_files(
+            files, args.date, workers=args.workers, encode=encode, precision=settings.hll_precision
+        )
+        # Python sketches only merge with Python sketches: BigQuery's HLL_COUNT cannot read them
+        sketches = bool(args.output) or settings.engine == "duckdb"
+        rows = ingest.to_activity_rows(args.date, counters, sketches)
+
+        if args.output:
+            ingest.write_parquet(rows, args.output)
+            print(f"Done. Wrote {len(rows)} repo rows to {args.output}")
+            return
+        res = bq_runner.load_rows("${STG_DATASET}.daily_repo_activity", rows, partition_date=args.date)
+    print(f"Done. Loaded {len(rows)} repo rows into `{settings.stg_dataset}.daily_repo_activity` job_id={res.job_id}")
+    print(f"Next: python -m pipeline.transform --date {args.date} --skip-activity")
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--date", required=True, help="YYYY-MM-DD (UTC)")
+    parser.add_argument("--source-dir", help="Read local GH Archive hour files (YYYY-MM-DD-H.json.gz) from this directory instead of BigQuery.")
+    parser.add_argument("--output", help="With --source-dir: write daily_repo_activity rows to this Parquet file instead of loading them.")
+    parser.add_argument("--workers", type=int, default=None, help="With --source-dir: worker processes (default: CPU count).")
+    args = parser.parse_args()
+
+    settings = Settings.load()
+    if args.source_dir:
+        extract_files(args, settings)
+        return
+    bq_runner = BQQueryRunner(settings)
+    with record_run(bq_runner, settings, "extract", vars(args)):
+        res = extract_date(bq_runner, settings, args.date)
     print(f"Done. job_id={res.job_id} processed={res.bytes_processed} billed={res.bytes_billed}")
 
 if __name__ == "__main__":
@@ -0,0 +1,191 @@
+"""
+Space-Saving heavy-hitter summaries: the top repos of a language by events or stars over any window,
+from a fixed number of counters per language and day.
+
+A SpaceSaving summary of capacity m keeps at most m (item, value, error) counters. Values are upper
+bounds and value - error lower bounds of an item's true total, and an item that is not kept has a
+total of at most min_value() (the smallest kept value; 0 while fewer than m items were seen).
+Summaries merge (Cafaro et al., "A parallel space saving algorithm"): a value missing from one side
+is taken as that side's min_value(), and the m largest results are kept. With N the total weight
+of everything added or merged:
+
+- every error, and min_value(), is at most N / m;
+- every item whose true total exceeds N / m is kept;
+- an item of top(k) is certainly in the true top k when value - error >= the (k+1)-th value.
+
+sql/30_marts/03_language_top_repos.sql writes one exact summary (error 0) per language, metric and
+day to language_top_repos; pipeline.hourly writes one per hour for the current day. merge_rows
+folds them into a window, so memory and work grow with days x capacity, not with the repos active.
+EXACT_TOP_SQL computes the same list from daily_repo_activity for verification.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections import defaultdict
+from typing import Iterable
+
+# The exact answer for finished days, for checking the summaries (?exact=true on the API)
+EXACT_TOP_SQL = """
+SELECT n.repo_name, CAST(SUM(IF(@metric = 'stars', a.stars, a.events_total)) AS INT64) AS value, 0 AS error
+FROM `${STG_DATASET}.daily_repo_activity` a
+JOIN `${STG_DATASET}.repo_names` n
+ON a.repo_id = n.repo_id
+LEFT JOIN (
+    SELECT repo_id, primary_language
+    FROM `${STG_DATASET}.repo_dim`
+    WHERE true
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY repo_id ORDER BY looked_up_at DESC) = 1
+) d
+ON a.repo_id = d.repo_id
+WHERE a.event_date BETWEEN DATE(@date_from) AND DATE(@date_to)
+    AND COALESCE(d.primary_language, 'Unknown') = @language
+GROUP BY n.repo_name
+HAVING value > 0
+ORDER BY value DESC, n.repo_name
+LIMIT @k
+"""
+
+SUMMARIES_SQL = """
+SELECT CAST(event_date AS STRING) AS event_date, hour, capacity, total, top
+FROM `${MART_DATASET}.language_top_repos`
+WHERE event_date BETWEEN DATE(@date_from) AND DATE(@date_to)
+    AND primary_language = @language
+    AND metric = @metric
+"""
+
+# Latest language of the repos of one hour, by repo_id (pipeline.hourly)
+LANGUAGES_SQL = """
+SELECT repo_id, primary_language
+FROM `${STG_DATASET}.repo_dim`
+WHERE repo_id IN UNNEST(@repos)
+QUALIFY ROW_NUMBER() OVER (PARTITION BY repo_id ORDER BY looked_up_at DESC) = 1
+"""
+
+
+class SpaceSaving:
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"Space-Saving capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.total = 0
+        # item -> [value, error]
+        self.counters: dict[str, list[int]] = {}
+        # (value, item) per counter, possibly stale: entries whose value changed are skipped on pop
+        self._heap: list[tuple[int, str]] = []
+
+    def add(self, item: str, weight: int = 1) -> None:
+        """Count weight more for item; when all counters are taken, item replaces the smallest one."""
+        if weight <= 0:
+            return
+        self.total += weight
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.capacity:
+            counter = self.counters[item] = [weight, 0]
+        else:
+            smallest = self._pop_min()
+            floor = self.counters.pop(smallest)[0]
+            counter = self.counters[item] = [floor + weight, floor]
+        heapq.heappush(self._heap, (counter[0], item))
+
+    def update(self, items: Iterable[tuple[str, int]]) -> SpaceSaving:
+        for item, weight in items:
+            self.add(item, weight)
+        return self
+
+    def _pop_min(self) -> str:
+        while True:
+            value, item = heapq.heappop(self._heap)
+            counter = self.counters.get(item)
+            if counter is not None and counter[0] == value:
+                return item
+
+    def min_value(self) -> int:
+        """Upper bound of the total of any item that is not kept."""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(value for value, _ in self.counters.values())
+
+    def merge(self, other: SpaceSaving) -> SpaceSaving:
+        """Fold `other` into this summary (see the module docstring). Returns self."""
+        floor, other_floor = self.min_value(), other.min_value()
+        merged = {}
+        for item in self.counters.keys() | other.counters.keys():
+            value, error = self.counters.get(item, (floor, floor))
+            other_value, other_error = other.counters.get(item, (other_floor, other_floor))
+            merged[item] = [value + other_value, error + other_error]
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda kv: (kv[1][0], kv[0]))
+        self.counters = dict(kept)
+        self._heap = [(counter[0], item) for item, counter in self.counters.items()]
+        heapq.heapify(self._heap)
+        self.total += other.total
+        return self
+
+    def top(self, k: int) -> list[tuple[str, int, int]]:
+        """The k largest (item, value, error), largest first; ties by item."""
+        ranked = sorted(self.counters.items(), key=lambda kv: (-kv[1][0], kv[0]))
+        return [(item, value, error) for item, (value, error) in ranked[:k]]
+
+    def max_error(self) -> int:
+        """Bound on every value's overestimate, N / capacity."""
+        return self.total // self.capacity
+
+    @staticmethod
+    def from_row(capacity: int, total: int, top: list[dict]) -> SpaceSaving:
+        """A summary from a language_top_repos row."""
+        summary = SpaceSaving(capacity)
+        summary.total = total
+        for entry in top:
+            summary.counters[entry["repo_name"]] = [entry["value"], entry["error"]]
+        summary._heap = [(counter[0], item) for item, counter in summary.counters.items()]
+        heapq.heapify(summary._heap)
+        return summary
+
+    def to_row(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "top": [{"repo_name": item, "value": v, "error": e} for item, v, e in self.top(self.capacity)],
+        }
+
+
+def merge_rows(rows: list[dict], capacity: int) -> SpaceSaving:
+    """
+    One summary from the language_top_repos rows of a window. A day with a daily row (hour NULL) uses
+    it and ignores any hour rows; a provisional day merges its hours (a re-folded hour counts once).
+    """
+    days: dict[str, dict[int | None, dict]] = defaultdict(dict)
+    for row in rows:
+        days[row["event_date"]][row["hour"]] = row
+    window = SpaceSaving(capacity)
+    for parts in days.values():
+        for row in [parts[None]] if None in parts else parts.values():
+            window.merge(SpaceSaving.from_row(row["capacity"], row["total"], row["top"]))
+    return window
+
+
+def hour_rows(
+    event_date: str, hour: int, counters: dict, languages: dict[str, str | None], capacity: int
+) -> list[dict]:
+    """language_top_repos rows of one hour from pipeline.ingest counters, exact like the daily model."""
+    values: dict[tuple[str, str], list[tuple[str, int]]] = defaultdict(list)
+    for repo, c in counters.items():
+        language = languages.get(repo) or "Unknown"
+        values[(language, "events")].append((repo, c.events_total))
+        if c.stars > 0:
+            values[(language, "stars")].append((repo, c.stars))
+    rows = []
+    for (language, metric), items in sorted(values.items()):
+        kept = heapq.nsmallest(capacity, items, key=lambda kv: (-kv[1], kv[0]))
+        rows.append({
+            "event_date": event_date,
+            "hour": hour,
+            "primary_language": language,
+            "metric": metric,
+            "capacity": capacity,
+            "total": sum(v for _, v in items),
+            "top": [{"repo_name": repo, "value": v, "error": 0} for repo, v in kept],
+        })
+    return rows
@@ -0,0 +1,164 @@
+"""
+Per-repo time series for /repos/{owner}/{name}/history and /repos/history.
+
+HISTORY_SQL turns the requested names into their ids (FARM_FINGERPRINT, pipeline/dictionary.py)
+and reads those repos over a date range from trending_repos_daily, which is partitioned by
+event_date and clustered by repo_id, so one query serves any number of repos and days. It also
+returns the days that have been computed: a repo missing from one of them did not trend that day.
+A computed day is final once the daily compute has published it (its daily_summary row is not
+provisional); pipeline.hourly computes the current day provisionally.
+
+HistoryCache keeps each repo's days, including the days it did not trend. A dashboard reloading the
+same repos and range runs no query at all, and a longer range only queries the days still missing.
+Final days are kept for CACHE_FINAL_TTL_SECONDS and other days (provisional, or not computed yet) for
+CACHE_VOLATILE_TTL_SECONDS, like the response cache's entries. compute's POST /cache/invalidate?date=...
+drops that date here as well.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Callable
+
+HISTORY_SQL = """
+SELECT
+    CAST(t.event_date AS STRING) AS event_date,
+    n.repo_name,
+    t.events_today,
+    t.actors_today,
+    t.stars_today,
+    t.growth_events_ratio,
+    t.z_events,
+    t.trend_score,
+    CAST(NULL AS BOOL) AS final
+FROM `${MART_DATASET}.trending_repos_daily` t
+JOIN (
+    SELECT FARM_FINGERPRINT(repo_name) AS repo_id, repo_name
+    FROM UNNEST(@repos) AS repo_name
+) n
+ON t.repo_id = n.repo_id
+WHERE t.event_date BETWEEN DATE(@date_from) AND DATE(@date_to)
+
+UNION ALL
+
+-- One row with a NULL repo_name per computed day, and whether the daily compute has published it
+SELECT
+    CAST(d.event_date AS STRING) AS event_date,
+    CAST(NULL AS STRING) AS repo_name,
+    NULL, NULL, NULL, NULL, NULL, NULL,
+    d.event_date IN (
+        SELECT event_date
+        FROM `${MART_DATASET}.daily_summary`
+        WHERE event_date BETWEEN DATE(@date_from) AND DATE(@date_to) AND provisional IS NOT TRUE
+    ) AS final
+FROM (
+    SELECT DISTINCT event_date
+    FROM `${MART_DATASET}.trending_repos_daily`
+    WHERE event_date BETWEEN DATE(@date_from) AND DATE(@date_to)
+) d
+"""
+
+
+def days_between(date_from: str, date_to: str) -> list[str]:
+    first, last = date.fromisoformat(date_from), date.fromisoformat(date_to)
+    return [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+
+
+class HistoryCache:
+    """repo -> {day: point, or None if the repo did not trend}; least recently used repos are evicted."""
+
+    def __init__(
+        self,
+        max_repos: int = 10_000,
+        volatile_ttl_s: float = 60.0,
+        final_ttl_s: float | None = 86400.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_repos = max_repos
+        self.volatile_ttl_s = volatile_ttl_s
+        self.final_ttl_s = final_ttl_s
+        self._clock = clock
+        self._repos: OrderedDict[str, dict[str, dict | None]] = OrderedDict()
+        # Stored days -> when their entries expire (final days with no final_ttl_s never do)
+        self._expires: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(
+        self, repos: list[str], days: list[str]
+    ) -> tuple[dict[str, dict[str, dict | None]], dict[str, list[str]]]:
+        """The cached days of each repo, and the days still missing per repo (repos with none are left out)."""
+        cached: dict[str, dict[str, dict | None]] = {}
+        missing: dict[str, list[str]] = {}
+        with self._lock:
+            now = self._clock()
+            for day in [d for d, expires in self._expires.items() if expires <= now]:
+                self._forget(day)
+            for repo in repos:
+                series = self._repos.get(repo, {})
+                if repo in self._repos:
+                    self._repos.move_to_end(repo)
+                cached[repo] = {d: series[d] for d in days if d in series}
+                gaps = [d for d in days if d not in series]
+                if gaps:
+                    missing[repo] = gaps
+                self.hits += len(days) - len(gaps)
+                self.misses += len(gaps)
+        return cached, missing
+
+    def store(self, rows: list[dict], repos: list[str], days: list[str]) -> dict[str, dict[str, dict]]:
+        """
+        HISTORY_SQL rows for repos over days -> their points by repo and day. Every day is cached, with
+        None where a repo has no row; final days for final_ttl_s, the others for volatile_ttl_s.
+        """
+        final = {r["event_date"] for r in rows if r["repo_name"] is None and r["final"]}
+        points: dict[str, dict[str, dict]] = {repo: {} for repo in repos}
+        for row in rows:
+            if row["repo_name"] is not None:
+                point = {k: v for k, v in row.items() if k not in ("repo_name", "final")}
+                points.setdefault(row["repo_name"], {})[row["event_date"]] = point
+        if self.max_repos <= 0:
+            return points
+        with self._lock:
+            now = self._clock()
+            for day in days:
+                if day not in final:
+                    self._expires[day] = now + self.volatile_ttl_s
+                elif self.final_ttl_s is not None:
+                    self._expires[day] = now + self.final_ttl_s
+                else:
+                    self._expires.pop(day, None)
+            for repo in repos:
+                series = self._repos.setdefault(repo, {})
+                self._repos.move_to_end(repo)
+                for day in days:
+                    series[day] = points[repo].get(day)
+            while len(self._repos) > self.max_repos:
+                self._repos.popitem(last=False)
+        return points
+
+    def invalidate(self, event_date: str | None = None) -> int:
+        """Forget event_date for every repo (everything when no date is given). Returns the repos touched."""
+        with self._lock:
+            if event_date is None:
+                count = len(self._repos)
+                self._repos.clear()
+                self._expires.clear()
+                return count
+            return self._forget(event_date)
+
+    def _forget(self, day: str) -> int:
+        self._expires.pop(day, None)
+        count = 0
+        for series in self._repos.values():
+            if series.pop(day, False) is not False:
+                count += 1
+        return count
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"repos": len(self._repos), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,162 @@
+"""
+HyperLogLog sketches of distinct actors, mergeable across repos and days.
+
+In BigQuery the models build HLL++ sketches with HLL_COUNT.INIT (daily_repo_activity.actors_hll,
+trending_languages_daily.actors_hll) and roll them up with HLL_COUNT.MERGE / MERGE_PARTIAL.
+This module is the Python counterpart for the paths that do not run in BigQuery: the file
+ingester (pipeline/ingest.py) and the local DuckDB engine, which maps the HLL_COUNT functions
+onto init / merge_partial / merge / extract below.
+
+Sketches from this module and from BigQuery use different hashes and encodings and cannot be
+merged with each other, so a warehouse holds sketches from one of the two only.
+
+Small sketches are sparse (only the registers that are set), so a repo-day with a handful of
+actors costs a few bytes instead of 2^precision. Up to about 2.5 * 2^precision distinct values
+the estimate is linear counting, which is exact or off by one for small sets; above that the
+relative standard error is about 1.04 / sqrt(2^precision), 0.8% at precision 14.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import math
+from typing import Iterable
+
+MIN_PRECISION, MAX_PRECISION = 4, 16
+DEFAULT_PRECISION = 14
+
+_VERSION = 1
+_SPARSE, _DENSE = 0, 1
+# A sparse entry is a 2-byte register index and a 1-byte rank
+_SPARSE_ENTRY_BYTES = 3
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _hash(value: str | int) -> int:
+    # Stable across processes (unlike hash()), so partial sketches from ingest workers merge.
+    # Ids hash as their decimal string, like the local engine's hll_init over an INT64 column.
+    # Cached: the same actors come back event after event.
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"HLL precision must be between {MIN_PRECISION} and {MAX_PRECISION}, got {precision}")
+        self.precision = precision
+        self.m = 1 << precision
+        # Register index -> rank while small; a dense bytearray of m registers once that is smaller
+        self.sparse: dict[int, int] | None = {}
+        self.registers: bytearray | None = None
+
+    def add(self, value: str | int) -> None:
+        x = _hash(value)
+        width = 64 - self.precision
+        rest = x & ((1 << width) - 1)
+        self._set(x >> width, width - rest.bit_length() + 1)
+
+    def update(self, values: Iterable[str | int]) -> HyperLogLog:
+        for value in values:
+            self.add(value)
+        return self
+
+    def _set(self, index: int, rank: int) -> None:
+        if self.registers is not None:
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+            return
+        if rank > self.sparse.get(index, 0):
+            self.sparse[index] = rank
+            if len(self.sparse) * _SPARSE_ENTRY_BYTES >= self.m:
+                self._densify()
+
+    def _densify(self) -> None:
+        self.registers = bytearray(self.m)
+        for index, rank in self.sparse.items():
+            self.registers[index] = rank
+        self.sparse = None
+
+    def merge(self, other: HyperLogLog) -> HyperLogLog:
+        """Fold `other` into this sketch: the union of both sets. Returns self."""
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge HLL sketches of precision {self.precision} and {other.precision}")
+        if other.registers is None:
+            for index, rank in other.sparse.items():
+                self._set(index, rank)
+            return self
+        if self.registers is None:
+            self._densify()
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        """Estimated number of distinct values added."""
+        m = self.m
+        if self.registers is None:
+            zeros = m - len(self.sparse)
+            total = zeros + sum(2.0 ** -r for r in self.sparse.values())
+        else:
+            zeros = self.registers.count(0)
+            total = sum(2.0 ** -r for r in self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / total
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        if self.registers is not None:
+            return bytes([_VERSION, self.precision, _DENSE]) + bytes(self.registers)
+        entries = b"".join(
+            ((index << 8) | rank).to_bytes(_SPARSE_ENTRY_BYTES, "big") for index, rank in sorted(self.sparse.items())
+        )
+        return bytes([_VERSION, self.precision, _SPARSE]) + entries
+
+    @staticmethod
+    def from_bytes(data: bytes) -> HyperLogLog:
+        if len(data) < 3 or data[0] != _VERSION:
+            raise ValueError("Not an HLL sketch written by pipeline.hll")
+        sketch = HyperLogLog(data[1])
+        body = data[3:]
+        if data[2] == _DENSE:
+            if len(body) != sketch.m:
+                raise ValueError(f"Dense HLL sketch has {len(body)} registers, expected {sketch.m}")
+            sketch.registers = bytearray(body)
+            sketch.sparse = None
+        else:
+            for i in range(0, len(body), _SPARSE_ENTRY_BYTES):
+                entry = int.from_bytes(body[i:i + _SPARSE_ENTRY_BYTES], "big")
+                sketch.sparse[entry >> 8] = entry & 0xFF
+        return sketch
+
+
+# --- HLL_COUNT equivalents; NULL in, NULL (or 0) out, as in BigQuery ------------
+
+def init(values: Iterable[str | int | None] | None, precision: int = DEFAULT_PRECISION) -> bytes | None:
+    """HLL_COUNT.INIT: a sketch of the non-NULL values, or None if there are none."""
+    present = [v for v in values or () if v is not None]
+    if not present:
+        return None
+    return HyperLogLog(precision).update(present).to_bytes()
+
+
+def merge_partial(sketches: Iterable[bytes | None] | None) -> bytes | None:
+    """HLL_COUNT.MERGE_PARTIAL: the union of the non-NULL sketches, or None if there are none."""
+    merged: HyperLogLog | None = None
+    for data in sketches or ():
+        if data is None:
+            continue
+        sketch = HyperLogLog.from_bytes(data)
+        merged = sketch if merged is None else merged.merge(sketch)
+    return None if merged is None else merged.to_bytes()
+
+
+def extract(sketch: bytes | None) -> int:
+    """HLL_COUNT.EXTRACT: the estimate stored in a sketch; 0 for NULL."""
+    return 0 if sketch is None else HyperLogLog.from_bytes(sketch).count()
+
+
+def merge(sketches: Iterable[bytes | None] | None) -> int:
+    """HLL_COUNT.MERGE: the estimate of the union of the sketches."""
+    return extract(merge_partial(sketches))
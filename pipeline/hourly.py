@@ -0,0 +1,328 @@
+"""
+Near-real-time mode: provisional trending rows for the current UTC day, one GH Archive hour at a time.
+
+Each run folds the newest hour into intraday_repo_activity instead of re-aggregating the day:
+
+1. The hour file is aggregated into per-repo counters (pipeline.ingest), O(events in the hour).
+   Its repos and actors get their ids (pipeline.dictionary), as in extract.
+2. For the repos active in that hour only, their running totals are read, the hour is added (actor
+   sketches are merged with pipeline.hll) and the new totals are appended, O(repos in the hour).
+   The hour's top repos per language go to language_top_repos (pipeline.heavy_hitters).
+3. The day so far is scored against the lookback baseline of repo_baseline_state, scaled to the
+   fraction of the day seen: after h hours the baseline mean and std are multiplied by h / 24, so a
+   repo on track for a normal day scores about 0. MIN_EVENTS_THRESHOLD is scaled the same way.
+   This writes the date's trending_repos_daily partition; trending_repos_enriched,
+   trending_languages_daily, alerts_daily, daily_summary and the snapshot are rebuilt for the date
+   and the API cache is invalidated, as compute does for a finished day.
+
+Steps 1-2 cost O(the hour); step 3 and the rebuilt marts cost O(the day so far), so later hours of a
+day take longer. Hours are folded in order; folding an hour first deletes whatever an earlier attempt
+wrote for it, so re-folding the latest hour gives the same rows and a failed run can be repeated. The next daily run (extract, transform, compute for the date) replaces every provisional
+row with the final ones. Until then GET /intraday?date=... tells whether a date is provisional and
+how many hours it covers. New repos have no repo_dim row until the daily run and show as 'Unknown'.
+
+    python -m pipeline.hourly                         # next hour of today that has not been folded
+    python -m pipeline.hourly --date 2025-10-21 --hour 7 --source-dir local/gharchive
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import math
+import time
+import urllib.error
+import urllib.request
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+from pipeline import dictionary, heavy_hitters, hll, ingest
+from pipeline.bq import BQQueryRunner
+from pipeline.compute import compute_date
+from pipeline.config import Settings
+from pipeline.dag import run_dag
+from pipeline.rolling import METRICS, moments, score
+from pipeline.scoring import DELETE_TRENDING_SQL, to_rows
+from pipeline.telemetry import record_run
+from pipeline.transform import SQL_ROOT, build_nodes
+
+GHARCHIVE_URL = "https://data.gharchive.org/{date}-{hour}.json.gz"
+BASELINE_MODEL = SQL_ROOT / "20_models" / "repo_baseline_state.sql"
+# Marts rebuilt from the provisional trending_repos_daily rows, like transform does for a whole day
+PROVISIONAL_MODELS = [
+    SQL_ROOT / "30_marts" / "01_trending_repos_enriched.sql",
+    SQL_ROOT / "30_marts" / "02_trending_languages_daily.sql",
+]
+COUNTER_COLUMNS = ["events_total", *ingest.EVENT_COUNTERS.values()]
+
+FOLDED_HOURS_SQL = """
+SELECT DISTINCT hour
+FROM `${STG_DATASET}.intraday_hours`
+WHERE event_date = DATE(@date)
+ORDER BY hour
+"""
+
+# The totals before @hour of the repos active in it
+RUNNING_TOTALS_SQL = """
+SELECT repo_id, events_total, actors_hll, pushes, pull_requests, issues, stars, forks
+FROM `${STG_DATASET}.intraday_repo_activity`
+WHERE event_date = DATE(@date)
+    AND updated_hour < @hour
+    AND repo_id IN UNNEST(@repos)
+QUALIFY ROW_NUMBER() OVER (PARTITION BY repo_id ORDER BY updated_hour DESC) = 1
+"""
+
+# The day so far of every repo above the (scaled) threshold, with its baseline window sums
+PROVISIONAL_SQL = """
+WITH today AS (
+    SELECT repo_id, events_total, actors_unique, stars
+    FROM `${STG_DATASET}.intraday_repo_activity`
+    WHERE event_date = DATE(@date)
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY repo_id ORDER BY updated_hour DESC) = 1
+)
+SELECT
+    t.repo_id, t.events_total, t.actors_unique, t.stars,
+    s.days_active, s.sum_events, s.sumsq_events, s.sum_actors, s.sumsq_actors, s.sum_stars, s.sumsq_stars
+FROM today t
+LEFT JOIN `${STG_DATASET}.repo_baseline_state` s
+    ON s.repo_id = t.repo_id
+    AND s.baseline_date = DATE(@baseline_date)
+WHERE t.events_total >= @min_events
+"""
+
+# Clears an hour before it is (re)folded. Its intraday_hours row is written last, so an hour counts as
+# folded only once all of its rows are in.
+DELETE_HOUR_SQL = """
+BEGIN TRANSACTION;
+DELETE FROM `${STG_DATASET}.intraday_repo_activity` WHERE event_date = DATE("${DATE}") AND updated_hour = ${HOUR};
+DELETE FROM `${MART_DATASET}.language_top_repos` WHERE event_date = DATE("${DATE}") AND hour = ${HOUR};
+DELETE FROM `${STG_DATASET}.intraday_hours` WHERE event_date = DATE("${DATE}") AND hour = ${HOUR};
+COMMIT TRANSACTION;
+"""
+
+BASELINE_EXISTS_SQL = """
+SELECT 1 AS present
+FROM `${STG_DATASET}.repo_baseline_state`
+WHERE baseline_date = DATE(@date)
+LIMIT 1
+"""
+
+ACTIVITY_EXISTS_SQL = """
+SELECT 1 AS present
+FROM `${STG_DATASET}.daily_repo_activity`
+WHERE event_date = DATE(@date)
+LIMIT 1
+"""
+
+# GET /intraday: hours folded for a date, and whether the daily run has replaced them
+INTRADAY_STATUS_SQL = """
+SELECT
+    (SELECT COUNT(DISTINCT hour) FROM `${STG_DATASET}.intraday_hours` WHERE event_date = DATE(@date)) AS hours,
+    (SELECT MAX(hour) FROM `${STG_DATASET}.intraday_hours` WHERE event_date = DATE(@date)) AS last_hour,
+    EXISTS (SELECT 1 FROM `${STG_DATASET}.daily_repo_activity` WHERE event_date = DATE(@date)) AS final
+"""
+
+
+def latest_complete_hour(now: datetime | None = None) -> tuple[str, int]:
+    """(date, hour) of the last hour that has ended in UTC."""
+    last = (now or datetime.now(timezone.utc)) - timedelta(hours=1)
+    return last.date().isoformat(), last.hour
+
+
+def fetch_hour(date_str: str, hour: int, source_dir: str | Path) -> Path | None:
+    """The GH Archive file of one hour in source_dir, downloaded if missing; None if not published yet."""
+    path = Path(source_dir) / f"{date_str}-{hour}.json.gz"
+    if path.exists():
+        return path
+    url = GHARCHIVE_URL.format(date=date_str, hour=hour)
+    print(f"Downloading {url} ...")
+    try:
+        with urllib.request.urlopen(url, timeout=120) as response:
+            data = response.read()
+    except urllib.error.HTTPError as e:
+        if e.code == 404:
+            return None
+        raise
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".part")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+    return path
+
+
+def fold_hour(
+    bq: BQQueryRunner, settings: Settings, date_str: str, hour: int, counters: dict[str, ingest.RepoCounters]
+) -> int:
+    """
+    Add one hour's counters to the running totals of the repos active in it, replacing the rows of an
+    earlier attempt at the hour. Returns the repos.
+    """
+    repo_ids = dictionary.RepoNames(bq).ids(counters, date_str)
+    encoded = ingest.encode_ids(counters, repo_ids)
+    repos = sorted(encoded)
+    previous = {}
+    if repos:
+        previous = {
+            r["repo_id"]: r
+            for r in bq.query(RUNNING_TOTALS_SQL, params={"date": date_str, "hour": hour, "repos": repos})
+        }
+    rows = []
+    for repo in repos:
+        c, prev = encoded[repo], previous.get(repo)
+        sketch = c.actors
+        if prev is not None and prev["actors_hll"] is not None:
+            sketch = hll.HyperLogLog.from_bytes(prev["actors_hll"]).merge(sketch)
+        row = {"event_date": date_str, "repo_id": repo, "updated_hour": hour}
+        for column in COUNTER_COLUMNS:
+            row[column] = getattr(c, column) + (prev[column] if prev is not None else 0)
+        row["actors_unique"] = sketch.count()
+        row["actors_hll"] = base64.b64encode(sketch.to_bytes()).decode("ascii")
+        rows.append(row)
+
+    bq.run(DELETE_HOUR_SQL, extra={"DATE": date_str, "HOUR": str(hour)}, step="hourly_fold")
+    if rows:
+        bq.load_rows("${STG_DATASET}.intraday_repo_activity", rows)
+        # The hour's heavy-hitter summaries per language, by name; the daily model replaces them
+        by_id = {
+            r["repo_id"]: r["primary_language"]
+            for r in bq.query(heavy_hitters.LANGUAGES_SQL, params={"repos": repos})
+        }
+        languages = {name: by_id.get(repo_id) for name, repo_id in repo_ids.items()}
+        bq.load_rows("${MART_DATASET}.language_top_repos", heavy_hitters.hour_rows(
+            date_str, hour, counters, languages, settings.heavy_hitters_capacity
+        ))
+    bq.load_rows("${STG_DATASET}.intraday_hours", [{
+        "event_date": date_str,
+        "hour": hour,
+        "events": sum(c.events_total for c in counters.values()),
+        "repos": len(repos),
+        "folded_at": datetime.now(timezone.utc).isoformat(),
+    }])
+    return len(repos)
+
+
+def _present(bq: BQQueryRunner, sql: str, date_str: str) -> bool:
+    return bool(bq.query(sql, params={"date": date_str}))
+
+
+def ensure_baseline(bq: BQQueryRunner, settings: Settings, date_str: str) -> str:
+    """
+    baseline_date of the state to score date_str against. The date's own state is built once, as
+    soon as the previous day's activity is loaded; until then the previous day's state is used.
+    """
+    if _present(bq, BASELINE_EXISTS_SQL, date_str):
+        return date_str
+    previous = (date.fromisoformat(date_str) - timedelta(days=1)).isoformat()
+    if _present(bq, ACTIVITY_EXISTS_SQL, previous):
+        print(f"Building repo_baseline_state for {date_str} ...")
+        bq.run(BASELINE_MODEL.read_text(encoding="utf-8"), extra={"DATE": date_str}, step="hourly_baseline",
+               max_bytes=settings.max_bytes_transform)
+        return date_str
+    print(f"No daily_repo_activity for {previous} yet; scoring against the baseline of {previous}.")
+    return previous
+
+
+def score_provisional(bq: BQQueryRunner, settings: Settings, date_str: str, hours: int) -> int:
+    """Rewrite date_str's trending_repos_daily partition from the day so far. Returns the row count."""
+    fraction = hours / 24
+    baseline_date = ensure_baseline(bq, settings, date_str)
+    rows = bq.query(PROVISIONAL_SQL, params={
+        "date": date_str,
+        "baseline_date": baseline_date,
+        "min_events": math.ceil(settings.min_events_threshold * fraction),
+    })
+
+    def column(name: str) -> np.ndarray:
+        return np.array([r[name] or 0 for r in rows], dtype=np.int64)
+
+    today = np.stack([column("events_total"), column("actors_unique"), column("stars")], axis=-1).reshape(-1, 3)
+    sums = np.stack([column(f"sum_{m}") for m in METRICS], axis=-1).reshape(-1, 3)
+    sumsqs = np.stack([column(f"sumsq_{m}") for m in METRICS], axis=-1).reshape(-1, 3)
+    mean, std = moments(column("days_active"), sums, sumsqs)
+    # A whole day's baseline, scaled down to the hours seen so far
+    mean, std = mean * fraction, std * fraction
+    growth, z, trend = score(today, mean, std, settings.trend_weights)
+
+    columns: dict[str, np.ndarray] = {
+        "event_date": np.full(len(rows), date_str, dtype=object),
+        "repo_id": np.array([r["repo_id"] for r in rows], dtype=np.int64),
+        "events_today": today[:, 0],
+        "actors_today": today[:, 1],
+        "stars_today": today[:, 2],
+    }
+    for i, metric in enumerate(METRICS):
+        columns[f"avg_{metric}_prev"] = mean[:, i]
+        columns[f"std_{metric}_prev"] = std[:, i]
+        columns[f"growth_{metric}_ratio"] = growth[:, i]
+        columns[f"z_{metric}"] = z[:, i]
+    columns["trend_score"] = trend
+
+    if rows:
+        # Replaces the previous hour's rows in one load
+        bq.load_rows("${MART_DATASET}.trending_repos_daily", to_rows(columns), partition_date=date_str)
+    else:
+        bq.run(DELETE_TRENDING_SQL, extra={"DATE_FROM": date_str, "DATE_TO": date_str}, step="hourly_scoring")
+    return len(rows)
+
+
+def run_hour(bq: BQQueryRunner, settings: Settings, date_str: str, hour: int, path: Path) -> None:
+    folded = [r["hour"] for r in bq.query(FOLDED_HOURS_SQL, params={"date": date_str})]
+    expected = folded[-1] + 1 if folded else 0
+    if hour > expected or hour < expected - 1:
+        raise SystemExit(
+            f"Hours are folded in order: the next hour of {date_str} is {expected}, got {hour}."
+        )
+
+    started = time.perf_counter()
+    counters = ingest.aggregate_file(path, date_str, settings.hll_precision)
+    aggregated = time.perf_counter()
+    repos = fold_hour(bq, settings, date_str, hour, counters)
+    folded_at = time.perf_counter()
+    print(
+        f"Folded {date_str} hour {hour}: {sum(c.events_total for c in counters.values()):,} events, "
+        f"{repos:,} repos (aggregate {aggregated - started:.2f}s, fold {folded_at - aggregated:.2f}s)"
+    )
+
+    hours = hour + 1
+    scored = score_provisional(bq, settings, date_str, hours)
+    print(f"Scored {hours}/24 hours of {date_str}: {scored:,} provisional trending rows")
+
+    extra = {"DATE_FROM": date_str, "DATE_TO": date_str}
+    run_dag(build_nodes(bq, PROVISIONAL_MODELS, extra, lambda: [date.fromisoformat(date_str)]), settings.max_jobs)
+    # The rolling windows only take finished days; the daily compute adds this one
+    compute_date(bq, settings, date_str, rollups=False, provisional=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fold one GH Archive hour into provisional trending rows.")
+    parser.add_argument("--date", help="YYYY-MM-DD (UTC). Default: the date of the last complete hour.")
+    parser.add_argument("--hour", type=int, help="0-23. Default: the next hour of --date that has not been folded.")
+    parser.add_argument("--source-dir", default="local/gharchive",
+                        help="Directory of GH Archive hour files; missing hours are downloaded into it.")
+    args = parser.parse_args()
+
+    settings = Settings.load()
+    bq = BQQueryRunner(settings)
+    last_date, last_hour = latest_complete_hour()
+    date_str = args.date or last_date
+    hour = args.hour
+    if hour is None:
+        folded = [r["hour"] for r in bq.query(FOLDED_HOURS_SQL, params={"date": date_str})]
+        hour = folded[-1] + 1 if folded else 0
+    if hour > 23 or (date_str == last_date and hour > last_hour) or date_str > last_date:
+        print(f"Hour {hour} of {date_str} has not ended yet; nothing to do.")
+        return
+
+    path = fetch_hour(date_str, hour, args.source_dir)
+    if path is None:
+        print(f"GH Archive has not published {date_str}-{hour} yet; try again later.")
+        return
+    with record_run(bq, settings, "hourly", {**vars(args), "date": date_str, "hour": hour}):
+        run_hour(bq, settings, date_str, hour, path)
+    print("Hourly run done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Streaming GH Archive file ingester.
+
+Reads hourly `YYYY-MM-DD-H.json.gz` files, parses them line by line and folds every event
+straight into per-repo counters, so nothing event-sized is ever held in memory. One worker
+process handles one hour file; the partial counters are merged in the parent.
+Distinct actors are an HLL sketch per repo (pipeline/hll.py) over the actor ids
+(pipeline.dictionary), never a set of actors, so a repo's state is bounded by the sketch size
+whatever its traffic, and sketches from different hours merge. Workers key the counters by repo
+name; with `encode`, the parent re-keys each partial result by repo id before merging. The result
+has the shape of `daily_repo_activity` (see sql/20_models/daily_repo_activity.sql).
+"""
+
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from pipeline import dictionary, hll
+
+# Event type -> daily_repo_activity counter column
+EVENT_COUNTERS = {
+    "PushEvent": "pushes",
+    "PullRequestEvent": "pull_requests",
+    "IssuesEvent": "issues",
+    "WatchEvent": "stars",
+    "ForkEvent": "forks",
+}
+
+ACTIVITY_COLUMNS = [
+    "event_date", "repo_id", "events_total", "actors_unique", "actors_hll",
+    "pushes", "pull_requests", "issues", "stars", "forks",
+]
+
+
+@dataclass
+class RepoCounters:
+    events_total: int = 0
+    pushes: int = 0
+    pull_requests: int = 0
+    issues: int = 0
+    stars: int = 0
+    forks: int = 0
+    # Sketch of the actor ids
+    actors: hll.HyperLogLog = field(default_factory=hll.HyperLogLog)
+
+    def add(self, event_type: str, actor: str) -> None:
+        self.events_total += 1
+        counter = EVENT_COUNTERS.get(event_type)
+        if counter:
+            setattr(self, counter, getattr(self, counter) + 1)
+        self.actors.add(dictionary.name_id(actor))
+
+    def merge(self, other: RepoCounters) -> None:
+        self.events_total += other.events_total
+        for counter in EVENT_COUNTERS.values():
+            setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+        self.actors.merge(other.actors)
+
+
+def hour_files(source_dir: str | Path, event_date: str) -> list[Path]:
+    """GH Archive hour files for one day, in hour order."""
+    files = Path(source_dir).glob(f"{event_date}-*.json.gz")
+    return sorted(files, key=lambda p: int(p.name[len(event_date) + 1:].split(".")[0]))
+
+
+def iter_events(path: str | Path) -> Iterator[dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_activity(events: Iterable[dict], event_date: str) -> Iterator[tuple[str, str, str]]:
+    """(repo_name, actor_login, type) for events on event_date, with the same filters as staging."""
+    for event in events:
+        if not str(event.get("created_at", "")).startswith(event_date):
+            continue
+        repo = (event.get("repo") or {}).get("name")
+        actor = (event.get("actor") or {}).get("login")
+        if repo is None or actor is None:
+            continue
+        yield repo, actor, event.get("type", "")
+
+
+def aggregate(
+    activity: Iterable[tuple[str, str, str]], precision: int = hll.DEFAULT_PRECISION
+) -> dict[str, RepoCounters]:
+    counters: dict[str, RepoCounters] = {}
+    for repo, actor, event_type in activity:
+        entry = counters.get(repo)
+        if entry is None:
+            entry = counters[repo] = RepoCounters(actors=hll.HyperLogLog(precision))
+        entry.add(event_type, actor)
+    return counters
+
+
+def aggregate_file(
+    path: str | Path, event_date: str, precision: int = hll.DEFAULT_PRECISION
+) -> dict[str, RepoCounters]:
+    """Worker entry point: one hour file -> partial per-repo counters."""
+    return aggregate(iter_activity(iter_events(path), event_date), precision)
+
+
+def merge_counters(into: dict[str, RepoCounters], partial: dict[str, RepoCounters]) -> None:
+    for repo, counters in partial.items():
+        entry = into.get(repo)
+        if entry is None:
+            into[repo] = counters
+        else:
+            entry.merge(counters)
+
+
+def encode_ids(counters: dict[str, RepoCounters], repo_ids: dict[str, int]) -> dict[int, RepoCounters]:
+    """Counters keyed by repo id."""
+    return {repo_ids[repo]: c for repo, c in counters.items()}
+
+
+def aggregate_files(
+    paths: list[Path],
+    event_date: str,
+    workers: int | None = None,
+    encode: Callable[[dict[str, RepoCounters]], dict] | None = None,
+    precision: int = hll.DEFAULT_PRECISION,
+) -> dict:
+    """
+    Fan the hour files out over a process pool and merge the partial counters as they finish.
+    `encode` maps each partial result (e.g. to repo ids) before it is merged.
+    """
+    merged: dict = {}
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    if workers == 1:
+        for path in paths:
+            partial = aggregate_file(path, event_date, precision)
+            merge_counters(merged, encode(partial) if encode else partial)
+        return merged
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(aggregate_file, path, event_date, precision) for path in paths]
+        for future in as_completed(futures):
+            partial = future.result()
+            merge_counters(merged, encode(partial) if encode else partial)
+    return merged
+
+
+def to_activity_rows(event_date: str, counters: dict[int, RepoCounters], sketches: bool = False) -> list[dict]:
+    """
+    daily_repo_activity rows from encoded counters; actors_unique is the sketch's estimate. With
+    sketches, actors_hll holds the base64 encoded pipeline.hll sketch (BYTES in a JSON load); without
+    them the column is left out and loads as NULL.
+    """
+    rows = []
+    for repo, c in sorted(counters.items()):
+        row = {
+            "event_date": event_date,
+            "repo_id": repo,
+            "events_total": c.events_total,
+            "actors_unique": c.actors.count(),
+            "pushes": c.pushes,
+            "pull_requests": c.pull_requests,
+            "issues": c.issues,
+            "stars": c.stars,
+            "forks": c.forks,
+        }
+        if sketches:
+            row["actors_hll"] = base64.b64encode(c.actors.to_bytes()).decode("ascii")
+        rows.append(row)
+    return rows
+
+
+def write_parquet(rows: list[dict], path: str | Path) -> None:
+    import pyarrow as pa  # optional dependency: poetry install --extras arrow
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pylist(
+        [
+            {
+                **r,
+                "event_date": date.fromisoformat(r["event_date"]),
+                "actors_hll": base64.b64decode(r["actors_hll"]) if r.get("actors_hll") else None,
+            }
+            for r in rows
+        ],
+        schema=pa.schema(
+            [("event_date", pa.date32())]
+            + [(c, pa.binary() if c == "actors_hll" else pa.int64()) for c in ACTIVITY_COLUMNS[1:]]
+        ),
+    )
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, path)
@@ -0,0 +1,590 @@
+"""
+Local DuckDB backend for BQQueryRunner.
+
+Runs the BigQuery SQL in sql/ and pipeline/*.py against a DuckDB file, so the whole pipeline
+can be run and profiled offline. The translation is deliberately small: it covers the
+BigQuery constructs this repo uses (backtick names, DATE_SUB, TIMESTAMP_SUB, SAFE_DIVIDE, COUNTIF,
+JSON_VALUE, ARRAY_AGG ... LIMIT, STRUCT, IF ... THEN ... END IF, HLL_COUNT.*) and nothing more.
+HLL_COUNT functions run as Python UDFs over pipeline/hll.py sketches.
+
+Source tables that are not in the database are read from LOCAL_DATA_DIR:
+    <data_dir>/<dataset>/<table>.parquet | <table>/*.parquet | <table>.json[.gz]
+    <data_dir>/<source events dataset>/YYYY-MM-DD-H.json.gz  (GH Archive hourly files for table YYYYMMDD,
+                                                             and for the wildcard table `*` with _TABLE_SUFFIX)
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Iterator
+
+from pipeline.config import Settings
+
+# Columns we read from GH Archive files; everything else in the event is skipped while parsing
+GHARCHIVE_COLUMNS = {
+    "created_at": "TIMESTAMP",
+    "type": "VARCHAR",
+    "repo": "STRUCT(name VARCHAR)",
+    "actor": "STRUCT(login VARCHAR)",
+    "payload": "JSON",
+}
+
+# Repository metadata is optional offline: without files every repo is simply 'Unknown'
+EMPTY_REPO_SOURCES = {
+    "languages": {"repo_name": "VARCHAR", "language": "STRUCT(name VARCHAR, bytes BIGINT)[]"},
+    "licenses": {"repo_name": "VARCHAR", "license": "VARCHAR"},
+}
+
+TYPE_NAMES = {
+    "INT64": "BIGINT",
+    "FLOAT64": "DOUBLE",
+    "STRING": "VARCHAR",
+    "BOOL": "BOOLEAN",
+    "BYTES": "BLOB",
+}
+
+
+class Statement(str):
+    """A single translated SQL statement."""
+
+
+class IfBlock:
+    """IF <condition> THEN <statements> [ELSE <statements>] END IF"""
+
+    def __init__(self, condition: str):
+        self.condition = condition
+        self.then: list[Statement | IfBlock] = []
+        self.otherwise: list[Statement | IfBlock] = []
+
+
+def _tokenize(sql: str) -> tuple[str, list[tuple[str, str]]]:
+    """
+    Drop comments, turn BigQuery "strings" into 'strings' and `a.b.c` names into "b"."c".
+    Returns the rewritten SQL and the (schema, table) pairs that were referenced.
+    """
+    out: list[str] = []
+    tables: list[tuple[str, str]] = []
+    i, n = 0, len(sql)
+    while i < n:
+        c = sql[i]
+        if sql.startswith("--", i):
+            j = sql.find("\n", i)
+            i = n if j == -1 else j
+        elif c in ("'", '"'):
+            j = i + 1
+            while j < n and sql[j] != c:
+                j += 2 if sql[j] == "\\" else 1
+            body = sql[i + 1:j].replace("\\" + c, c).replace("'", "''")
+            out.append(f"'{body}'")
+            i = j + 1
+        elif c == "`":
+            j = sql.index("`", i + 1)
+            parts = sql[i + 1:j].split(".")
+            if len(parts) >= 2:
+                schema, table = parts[-2], parts[-1]
+                tables.append((schema, table))
+                out.append(f'"{schema}"."{table}"')
+            else:
+                out.append(f'"{parts[0]}"')
+            i = j + 1
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out), tables
+
+
+_LITERAL_RE = re.compile(r"('(?:[^']|'')*'|\"[^\"]*\")")
+_MASK_RE = re.compile(r"\x00(\d+)\x00")
+
+
+def _mask_literals(sql: str) -> tuple[str, list[str]]:
+    """Swap string literals and quoted identifiers for placeholders so rewrites cannot touch them."""
+    literals: list[str] = []
+
+    def keep(m: re.Match) -> str:
+        literals.append(m.group(0))
+        return f"\x00{len(literals) - 1}\x00"
+
+    return _LITERAL_RE.sub(keep, sql), literals
+
+
+def _unmask_literals(sql: str, literals: list[str]) -> str:
+    return _MASK_RE.sub(lambda m: literals[int(m.group(1))], sql)
+
+
+def _outside_literals(sql: str, fn) -> str:
+    masked, literals = _mask_literals(sql)
+    return _unmask_literals(fn(masked), literals)
+
+
+def _split_top_level(text: str, sep: str = ",") -> list[str]:
+    parts, depth, start = [], 0, 0
+    for i, c in enumerate(text):
+        if c in "([":
+            depth += 1
+        elif c in ")]":
+            depth -= 1
+        elif c == sep and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts]
+
+
+def _matching_paren(sql: str, open_idx: int) -> int:
+    depth = 0
+    for i in range(open_idx, len(sql)):
+        if sql[i] == "(":
+            depth += 1
+        elif sql[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError(f"Unbalanced parentheses in SQL near: {sql[open_idx:open_idx + 80]!r}")
+
+
+def _rewrite_calls(sql: str, name: str, fn) -> str:
+    """Replace every `name(args)` call with fn(args_text); fn may return None to leave a call as is."""
+    regex = re.compile(rf"\b{name}\s*\(", re.IGNORECASE)
+    pos = 0
+    while m := regex.search(sql, pos):
+        open_idx = m.end() - 1
+        close_idx = _matching_paren(sql, open_idx)
+        replacement = fn(sql[open_idx + 1:close_idx])
+        if replacement is None:
+            pos = m.end()
+            continue
+        sql = sql[:m.start()] + replacement + sql[close_idx + 1:]
+        pos = m.start()
+    return sql
+
+
+def _interval_days(arg: str) -> str:
+    m = re.fullmatch(r"INTERVAL\s+(.+?)\s+DAY", arg.strip(), re.IGNORECASE | re.DOTALL)
+    if not m:
+        raise NotImplementedError(f"Only DAY intervals are supported locally: {arg!r}")
+    return m.group(1)
+
+
+def _date_sub(args: str) -> str:
+    d, interval = _split_top_level(args)
+    return f"({d} - ({_interval_days(interval)}))"
+
+
+def _date_add(args: str) -> str:
+    d, interval = _split_top_level(args)
+    return f"({d} + ({_interval_days(interval)}))"
+
+
+def _timestamp_sub(args: str) -> str:
+    ts, interval = _split_top_level(args)
+    return f"({ts} - to_days({_interval_days(interval)}))"
+
+
+def _safe_divide(args: str) -> str:
+    a, b = _split_top_level(args)
+    return f"(CASE WHEN ({b}) = 0 THEN NULL ELSE ({a}) / ({b}) END)"
+
+
+def _array_agg_limit(args: str) -> str | None:
+    m = re.search(r"\s+LIMIT\s+(\d+)\s*$", args, re.IGNORECASE)
+    if not m:
+        return None
+    return f"list_slice(array_agg({args[:m.start()]}), 1, {m.group(1)})"
+
+
+def _struct(args: str) -> str:
+    fields = []
+    for item in _split_top_level(args):
+        m = re.fullmatch(r"(.+?)\s+AS\s+(\w+)", item, re.IGNORECASE | re.DOTALL)
+        expr, name = (m.group(1), m.group(2)) if m else (item, item.split(".")[-1])
+        fields.append(f"{name} := {expr}")
+    return f"struct_pack({', '.join(fields)})"
+
+
+# HLL_COUNT aggregates become scalar UDFs over list(); DuckDB Python UDFs cannot aggregate
+HLL_FUNCTIONS = {
+    # Values are hashed as strings; pipeline.hll hashes ids as their decimal string too
+    r"HLL_COUNT\.INIT": lambda args: (
+        f"hll_init(list(CAST({_split_top_level(args)[0]} AS VARCHAR)), {_hll_precision(args)})"
+    ),
+    r"HLL_COUNT\.MERGE_PARTIAL": lambda args: f"hll_merge_partial(list({args}))",
+    r"HLL_COUNT\.MERGE": lambda args: f"hll_extract(hll_merge_partial(list({args})))",
+    r"HLL_COUNT\.EXTRACT": lambda args: f"hll_extract({args})",
+}
+
+
+def _hll_precision(args: str) -> str:
+    parts = _split_top_level(args)
+    return parts[1] if len(parts) > 1 else "15"  # BigQuery's default precision
+
+
+def _rewrite_words(sql: str) -> str:
+    for bq, duck in TYPE_NAMES.items():
+        sql = re.sub(rf"\b{bq}\b", duck, sql)
+    # STRUCT<a T, b U> -> STRUCT(a T, b U); ARRAY<T> -> T[]
+    while True:
+        new = re.sub(r"\bSTRUCT<([^<>]*)>", r"STRUCT(\1)", sql)
+        new = re.sub(r"\bARRAY<([^<>]*)>", r"\1[]", new)
+        if new == sql:
+            break
+        sql = new
+    sql = re.sub(r"\bCOUNTIF\s*\(", "count_if(", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bSAFE_CAST\s*\(", "TRY_CAST(", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bJSON_VALUE\s*\(", "json_extract_string(", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bCURRENT_TIMESTAMP\s*\(\s*\)", "CAST(current_timestamp AS TIMESTAMP)", sql, flags=re.IGNORECASE)
+    sql = re.sub(
+        r"\bFROM\s+UNNEST\s*\(([^()]*)\)\s+AS\s+(\w+)", r"FROM (SELECT UNNEST(\1) AS \2)", sql, flags=re.IGNORECASE
+    )
+    sql = re.sub(r"\bIN\s+UNNEST\s*\(([^()]*)\)", r"IN (SELECT UNNEST(\1))", sql, flags=re.IGNORECASE)
+    return sql
+
+
+_CREATE_TABLE_RE = re.compile(
+    r"\s*CREATE\s+(OR\s+REPLACE\s+)?(TEMP\w*\s+)?TABLE\s+(IF\s+NOT\s+EXISTS\s+)?\S+", re.IGNORECASE
+)
+
+
+def _strip_table_options(stmt: str) -> str:
+    """Drop PARTITION BY / CLUSTER BY / OPTIONS from CREATE TABLE; DuckDB has no equivalent."""
+    m = _CREATE_TABLE_RE.match(stmt)
+    if not m:
+        return stmt
+    columns, rest = "", stmt[m.end():]
+    if rest.lstrip().startswith("("):
+        open_idx = m.end() + rest.index("(")
+        close_idx = _matching_paren(stmt, open_idx)
+        columns, rest = stmt[m.end():close_idx + 1], stmt[close_idx + 1:]
+    # The CTAS body, not an `AS` inside e.g. PARTITION BY CAST(ts AS DATE)
+    body = re.search(r"\bAS\s+(SELECT|WITH|\()", rest, re.IGNORECASE)
+    return stmt[:m.end()] + columns + ("\n" + rest[body.start():] if body else "")
+
+
+def translate_sql(sql: str) -> tuple[list[Statement | IfBlock], list[tuple[str, str]]]:
+    """Translate a BigQuery script into DuckDB statements, keeping IF blocks as nodes."""
+    sql, tables = _tokenize(sql)
+    sql, literals = _mask_literals(sql)
+    # STRUCT(...) calls first; after _rewrite_words STRUCT(...) may also be a DuckDB type
+    sql = _rewrite_calls(sql, "STRUCT", _struct)
+    sql = _rewrite_words(sql)
+    sql = _rewrite_calls(sql, "DATE_SUB", _date_sub)
+    sql = _rewrite_calls(sql, "DATE_ADD", _date_add)
+    sql = _rewrite_calls(sql, "TIMESTAMP_SUB", _timestamp_sub)
+    sql = _rewrite_calls(sql, "DATE", lambda a: f"CAST({a} AS DATE)")
+    sql = _rewrite_calls(sql, "SAFE_DIVIDE", _safe_divide)
+    sql = _rewrite_calls(sql, "ARRAY_AGG", _array_agg_limit)
+    for name, fn in HLL_FUNCTIONS.items():
+        sql = _rewrite_calls(sql, name, fn)
+
+    pieces = [_unmask_literals(p, literals) for p in _split_top_level(sql, ";") if p]
+    program, _ = _parse_block(pieces, 0, top_level=True)
+    return program, tables
+
+
+def _parse_block(pieces: list[str], i: int, top_level: bool = False) -> tuple[list[Statement | IfBlock], int]:
+    nodes: list[Statement | IfBlock] = []
+    while i < len(pieces):
+        piece = pieces[i]
+        upper = piece.upper()
+        if upper.startswith(("ELSE", "END IF")):
+            if top_level:
+                raise ValueError(f"Unexpected {piece[:8]!r} outside of an IF block.")
+            return nodes, i
+        if upper.startswith("IF "):
+            m = re.match(r"IF\s+(.*?)\s+THEN\s+(.*)$", piece, re.IGNORECASE | re.DOTALL)
+            if not m:
+                raise ValueError(f"Cannot parse IF statement: {piece[:60]!r}")
+            block = IfBlock(m.group(1))
+            pieces = pieces[:i] + [m.group(2)] + pieces[i + 1:]
+            block.then, i = _parse_block(pieces, i)
+            if i < len(pieces) and pieces[i].upper().startswith("ELSEIF"):
+                raise NotImplementedError("ELSEIF is not supported by the local engine.")
+            if i < len(pieces) and pieces[i].upper().startswith("ELSE"):
+                pieces[i] = pieces[i][4:].strip()
+                block.otherwise, i = _parse_block(pieces, i)
+            if i >= len(pieces) or pieces[i].upper() != "END IF":
+                raise ValueError("IF block without END IF.")
+            nodes.append(block)
+            i += 1
+            continue
+        if re.match(r"(DECLARE|SET|LOOP|WHILE|FOR|REPEAT)\b", upper):
+            raise NotImplementedError(f"BigQuery scripting statement not supported locally: {piece[:60]!r}")
+        nodes.append(Statement(_strip_table_options(piece)))
+        i += 1
+    if not top_level:
+        raise ValueError("IF block without END IF.")
+    return nodes, i
+
+
+def _arrow_udf(pa, fn, arrow_type, arity: int):
+    """Wrap a row function as an Arrow batch function; DuckDB reads the arity from the signature."""
+    def batch(*columns):
+        return pa.array([fn(*row) for row in zip(*(c.to_pylist() for c in columns))], arrow_type)
+
+    if arity == 1:
+        return lambda a: batch(a)
+    return lambda a, b: batch(a, b)
+
+
+class LocalJob:
+    """A SELECT bound to its own cursor; runs in result(), cancel() interrupts it from another thread."""
+
+    def __init__(self, cur, stmt: str, params: dict[str, Any]):
+        self.cur = cur
+        self.stmt = stmt
+        self.params = params
+
+    def result(self) -> list[dict]:
+        try:
+            self.cur.execute(self.stmt, self.params)
+            names = [d[0] for d in self.cur.description]
+            return [dict(zip(names, row)) for row in self.cur.fetchall()]
+        finally:
+            self.cur.close()
+
+    def arrow(self) -> Any:
+        """result() as a pyarrow Table; decoding it column by column is cheaper than row tuples."""
+        try:
+            self.cur.execute(self.stmt, self.params)
+            # to_arrow_table replaces fetch_arrow_table in newer DuckDB releases
+            fetch = getattr(self.cur, "to_arrow_table", None) or self.cur.fetch_arrow_table
+            return fetch()
+        finally:
+            self.cur.close()
+
+    def cancel(self) -> None:
+        try:
+            self.cur.interrupt()
+        except Exception:
+            pass  # already finished and closed
+
+
+class LocalEngine:
+    """DuckDB engine with the same run/query surface as the BigQuery one."""
+
+    # BigQuery job options (labels, maximum_bytes_billed) do not apply; runners leave job_config alone
+    job_options = False
+
+    def __init__(self, settings: Settings):
+        import duckdb  # optional dependency: poetry install --extras local
+
+        self.settings = settings
+        self.data_dir = Path(settings.local_data_dir)
+        db_path = Path(settings.local_db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = duckdb.connect(str(db_path))
+        self.con.execute("SET TimeZone = 'UTC'")
+        self._register_udfs(duckdb)
+        self._sources_lock = threading.Lock()
+
+    def _register_udfs(self, duckdb) -> None:
+        from pipeline import dictionary, hll
+
+        blob, bigint = duckdb.type("BLOB"), duckdb.type("BIGINT")
+        udfs = [
+            ("hll_init", hll.init, [duckdb.type("VARCHAR[]"), bigint], blob),
+            ("hll_merge_partial", hll.merge_partial, [duckdb.type("BLOB[]")], blob),
+            ("hll_extract", hll.extract, [blob], bigint),
+            # FARM_FINGERPRINT; name_id caches, and a day's events repeat the same names
+            (
+                "farm_fingerprint", lambda v: None if v is None else dictionary.name_id(v),
+                [duckdb.type("VARCHAR")], bigint,
+            ),
+        ]
+        try:
+            import pyarrow as pa
+        except ImportError:
+            pa = None
+        for name, fn, args, result in udfs:
+            if pa is None:
+                self.con.create_function(name, fn, args, result, null_handling="special")
+                continue
+            # Vectorized: one call per batch is ~5x faster than one call per row
+            arrow_type = pa.int64() if result == bigint else pa.binary()
+            self.con.create_function(
+                name, _arrow_udf(pa, fn, arrow_type, len(args)), args, result, type="arrow", null_handling="special"
+            )
+
+    # --- sources ---------------------------------------------------------
+
+    def _table_exists(self, cur, schema: str, table: str) -> bool:
+        row = cur.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = ? AND table_name = ?",
+            [schema, table],
+        ).fetchone()
+        return bool(row and row[0])
+
+    def _source_sql(self, schema: str, table: str) -> str | None:
+        base = self.data_dir / schema
+        if (base / f"{table}.parquet").exists():
+            return f"SELECT * FROM read_parquet('{base / f'{table}.parquet'}')"
+        if (base / table).is_dir() and any((base / table).glob("*.parquet")):
+            return f"SELECT * FROM read_parquet('{base / table}/*.parquet')"
+        for suffix in (".json.gz", ".json", ".ndjson"):
+            if (base / f"{table}{suffix}").exists():
+                return f"SELECT * FROM read_json_auto('{base / f'{table}{suffix}'}', format = 'newline_delimited')"
+        if schema == self.settings.source_events_dataset and re.fullmatch(r"\d{8}", table):
+            day = f"{table[:4]}-{table[4:6]}-{table[6:]}"
+            if any(base.glob(f"{day}-*.json.gz")):
+                columns = ", ".join(f"'{k}': '{v}'" for k, v in GHARCHIVE_COLUMNS.items())
+                return (
+                    f"SELECT * FROM read_json('{base}/{day}-*.json.gz', format = 'newline_delimited', "
+                    f"columns = {{{columns}}})"
+                )
+        if schema == self.settings.source_events_dataset and table == "*":
+            # Wildcard table: every day, with _TABLE_SUFFIX (YYYYMMDD) taken from the file name
+            if any(base.glob("????-??-??-*.json.gz")):
+                columns = ", ".join(f"'{k}': '{v}'" for k, v in GHARCHIVE_COLUMNS.items())
+                return (
+                    "SELECT * EXCLUDE (filename), "
+                    r"replace(regexp_extract(filename, '(\d{4}-\d{2}-\d{2})-\d+\.json\.gz$', 1), '-', '') "
+                    f"AS _TABLE_SUFFIX FROM read_json('{base}/????-??-??-*.json.gz', format = 'newline_delimited', "
+                    f"columns = {{{columns}}}, filename = true)"
+                )
+        repos_dataset = self.settings.source_repos_table.split(".")[-2]
+        if schema == repos_dataset and table in EMPTY_REPO_SOURCES:
+            columns = ", ".join(f"CAST(NULL AS {t}) AS {c}" for c, t in EMPTY_REPO_SOURCES[table].items())
+            return f"SELECT {columns} WHERE false"
+        return None
+
+    def _ensure_sources(self, cur, tables: list[tuple[str, str]]) -> None:
+        """Expose files under LOCAL_DATA_DIR as views for referenced tables that do not exist yet."""
+        with self._sources_lock:
+            for schema, table in dict.fromkeys(tables):
+                if self._table_exists(cur, schema, table):
+                    continue
+                source = self._source_sql(schema, table)
+                if source is None:
+                    continue
+                cur.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+                cur.execute(f'CREATE VIEW "{schema}"."{table}" AS {source}')
+
+    # --- execution -------------------------------------------------------
+
+    def _execute_nodes(self, cur, nodes: list[Statement | IfBlock], totals: dict[str, int]) -> None:
+        for node in nodes:
+            if isinstance(node, IfBlock):
+                (cond,) = cur.execute(f"SELECT ({node.condition})").fetchone()
+                self._execute_nodes(cur, node.then if cond else node.otherwise, totals)
+                continue
+            cur.execute(node)
+            if re.match(r"\s*(INSERT|DELETE|UPDATE|MERGE)\b", node, re.IGNORECASE):
+                # DuckDB returns the affected row count as the statement's result
+                totals["rows_affected"] += int(cur.fetchone()[0])
+            profile = json.loads(cur.get_profiling_information(format="json"))
+            totals["rows_processed"] += int(profile.get("cumulative_rows_scanned", 0))
+            totals["bytes_processed"] += int(profile.get("total_bytes_read", 0))
+
+    def run(self, sql: str, job_config: Any = None):
+        from pipeline.bq import QueryResult
+
+        started = time.monotonic()
+        program, tables = translate_sql(sql)
+        cur = self.con.cursor()
+        try:
+            self._ensure_sources(cur, tables)
+            cur.execute("PRAGMA enable_profiling = 'no_output'")
+            totals = {"rows_processed": 0, "bytes_processed": 0, "rows_affected": 0}
+            self._execute_nodes(cur, program, totals)
+        finally:
+            cur.close()
+        return QueryResult(
+            job_id=f"local_{uuid.uuid4().hex[:12]}",
+            bytes_processed=totals["bytes_processed"],
+            bytes_billed=0,
+            rows_processed=totals["rows_processed"],
+            wall_ms=int((time.monotonic() - started) * 1000),
+            rows_affected=totals["rows_affected"],
+        )
+
+    def dry_run(self, sql: str, job_config: Any = None) -> int:
+        """
+        Translate the script and expose its sources, so unsupported SQL fails as it would in a real
+        run. DuckDB has no scan estimate before executing, so the estimate is always 0.
+        """
+        _, tables = translate_sql(sql)
+        cur = self.con.cursor()
+        try:
+            self._ensure_sources(cur, tables)
+        finally:
+            cur.close()
+        return 0
+
+    def submit(self, sql: str, params: dict[str, Any] | None = None) -> LocalJob:
+        program, tables = translate_sql(sql)
+        if len(program) != 1 or not isinstance(program[0], Statement):
+            raise ValueError("query() expects a single SELECT statement.")
+        # BigQuery named parameters (@name) become DuckDB named parameters ($name)
+        stmt = _outside_literals(program[0], lambda s: re.sub(r"@(\w+)", r"$\1", s))
+        cur = self.con.cursor()
+        try:
+            self._ensure_sources(cur, tables)
+        except BaseException:
+            cur.close()
+            raise
+        used = set(re.findall(r"\$(\w+)", stmt))
+        return LocalJob(cur, stmt, {k: v for k, v in (params or {}).items() if k in used})
+
+    def query(self, sql: str, params: dict[str, Any] | None = None) -> list[dict]:
+        return self.submit(sql, params).result()
+
+    def stream(self, sql: str, params: dict[str, Any] | None = None, batch_rows: int = 10_000) -> Iterator[Any]:
+        """A SELECT's rows as pyarrow RecordBatches, read from DuckDB's result one batch at a time."""
+        job = self.submit(sql, params)
+        try:
+            job.cur.execute(job.stmt, job.params)
+            # to_arrow_reader replaces fetch_record_batch in newer DuckDB releases
+            reader = getattr(job.cur, "to_arrow_reader", None) or job.cur.fetch_record_batch
+            yield from reader(batch_rows)
+        finally:
+            job.cur.close()
+
+    def load_rows(self, table: str, rows: list[dict], partition_date: str | None = None):
+        from pipeline.bq import QueryResult
+
+        schema, name = table.split(".")
+        cur = self.con.cursor()
+        spool, began = None, False
+        try:
+            types = dict(cur.execute(
+                "SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = ? AND table_name = ?",
+                [schema, name],
+            ).fetchall())
+            cur.execute("BEGIN TRANSACTION")
+            began = True
+            if partition_date:
+                cur.execute(f'DELETE FROM "{schema}"."{name}" WHERE event_date = CAST(? AS DATE)', [partition_date])
+            if rows:
+                # Spool to newline-delimited JSON; DuckDB's reader is much faster than row-by-row inserts
+                with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+                    spool = Path(f.name)
+                    for row in rows:
+                        f.write(json.dumps(row, default=str) + "\n")
+                # BYTES values arrive base64 encoded, as in BigQuery's JSON loads
+                blobs = [c for c in rows[0] if types[c] == "BLOB"]
+                columns = ", ".join(f"'{c}': '{'VARCHAR' if c in blobs else types[c]}'" for c in rows[0])
+                replace = f" REPLACE ({', '.join(f'from_base64({c}) AS {c}' for c in blobs)})" if blobs else ""
+                cur.execute(
+                    f'INSERT INTO "{schema}"."{name}" BY NAME SELECT *{replace} '
+                    f"FROM read_json('{spool}', format = 'newline_delimited', columns = {{{columns}}})"
+                )
+            cur.execute("COMMIT")
+        except Exception:
+            # A failed load leaves the table as it was, including a replaced partition
+            if began:
+                cur.execute("ROLLBACK")
+            raise
+        finally:
+            if spool is not None:
+                spool.unlink(missing_ok=True)
+            cur.close()
+        return QueryResult(
+            job_id=f"local_{uuid.uuid4().hex[:12]}", bytes_processed=0, bytes_billed=0, rows_affected=len(rows)
+        )
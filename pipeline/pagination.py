@@ -0,0 +1,54 @@
+"""
+Keyset cursors for the list endpoints.
+
+A full page comes with an X-Next-Cursor header. Passing it back as ?cursor= returns the rows after
+the last one of that page: the query compares the ORDER BY keys with the last row's values instead
+of reading and discarding LIMIT rows. The cursor is those values as base64url-encoded JSON.
+Sort keys must be non-NULL and end with a unique column, so every row has exactly one position.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from typing import Any
+
+# (SQL expression, "ASC" | "DESC") in ORDER BY order
+Keyset = list[tuple[str, str]]
+
+
+def order_by(keys: Keyset) -> str:
+    return ", ".join(f"{expr} {direction}" for expr, direction in keys)
+
+
+def encode_cursor(values: list[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Keyset) -> list[Any]:
+    """The sort key values in a cursor; ValueError if it is not one of ours for this keyset."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Malformed cursor") from None
+    if not isinstance(values, list) or len(values) != len(keys) or any(v is None for v in values):
+        raise ValueError("Malformed cursor")
+    return values
+
+
+def after_condition(keys: Keyset) -> str:
+    """
+    SQL condition for the rows after @after_0, @after_1, ... in keys order, e.g. for
+    trend_score DESC, repo_name ASC: (trend_score < @after_0) OR (trend_score = @after_0 AND repo_name > @after_1)
+    """
+    branches = []
+    for i, (expr, direction) in enumerate(keys):
+        equal = [f"{e} = @after_{j}" for j, (e, _) in enumerate(keys[:i])]
+        op = "<" if direction.upper() == "DESC" else ">"
+        branches.append("(" + " AND ".join([*equal, f"{expr} {op} @after_{i}"]) + ")")
+    return "(" + " OR ".join(branches) + ")"
+
+
+def after_params(values: list[Any]) -> dict[str, Any]:
+    return {f"after_{i}": v for i, v in enumerate(values)}
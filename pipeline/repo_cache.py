@@ -0,0 +1,160 @@
+"""
+SQLite key-value cache of repository metadata for the local engine.
+
+With PIPELINE_ENGINE=duckdb, transform runs update_repo_dim instead of sql/20_models/repo_dim.sql.
+It finds the same repos the model would look up (active in the range and not in repo_dim, or looked
+up more than REPO_DIM_REFRESH_DAYS ago). Those are read from the cache at REPO_CACHE_PATH first, and
+only the misses are looked up in the languages/licenses files under LOCAL_DATA_DIR. Repos without
+metadata are cached as well, so they are not looked up again every day. The cache outlives the
+DuckDB file: a rebuilt database (or a benchmark run) does not rescan the metadata. It is keyed by
+repo name, like the metadata; repo_dim rows get the repo's id from the todo list.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable
+
+from pipeline.bq import BQQueryRunner
+from pipeline.config import Settings
+
+# Same selection as the temp table in sql/20_models/repo_dim.sql
+TODO_SQL = """
+SELECT a.repo_id, n.repo_name
+FROM (
+    SELECT DISTINCT repo_id
+    FROM `${STG_DATASET}.daily_repo_activity`
+    WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
+) a
+JOIN `${STG_DATASET}.repo_names` n ON a.repo_id = n.repo_id
+LEFT JOIN (
+    SELECT repo_id, MAX(looked_up_at) AS looked_up_at
+    FROM `${STG_DATASET}.repo_dim`
+    GROUP BY repo_id
+) k ON a.repo_id = k.repo_id
+WHERE k.repo_id IS NULL
+    OR k.looked_up_at IS NULL
+    OR (${REPO_DIM_REFRESH_DAYS} > 0
+        AND k.looked_up_at < TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL ${REPO_DIM_REFRESH_DAYS} DAY))
+"""
+
+LOOKUP_SQL = """
+WITH names AS (
+    SELECT repo_name FROM UNNEST(@names) AS repo_name
+),
+
+langs AS (
+    SELECT repo_name, language AS languages
+    FROM `${SOURCE_REPOS_DATASET}.languages`
+    WHERE repo_name IN (SELECT repo_name FROM names)
+),
+
+lic AS (
+    SELECT repo_name, license
+    FROM `${SOURCE_REPOS_DATASET}.licenses`
+    WHERE repo_name IN (SELECT repo_name FROM names)
+)
+
+SELECT
+    n.repo_name,
+    (SELECT l.name
+        FROM UNNEST(langs.languages) AS l
+        ORDER BY l.bytes DESC
+        LIMIT 1) AS primary_language,
+    langs.languages AS all_languages,
+    lic.license
+FROM names n
+LEFT JOIN langs ON n.repo_name = langs.repo_name
+LEFT JOIN lic ON n.repo_name = lic.repo_name
+"""
+
+# Keeps each SELECT ... IN (...) well below SQLite's variable limit
+_CHUNK = 500
+
+
+class RepoCache:
+    def __init__(self, path: str | Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(str(path))
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS repos ("
+            " repo_name TEXT PRIMARY KEY, primary_language TEXT, all_languages TEXT, license TEXT,"
+            " looked_up_at TEXT NOT NULL)"
+        )
+
+    def close(self) -> None:
+        self.con.close()
+
+    def get(self, names: list[str], max_age_days: int = 0) -> dict[str, dict]:
+        """Cached repo_dim rows by repo name; entries older than max_age_days (if > 0) count as misses."""
+        cutoff = ""
+        if max_age_days > 0:
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).isoformat()
+        found: dict[str, dict] = {}
+        for i in range(0, len(names), _CHUNK):
+            chunk = names[i:i + _CHUNK]
+            rows = self.con.execute(
+                "SELECT repo_name, primary_language, all_languages, license, looked_up_at FROM repos "
+                f"WHERE repo_name IN ({', '.join('?' * len(chunk))}) AND looked_up_at >= ?",
+                [*chunk, cutoff],
+            )
+            for name, language, languages, license_, looked_up_at in rows:
+                found[name] = {
+                    "repo_name": name,
+                    "primary_language": language,
+                    "all_languages": json.loads(languages) if languages else None,
+                    "license": license_,
+                    "looked_up_at": looked_up_at,
+                }
+        return found
+
+    def put(self, rows: Iterable[dict]) -> None:
+        self.con.executemany(
+            "INSERT OR REPLACE INTO repos VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    r["repo_name"], r["primary_language"],
+                    json.dumps(r["all_languages"]) if r["all_languages"] is not None else None,
+                    r["license"], r["looked_up_at"],
+                )
+                for r in rows
+            ],
+        )
+        self.con.commit()
+
+
+def update_repo_dim(bq: BQQueryRunner, settings: Settings, date_from: str, date_to: str) -> dict[str, int]:
+    """Append repo_dim rows for the repos of [date_from, date_to] that need a lookup. Returns the counts."""
+    started = time.perf_counter()
+    extra = {"DATE_FROM": date_from, "DATE_TO": date_to}
+    ids = {r["repo_name"]: r["repo_id"] for r in bq.query(TODO_SQL, extra=extra)}
+    names = list(ids)
+    cache = RepoCache(settings.repo_cache_path)
+    try:
+        rows = cache.get(names, settings.repo_dim_refresh_days)
+        misses = [n for n in names if n not in rows]
+        if misses:
+            now = datetime.now(timezone.utc).isoformat()
+            looked_up = [
+                {**r, "all_languages": [dict(lang) for lang in r["all_languages"] or []] or None, "looked_up_at": now}
+                for r in bq.query(LOOKUP_SQL, params={"names": misses})
+            ]
+            cache.put(looked_up)
+            rows.update((r["repo_name"], r) for r in looked_up)
+    finally:
+        cache.close()
+
+    if rows:
+        bq.load_rows("${STG_DATASET}.repo_dim", [
+            {"repo_id": ids[name], **{k: v for k, v in r.items() if k != "repo_name"}} for name, r in rows.items()
+        ])
+    counts = {"lookups": len(names), "cache_hits": len(names) - len(misses), "cache_misses": len(misses)}
+    print(
+        f"  repo_dim: {counts['lookups']:,} repos to look up, {counts['cache_hits']:,} from the cache, "
+        f"{counts['cache_misses']:,} from the metadata tables ({time.perf_counter() - started:.2f}s)"
+    )
+    return counts
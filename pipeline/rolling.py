@@ -0,0 +1,198 @@
+"""
+Rolling-baseline math shared with sql/20_models/repo_baseline_state.sql and
+sql/30_marts/00_trending_repos_daily.sql.
+
+For a date D the baseline covers the LOOKBACK_DAYS days before it, [D - LOOKBACK_DAYS, D - 1],
+and only counts days on which the repo had activity (like the old self-join did).
+It is kept as running sums and sums of squares, so moving to D + 1 adds one day and
+subtracts one day instead of re-reading the window.
+
+trend_score weights the z-scores of events, actors and stars with Settings.trend_weights (TREND_WEIGHTS).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Mapping
+
+import numpy as np
+
+METRICS = ("events", "actors", "stars")
+
+
+@dataclass
+class RepoBaseline:
+    """One row of repo_baseline_state: running sums for events, actors and stars."""
+    days_active: int = 0
+    sums: list[int] = field(default_factory=lambda: [0, 0, 0])
+    sumsqs: list[int] = field(default_factory=lambda: [0, 0, 0])
+
+    def add(self, values: tuple[int, int, int], sign: int = 1) -> None:
+        self.days_active += sign
+        for i, v in enumerate(values):
+            self.sums[i] += sign * v
+            self.sumsqs[i] += sign * v * v
+
+    def avg(self, i: int) -> float | None:
+        return self.sums[i] / self.days_active if self.days_active else None
+
+    def std(self, i: int) -> float | None:
+        """Sample standard deviation, like STDDEV_SAMP (None for fewer than two days)."""
+        n = self.days_active
+        if n < 2:
+            return None
+        # Integer numerator keeps a constant series at exactly zero variance
+        return ((n * self.sumsqs[i] - self.sums[i] * self.sums[i]) / (n * (n - 1))) ** 0.5
+
+
+class RollingBaseline:
+    """
+    Pure-Python version of the repo_baseline_state table, advanced one day at a time.
+
+    `state` always describes the window that ends the day before `baseline_date`; `weights`
+    are the trend_score weights of events, actors and stars (Settings.trend_weights).
+    """
+
+    def __init__(self, lookback_days: int, weights: tuple[float, float, float]):
+        self.lookback_days = lookback_days
+        self.weights = weights
+        self.state: dict[str, RepoBaseline] = {}
+
+    def advance(
+        self,
+        entering: Mapping[str, tuple[int, int, int]],
+        leaving: Mapping[str, tuple[int, int, int]],
+    ) -> None:
+        """
+        Move the window forward by one day.
+        `entering` is the activity of the day that joins the window (D - 1),
+        `leaving` the activity of the day that drops out of it (D - 1 - LOOKBACK_DAYS).
+        """
+        for repo, values in entering.items():
+            self.state.setdefault(repo, RepoBaseline()).add(values)
+        for repo, values in leaving.items():
+            entry = self.state.get(repo)
+            if entry is None:
+                continue
+            entry.add(values, sign=-1)
+            if entry.days_active <= 0:
+                del self.state[repo]
+
+    def score(self, repo: str, today: tuple[int, int, int]) -> dict[str, float | None]:
+        """avg_*_prev, std_*_prev, growth_*_ratio, z_* and trend_score for one repo-day."""
+        entry = self.state.get(repo, RepoBaseline())
+        row: dict[str, float | None] = {}
+        trend = 0.0
+        for i, metric in enumerate(METRICS):
+            avg, std = entry.avg(i), entry.std(i)
+            growth = today[i] / std if std else None
+            z = (today[i] - avg) / std if std else None
+            row[f"avg_{metric}_prev"] = avg
+            row[f"std_{metric}_prev"] = std
+            row[f"growth_{metric}_ratio"] = growth
+            row[f"z_{metric}"] = z
+            trend += (z or 0.0) * self.weights[i]
+        row["trend_score"] = trend
+        return row
+
+
+def rolling_stats(
+    values: np.ndarray,
+    active: np.ndarray,
+    lookback_days: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized baseline over a dense repo x day matrix.
+
+    values: int array (repos, days, metrics) of daily counts (zero where inactive)
+    active: bool array (repos, days), True where the repo had a daily_repo_activity row
+
+    Returns (n, mean, std) where index [r, d] describes the window [d - lookback_days, d - 1].
+    mean is NaN where n == 0 and std is NaN where n < 2.
+    """
+    values = values.astype(np.int64, copy=False)
+    repos, days, metrics = values.shape
+
+    # Prefix sums with a leading zero day so window sums are a difference of two slices
+    cs = np.zeros((repos, days + 1, metrics), dtype=np.int64)
+    cs2 = np.zeros((repos, days + 1, metrics), dtype=np.int64)
+    cn = np.zeros((repos, days + 1), dtype=np.int64)
+    np.cumsum(values, axis=1, out=cs[:, 1:])
+    np.cumsum(values * values, axis=1, out=cs2[:, 1:])
+    np.cumsum(active, axis=1, out=cn[:, 1:])
+
+    end = np.arange(days)                      # window end (exclusive) is day d itself
+    start = np.maximum(end - lookback_days, 0)
+    s = cs[:, end] - cs[:, start]
+    s2 = cs2[:, end] - cs2[:, start]
+    n = cn[:, end] - cn[:, start]
+
+    return n, *moments(n, s, s2)
+
+
+def moments(n: np.ndarray, s: np.ndarray, s2: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    mean and sample std from window counts n, sums s and sums of squares s2, where s and s2 have one
+    more (metrics) axis than n. mean is NaN where n == 0 and std is NaN where n < 2.
+    """
+    nn = n[..., None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(nn > 0, s / nn, np.nan)
+        var = np.where(nn > 1, (nn * s2 - s * s) / (nn * (nn - 1)), np.nan)
+    return mean, np.sqrt(var)
+
+
+def score(
+    today: np.ndarray,
+    mean: np.ndarray,
+    std: np.ndarray,
+    weights: tuple[float, float, float],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    growth ratios, z-scores and trend_score from the arrays of rolling_stats.
+    Undefined values (no or zero std) are NaN and count as 0 in trend_score, like COALESCE(z, 0).
+    """
+    safe_std = np.where(std > 0, std, np.nan)
+    growth = today / safe_std
+    z = (today - mean) / safe_std
+    trend = np.nan_to_num(z, nan=0.0) @ np.asarray(weights, dtype=np.float64)
+    return growth, z, trend
+
+
+def sparse_rolling_stats(
+    group: np.ndarray,
+    day: np.ndarray,
+    values: np.ndarray,
+    lookback_days: int,
+    at: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    rolling_stats for activity kept as rows instead of a dense matrix, so memory follows the number
+    of active repo-days rather than repos x days.
+
+    group: int array (rows,) repo ids; day: int array (rows,) day numbers; values: (rows, metrics).
+    Rows must be sorted by (group, day) with at most one row per group and day.
+
+    Returns (n, mean, std) per row over the same repo's rows in [day - lookback_days, day - 1];
+    with `at` (row indices) only for those rows. The prefix sums still cover every row.
+    """
+    values = values.astype(np.int64, copy=False)
+    day = day.astype(np.int64, copy=False)
+    rows = len(day)
+    # One key space per group, offset so that day - lookback_days never reaches the previous group
+    span = int(day.max()) + lookback_days + 1 if rows else 1
+    key = group.astype(np.int64) * span + day + lookback_days
+    if rows > 1 and not np.all(np.diff(key) > 0):
+        raise ValueError("Rows must be sorted by (group, day) and unique.")
+
+    hi = np.arange(rows) if at is None else np.asarray(at, dtype=np.int64)
+    lo = np.searchsorted(key, key[hi] - lookback_days, side="left")
+    cs = np.zeros((rows + 1, values.shape[1]), dtype=np.int64)
+    cs2 = np.zeros((rows + 1, values.shape[1]), dtype=np.int64)
+    np.cumsum(values, axis=0, out=cs[1:])
+    np.cumsum(values * values, axis=0, out=cs2[1:])
+    s = cs[hi] - cs[lo]
+    s2 = cs2[hi] - cs2[lo]
+    n = hi - lo
+
+    return n, *moments(n, s, s2)
@@ -1,28 +1,59 @@
+"""
+Daily job: extract, transform and compute yesterday (UTC) in one process.
+
+The stages share one Settings and one BQQueryRunner, so the BigQuery client and its HTTP connection
+pool (or the DuckDB connection) are created once, on the first query, instead of once per
+`python -m` subprocess. The run is recorded as one "daily" manifest whose steps cover all three
+stages.
+
+    python -m pipeline.run_daily                     # yesterday
+    python -m pipeline.run_daily --date 2025-10-20
+"""
+
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
-import subprocess
-import sys
+import argparse
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from pipeline.bq import BQQueryRunner
+from pipeline.compute import compute_date
+from pipeline.config import Settings
+from pipeline.extract import extract_date
+from pipeline.telemetry import record_run
+from pipeline.transform import run_transform
 
 def yesterday_utc_iso() -> str:
     d = datetime.now(timezone.utc).date() - timedelta(days=1)
     return d.isoformat()
 
+def run_daily(bq: BQQueryRunner, settings: Settings, date_str: str) -> None:
+    d = date.fromisoformat(date_str)
+    stages = [
+        ("extract", lambda: extract_date(bq, settings, date_str)),
+        ("transform", lambda: run_transform(bq, settings, d, d)),
+        ("compute", lambda: compute_date(bq, settings, date_str)),
+    ]
+    for name, stage in stages:
+        print(f"\n== {name} {date_str}")
+        started = time.monotonic()
+        stage()
+        print(f"== {name} done in {time.monotonic() - started:.1f}s")
+
 def main() -> None:
-    date_str = yesterday_utc_iso()
-    print(f"Running daily pipeline for date: {date_str}")
+    parser = argparse.ArgumentParser(description="Extract, transform and compute one day in one process.")
+    parser.add_argument("--date", help="YYYY-MM-DD (UTC). Default: yesterday.")
+    args = parser.parse_args()
 
-    cmds = [
-        [sys.executable, "-m", "pipeline.extract", "--date", date_str],
-        [sys.executable, "-m", "pipeline.transform"],
-        [sys.executable, "-m", "pipeline.compute", "--date", date_str],
-    ]
+    date_str = args.date or yesterday_utc_iso()
+    print(f"Running daily pipeline for date: {date_str}")
 
-    for cmd in cmds:
-        print(f"\nExecuting: {' '.join(cmd)}")
-        subprocess.run(cmd, check=True)
+    settings = Settings.load()
+    bq = BQQueryRunner(settings)
+    with record_run(bq, settings, "daily", {"date": date_str}):
+        run_daily(bq, settings, date_str)
 
     print("\nDaily pipeline run completed.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
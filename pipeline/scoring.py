@@ -0,0 +1,316 @@
+"""
+Trend scoring in NumPy: the Python counterpart of sql/30_marts/00_trending_repos_daily.sql and of
+the repo alert severity in pipeline/compute.py.
+
+daily_repo_activity for [from - LOOKBACK_DAYS, to] is loaded once as integer arrays (repos are
+repo ids), one row per active repo-day sorted by (repo, day). Rolling means and standard deviations, z-scores, growth ratios,
+trend_score and severity are then computed for all rows at once (rolling.sparse_rolling_stats),
+with the weights and thresholds from Settings.
+
+With SCORING_ENGINE=numpy, transform writes trending_repos_daily with this module and compute
+writes repo alerts with it. `python -m pipeline.scoring` scores a cached activity file with other
+weights or thresholds, so scoring models can be tried without running warehouse jobs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from pipeline.bq import BQQueryRunner
+from pipeline.compute import run_transaction
+from pipeline.config import Settings
+from pipeline.rolling import METRICS, score, sparse_rolling_stats
+
+ACTIVITY_SQL = """
+SELECT event_date, repo_id, events_total, actors_unique, stars
+FROM `${STG_DATASET}.daily_repo_activity`
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
+"""
+
+# Names for the cached activity file of `python -m pipeline.scoring`
+REPO_NAMES_SQL = """
+SELECT n.repo_id, n.repo_name
+FROM `${STG_DATASET}.repo_names` n
+WHERE n.repo_id IN (
+    SELECT repo_id
+    FROM `${STG_DATASET}.daily_repo_activity`
+    WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
+)
+"""
+
+DELETE_TRENDING_SQL = """
+DELETE FROM `${MART_DATASET}.trending_repos_daily`
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}");
+"""
+
+TRENDING_COLUMNS = """event_date, repo_id, events_today, actors_today, stars_today,
+    avg_events_prev, std_events_prev, growth_events_ratio, z_events,
+    avg_actors_prev, std_actors_prev, growth_actors_ratio, z_actors,
+    avg_stars_prev, std_stars_prev, growth_stars_ratio, z_stars, trend_score"""
+
+DELETE_STAGED_TRENDING_SQL = """
+DELETE FROM `${STG_DATASET}.trending_repos_staging`
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}");
+"""
+
+# The range's scores are loaded into trending_repos_staging first, so a failed load leaves the
+# published rows in place; this swaps them in and clears the staged range in one transaction
+PUBLISH_TRENDING_SQL = f"""
+BEGIN TRANSACTION;
+
+DELETE FROM `${{MART_DATASET}}.trending_repos_daily`
+WHERE event_date BETWEEN DATE("${{DATE_FROM}}") AND DATE("${{DATE_TO}}");
+
+INSERT INTO `${{MART_DATASET}}.trending_repos_daily` ({TRENDING_COLUMNS})
+SELECT {TRENDING_COLUMNS}
+FROM `${{STG_DATASET}}.trending_repos_staging`
+WHERE event_date BETWEEN DATE("${{DATE_FROM}}") AND DATE("${{DATE_TO}}");
+
+DELETE FROM `${{STG_DATASET}}.trending_repos_staging`
+WHERE event_date BETWEEN DATE("${{DATE_FROM}}") AND DATE("${{DATE_TO}}");
+
+COMMIT TRANSACTION;
+"""
+
+ENRICHED_SQL = """
+SELECT repo_name, primary_language, events_today, actors_today, stars_today,
+       growth_events_ratio, z_events, trend_score
+FROM `${MART_DATASET}.trending_repos_enriched`
+WHERE event_date = DATE(@date)
+"""
+
+SEVERITIES = np.array(["low", "medium", "high"])
+
+
+@dataclass
+class Activity:
+    """daily_repo_activity as arrays: row i is repo_id repos[group[i]] on start + day[i] days."""
+    start: date
+    repos: np.ndarray
+    group: np.ndarray
+    day: np.ndarray
+    # (rows, 3): events_total, actors_unique, stars
+    values: np.ndarray
+    # Repo names aligned with repos, only in the cache file of `python -m pipeline.scoring`
+    names: np.ndarray | None = None
+
+    @staticmethod
+    def from_rows(rows: list[dict], start: date) -> Activity:
+        repos, group = np.unique(np.array([r["repo_id"] for r in rows], dtype=np.int64), return_inverse=True)
+        day = (
+            np.array([r["event_date"] for r in rows], dtype="datetime64[D]") - np.datetime64(start, "D")
+        ).astype(np.int64)
+        values = np.array(
+            [(r["events_total"], r["actors_unique"], r["stars"]) for r in rows], dtype=np.int64
+        ).reshape(-1, 3)
+        order = np.lexsort((day, group))
+        return Activity(start, repos, group[order], day[order], values[order])
+
+    def save(self, path: str | Path) -> None:
+        names = {} if self.names is None else {"names": self.names.astype(str)}
+        np.savez(path, start=np.datetime64(self.start, "D"), repos=self.repos,
+                 group=self.group, day=self.day, values=self.values, **names)
+
+    @staticmethod
+    def load(path: str | Path) -> Activity:
+        with np.load(path) as f:
+            start = f["start"].astype("datetime64[D]").item()
+            names = f["names"].astype(object) if "names" in f else None
+            return Activity(start, f["repos"], f["group"], f["day"], f["values"], names)
+
+
+def load_activity(bq: BQQueryRunner, date_from: date, date_to: date, lookback_days: int) -> Activity:
+    """Activity for [date_from, date_to] plus the lookback window before it."""
+    start = date_from - timedelta(days=lookback_days)
+    rows = bq.query(ACTIVITY_SQL, extra={"DATE_FROM": start.isoformat(), "DATE_TO": date_to.isoformat()})
+    return Activity.from_rows(rows, start)
+
+
+def score_activity(
+    activity: Activity,
+    date_from: date,
+    date_to: date,
+    lookback_days: int,
+    weights: tuple[float, float, float],
+    min_events: int,
+) -> dict[str, np.ndarray]:
+    """trending_repos_daily columns for the repo-days in [date_from, date_to] with events >= min_events."""
+    first = (date_from - activity.start).days
+    last = (date_to - activity.start).days
+    # Lookback-only rows feed the window sums but are not scored themselves
+    keep = np.flatnonzero((activity.day >= first) & (activity.day <= last) & (activity.values[:, 0] >= min_events))
+    today = activity.values[keep]
+    _, mean, std = sparse_rolling_stats(activity.group, activity.day, activity.values, lookback_days, at=keep)
+    growth, z, trend = score(today, mean, std, weights)
+
+    # One string per distinct day; converting every row's datetime64 is slow
+    day_names = np.array([(activity.start + timedelta(days=d)).isoformat() for d in range(last + 1)])
+    columns: dict[str, np.ndarray] = {
+        "event_date": day_names[activity.day[keep]],
+        "repo_id": activity.repos[activity.group[keep]],
+        "events_today": today[:, 0],
+        "actors_today": today[:, 1],
+        "stars_today": today[:, 2],
+    }
+    for i, metric in enumerate(METRICS):
+        columns[f"avg_{metric}_prev"] = mean[:, i]
+        columns[f"std_{metric}_prev"] = std[:, i]
+        columns[f"growth_{metric}_ratio"] = growth[:, i]
+        columns[f"z_{metric}"] = z[:, i]
+    columns["trend_score"] = trend
+    return columns
+
+
+def severity(
+    z_events: np.ndarray,
+    growth_events: np.ndarray,
+    z_high: float,
+    z_medium: float,
+    growth_high: float,
+    growth_medium: float,
+) -> np.ndarray:
+    """'high' / 'medium' / 'low' per row; NaN (NULL) never reaches a threshold, like in SQL."""
+    with np.errstate(invalid="ignore"):
+        high = (z_events >= z_high) | (growth_events >= growth_high)
+        medium = (z_events >= z_medium) | (growth_events >= growth_medium)
+    return SEVERITIES[np.where(high, 2, np.where(medium, 1, 0))]
+
+
+def to_rows(columns: dict[str, np.ndarray]) -> list[dict]:
+    """Column arrays -> row dicts for load_rows, with NaN as NULL."""
+    lists = {}
+    for name, values in columns.items():
+        if values.dtype.kind == "f":
+            lists[name] = [None if v != v else v for v in values.tolist()]
+        else:
+            lists[name] = values.tolist()
+    names = list(lists)
+    return [dict(zip(names, row)) for row in zip(*lists.values())]
+
+
+def score_range(bq: BQQueryRunner, settings: Settings, date_from: date, date_to: date) -> int:
+    """
+    Replace trending_repos_daily for [date_from, date_to] with NumPy scores in one transaction
+    (through trending_repos_staging). Returns the row count.
+    """
+    started = time.perf_counter()
+    activity = load_activity(bq, date_from, date_to, settings.lookback_days)
+    loaded = time.perf_counter()
+    columns = score_activity(
+        activity, date_from, date_to, settings.lookback_days, settings.trend_weights, settings.min_events_threshold
+    )
+    scored = time.perf_counter()
+    rows = to_rows(columns)
+
+    extra = {"DATE_FROM": date_from.isoformat(), "DATE_TO": date_to.isoformat()}
+    # Stage, then swap: readers see the old scores or the new ones, never an empty range
+    bq.run(DELETE_STAGED_TRENDING_SQL, extra=extra, step="scoring")
+    if rows:
+        bq.load_rows("${STG_DATASET}.trending_repos_staging", rows)
+    run_transaction(bq, settings, PUBLISH_TRENDING_SQL, extra, "scoring")
+    print(
+        f"  scored {len(activity.day):,} repo-days in {scored - loaded:.3f}s "
+        f"(load {loaded - started:.2f}s, write {time.perf_counter() - scored:.2f}s); {len(rows):,} trending rows"
+    )
+    return len(rows)
+
+
+def repo_alert_rows(enriched: list[dict], settings: Settings, event_date: str, created_at: str) -> list[dict]:
+    """Repo alerts of one date from its trending_repos_enriched rows, like compute.REPO_ALERTS_SQL."""
+    if not enriched:
+        return []
+
+    def column(name: str, dtype=np.float64) -> np.ndarray:
+        return np.array([np.nan if r[name] is None else r[name] for r in enriched], dtype=dtype)
+
+    z, growth, trend = column("z_events"), column("growth_events_ratio"), column("trend_score")
+    with np.errstate(invalid="ignore"):
+        alert = (z >= settings.alert_z_threshold_low) | (growth >= settings.alert_growth_threshold_low)
+    # Highest trend_score first; NULL scores sort last, as in ORDER BY ... DESC
+    candidates = np.flatnonzero(alert)
+    order = candidates[np.argsort(-np.nan_to_num(trend[candidates], nan=-np.inf), kind="stable")]
+    picked = order[: settings.max_repo_alerts]
+    levels = severity(
+        z[picked], growth[picked],
+        settings.severity_z_high, settings.severity_z_medium,
+        settings.severity_growth_high, settings.severity_growth_medium,
+    )
+    return [
+        {
+            "event_date": event_date,
+            "alert_type": "repo",
+            "entity": enriched[i]["repo_name"],
+            "severity": level,
+            "trend_score": enriched[i]["trend_score"],
+            "z_events": enriched[i]["z_events"],
+            "growth_events_ratio": enriched[i]["growth_events_ratio"],
+            "events_today": enriched[i]["events_today"],
+            "actors_today": enriched[i]["actors_today"],
+            "stars_today": enriched[i]["stars_today"],
+            "primary_language": enriched[i]["primary_language"],
+            "created_at": created_at,
+        }
+        for i, level in zip(picked.tolist(), levels.tolist())
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Try scoring parameters on cached activity; writes nothing.")
+    parser.add_argument("--from", dest="date_from", required=True, help="YYYY-MM-DD (UTC), inclusive.")
+    parser.add_argument("--to", dest="date_to", required=True, help="YYYY-MM-DD (UTC), inclusive.")
+    parser.add_argument("--activity", default="local/activity.npz",
+                        help="Activity cache; loaded from daily_repo_activity when missing.")
+    parser.add_argument("--weights", help="events,actors,stars (default: TREND_WEIGHTS).")
+    parser.add_argument("--min-events", type=int, help="Default: MIN_EVENTS_THRESHOLD.")
+    parser.add_argument("--top", type=int, default=10, help="Repos to print per date.")
+    args = parser.parse_args()
+
+    settings = Settings.load()
+    date_from, date_to = date.fromisoformat(args.date_from), date.fromisoformat(args.date_to)
+    path = Path(args.activity)
+    start = date_from - timedelta(days=settings.lookback_days)
+    if path.exists():
+        activity = Activity.load(path)
+        if activity.start > start or activity.start + timedelta(days=int(activity.day.max(initial=-1))) < date_to:
+            raise SystemExit(f"{path} does not cover {start} .. {date_to}; delete it to reload.")
+    else:
+        print(f"Loading daily_repo_activity {start} .. {date_to} into {path} ...")
+        bq = BQQueryRunner(settings)
+        activity = load_activity(bq, date_from, date_to, settings.lookback_days)
+        extra = {"DATE_FROM": start.isoformat(), "DATE_TO": date_to.isoformat()}
+        names = {r["repo_id"]: r["repo_name"] for r in bq.query(REPO_NAMES_SQL, extra=extra)}
+        activity.names = np.array([names.get(r, str(r)) for r in activity.repos.tolist()], dtype=object)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        activity.save(path)
+
+    weights = tuple(float(w) for w in args.weights.split(",")) if args.weights else settings.trend_weights
+    started = time.perf_counter()
+    columns = score_activity(
+        activity, date_from, date_to, settings.lookback_days, weights,
+        settings.min_events_threshold if args.min_events is None else args.min_events,
+    )
+    levels = severity(
+        columns["z_events"], columns["growth_events_ratio"],
+        settings.severity_z_high, settings.severity_z_medium,
+        settings.severity_growth_high, settings.severity_growth_medium,
+    )
+    print(f"Scored {len(activity.day):,} repo-days in {time.perf_counter() - started:.3f}s")
+    names = dict(zip(activity.repos.tolist(), activity.names.tolist())) if activity.names is not None else {}
+
+    for day in np.unique(columns["event_date"]):
+        idx = np.flatnonzero(columns["event_date"] == day)
+        idx = idx[np.argsort(-columns["trend_score"][idx], kind="stable")][: args.top]
+        print(f"\n{day}:")
+        for i in idx:
+            repo = columns["repo_id"][i]
+            print(f" {columns['trend_score'][i]:8.2f}  {levels[i]:<6}  {names.get(repo, repo)}")
+
+
+if __name__ == "__main__":
+    main()
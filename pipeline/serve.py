@@ -1,13 +1,30 @@
 from __future__ import annotations
 
+import hmac
+import importlib.util
+import io
+import json
 import os
-from typing import List, Optional
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, List, Optional
 
-from fastapi import FastAPI, Query
-from google.cloud import bigquery
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 
 from pipeline.config import Settings
-from pipeline.api_models import TrendingRepo, TrendingLanguage, AlertItem, DailySummary
+from pipeline.bq import BQQueryRunner
+from pipeline.async_query import AsyncQueryRunner, ClientDisconnected, QueryTimeout
+from pipeline.cache import ResponseCache, make_key
+from pipeline.compute import ROLLUP_WINDOWS
+from pipeline.encoding import JSONBytesResponse
+from pipeline.heavy_hitters import EXACT_TOP_SQL, SUMMARIES_SQL, merge_rows
+from pipeline.history import HISTORY_SQL, HistoryCache, days_between
+from pipeline.pagination import Keyset, after_condition, after_params, decode_cursor, encode_cursor, order_by
+from pipeline.snapshot import SNAPSHOT_QUERIES, Snapshot, SnapshotStore
+from pipeline.api_models import (
+    TrendingRepo, TrendingLanguage, AlertItem, DailySummary, IntradayStatus, LanguageTopRepos, RepoHistory,
+)
 
 app = FastAPI(
     title="GitHub Trend Pipeline API",
@@ -16,25 +33,210 @@ app = FastAPI(
 )
 
 settings = Settings.load()
-bq_client = bigquery.Client(project=settings.gcp_project_id, location=settings.bq_location)
+bq_runner = BQQueryRunner(settings)
+async_runner = AsyncQueryRunner(
+    bq_runner,
+    max_concurrency=settings.api_max_concurrent_queries,
+    timeout_s=settings.api_query_timeout_s,
+    columnar=importlib.util.find_spec("pyarrow") is not None,
+)
+cache = ResponseCache(
+    max_entries=settings.cache_max_entries,
+    max_bytes=settings.cache_max_bytes,
+    volatile_ttl_s=settings.cache_volatile_ttl_s,
+    final_ttl_s=settings.cache_final_ttl_s,
+)
+history_cache = HistoryCache(
+    max_repos=settings.history_cache_max_repos,
+    volatile_ttl_s=settings.cache_volatile_ttl_s,
+    final_ttl_s=settings.cache_final_ttl_s,
+)
+snapshots = SnapshotStore(settings.snapshot_dir, settings.snapshot_max_dates) if settings.snapshot_dir else None
 
 MART_DATASET = settings.mart_dataset
 
-def _run_query(sql: str, params: list[bigquery.ScalarQueryParameter]) -> list[dict]:
-    job_config = bigquery.QueryJobConfig(query_parameters=params)
-    rows = bq_client.query(sql, job_config=job_config).result()
-    return [dict(row) for row in rows]
+# Bounds of one history request
+HISTORY_MAX_REPOS = 50
+HISTORY_MAX_DAYS = 366
+
+WINDOW_PATTERN = "^(1d|" + "|".join(ROLLUP_WINDOWS) + ")$"
+
+# Sort keys of the list endpoints, also their keyset cursors; the same order as the snapshots
+REPO_KEYSET: Keyset = [("trend_score", "DESC"), ("repo_name", "ASC")]
+LANGUAGE_KEYSET: Keyset = [("total_trend_score", "DESC"), ("primary_language", "ASC")]
+SEVERITY_RANK = {"high": 3, "medium": 2, "low": 1}
+ALERT_KEYSET: Keyset = [
+    ("CASE severity WHEN 'high' THEN 3 WHEN 'medium' THEN 2 WHEN 'low' THEN 1 ELSE 0 END", "DESC"),
+    ("COALESCE(trend_score, 0)", "DESC"),
+    ("entity", "ASC"),
+]
+
+# Whole-date exports, in the same column order and row order as the snapshots
+EXPORT_QUERIES = {
+    "trending_repos_enriched": SNAPSHOT_QUERIES["repos"],
+    "alerts_daily": SNAPSHOT_QUERIES["alerts"],
+}
+
+# A date is final once the daily compute has published it (pipeline.hourly publishes provisional summaries).
+# The cached endpoints select it with their rows, so no extra query decides how long to cache them.
+FINAL_COLUMN = f"""EXISTS (
+        SELECT 1 FROM `{MART_DATASET}.daily_summary` s
+        WHERE s.event_date = DATE(@date) AND s.provisional IS NOT TRUE
+    ) AS _final"""
+
+REPO_ROLLUP_SQL = f"""
+SELECT
+    CAST(event_date AS STRING) AS event_date,
+    repo_name,
+    primary_language,
+    license,
+    events_total AS events_today,
+    actors_total AS actors_today,
+    stars_total AS stars_today,
+    CAST(NULL AS FLOAT64) AS growth_events_ratio,
+    CAST(NULL AS FLOAT64) AS z_events,
+    trend_score,
+    window_days,
+    trending_days,
+    {FINAL_COLUMN}
+FROM `{MART_DATASET}.trending_repos_rollup`
+WHERE event_date = DATE(@date)
+    AND window_days = @window_days
+    AND (@language IS NULL OR primary_language = @language)
+    AND {{after}}
+ORDER BY {order_by(REPO_KEYSET)}
+LIMIT @limit;
+"""
+
+LANGUAGE_ROLLUP_SQL = f"""
+SELECT
+    CAST(event_date AS STRING) AS event_date,
+    primary_language,
+    trending_repos_count,
+    events_total AS events_today_total,
+    actors_total AS actors_today_total,
+    stars_total AS stars_today_total,
+    avg_trend_score,
+    total_trend_score,
+    top_repos,
+    window_days,
+    {FINAL_COLUMN}
+FROM `{MART_DATASET}.trending_languages_rollup`
+WHERE event_date = DATE(@date)
+    AND window_days = @window_days
+    AND {{after}}
+ORDER BY {order_by(LANGUAGE_KEYSET)}
+LIMIT @limit;
+"""
+
+def _snapshot(date: str) -> Optional[Snapshot]:
+    """The compute snapshot for date, if there is one; endpoints fall back to querying the marts."""
+    return snapshots.get(date) if snapshots else None
+
+async def _run_query(sql: str, params: dict, request: Request) -> list[dict]:
+    try:
+        return await async_runner.query(sql, params, is_disconnected=request.is_disconnected)
+    except QueryTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnected:
+        # Nobody reads this response; 499 only shows up in access logs
+        raise HTTPException(status_code=499, detail="Client closed request")
+
+def _after(cursor: Optional[str], keys: Keyset) -> tuple[str, dict]:
+    """SQL condition and parameters for the rows after cursor; TRUE and none for the first page."""
+    if cursor is None:
+        return "TRUE", {}
+    try:
+        values = decode_cursor(cursor, keys)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return after_condition(keys), after_params(values)
+
+def _page(rows: list[dict], limit: int, key: Callable[[dict], list], model: type[BaseModel]) -> JSONBytesResponse:
+    """
+    rows as the response, with an X-Next-Cursor header when the page is full (there may be more).
+    Optional fields the rows lack (snapshots have no window_days) are added as null, as validation would.
+    """
+    missing = [name for name in model.model_fields if rows and name not in rows[0]]
+    if missing:
+        rows = [{**row, **dict.fromkeys(missing)} for row in rows]
+    headers = {"X-Next-Cursor": encode_cursor(key(rows[-1]))} if len(rows) == limit else None
+    return JSONBytesResponse(rows, headers=headers)
+
+def _repo_key(row: dict) -> list:
+    return [row["trend_score"], row["repo_name"]]
+
+def _language_key(row: dict) -> list:
+    return [row["total_trend_score"], row["primary_language"]]
+
+def _alert_key(row: dict) -> list:
+    return [SEVERITY_RANK.get(row["severity"], 0), row["trend_score"] or 0, row["entity"]]
+
+async def _cached_query(endpoint: str, sql: str, params: dict, request: Request) -> list[dict]:
+    """
+    _run_query through the response cache; every endpoint is scoped by params["date"]. Rows carrying a
+    true _final column (FINAL_COLUMN) are cached as final; the column is not returned.
+    """
+    key = make_key(endpoint, params)
+    hit, rows = cache.get(key)
+    if hit:
+        return rows
+    rows = await _run_query(sql, params, request)
+    # Identical concurrent requests share the fetched rows, so they are copied rather than changed
+    final = bool(rows) and all(row.get("_final") for row in rows)
+    rows = [{k: v for k, v in row.items() if k != "_final"} for row in rows]
+    cache.put(key, rows, params["date"], final=final)
+    return rows
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "project": settings.gcp_project_id, "mart_dataset": MART_DATASET}
+    return {
+        "status": "ok",
+        "engine": settings.engine,
+        "project": settings.gcp_project_id,
+        "mart_dataset": MART_DATASET,
+        "cache": cache.snapshot(),
+        "history": history_cache.snapshot(),
+        "queries": async_runner.snapshot(),
+        "snapshots": snapshots.snapshot() if snapshots else None,
+    }
+
+@app.post("/cache/invalidate")
+def cache_invalidate(
+    date: Optional[str] = Query(None, description="YYYY-MM-DD; omit to clear everything"),
+    authorization: Optional[str] = Header(None, description="Bearer CACHE_INVALIDATE_TOKEN"),
+):
+    """Drop cached responses and history days for a date; only for callers holding CACHE_INVALIDATE_TOKEN."""
+    token = settings.cache_invalidate_token
+    if not token:
+        raise HTTPException(status_code=403, detail="Cache invalidation is disabled (CACHE_INVALIDATE_TOKEN is unset)")
+    if not hmac.compare_digest((authorization or "").encode(), f"Bearer {token}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing token", headers={"WWW-Authenticate": "Bearer"})
+    history_cache.invalidate(date)
+    return {"date": date, "removed": cache.invalidate(date)}
 
 @app.get("/trending/repos", response_model=List[TrendingRepo])
-def trending_repos(
+async def trending_repos(
+    request: Request,
     date: str = Query(..., description="YYYY-MM-DD"),
     limit: int = Query(50, ge=1, le=200),
-    language: Optional[str] = Query(None, description="Filter by primary_language")
+    language: Optional[str] = Query(None, description="Filter by primary_language"),
+    window: str = Query("1d", pattern=WINDOW_PATTERN, description="1d, or a rolling window ending on date"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
 ):
+    after, after_values = _after(cursor, REPO_KEYSET)
+    if window != "1d":
+        params = {
+            "date": date, "window_days": ROLLUP_WINDOWS[window], "limit": limit, "language": language, **after_values
+        }
+        rows = await _cached_query("/trending/repos", REPO_ROLLUP_SQL.format(after=after), params, request)
+        return _page(rows, limit, _repo_key, TrendingRepo)
+
+    # Snapshots serve first pages; later pages come from the marts, in the same order
+    snap = _snapshot(date) if cursor is None else None
+    if snap is not None:
+        return _page(snap.trending_repos(limit, language), limit, _repo_key, TrendingRepo)
+
     sql = f"""
     SELECT
         CAST(event_date AS STRING) AS event_date,
@@ -46,25 +248,44 @@ def trending_repos(
         stars_today,
         growth_events_ratio,
         z_events,
-        trend_score
+        trend_score,
+        CAST(NULL AS INT64) AS window_days,
+        CAST(NULL AS INT64) AS trending_days,
+        {FINAL_COLUMN}
     FROM `{MART_DATASET}.trending_repos_enriched`
     WHERE event_date = DATE(@date)
         AND (@language IS NULL OR primary_language = @language)
-    ORDER BY trend_score DESC
+        AND {after}
+    ORDER BY {order_by(REPO_KEYSET)}
     LIMIT @limit;
     """
-    params = [
-        bigquery.ScalarQueryParameter("date", "STRING", date),
-        bigquery.ScalarQueryParameter("limit", "INT64", limit),
-        bigquery.ScalarQueryParameter("language", "STRING", language),
-    ]
-    return _run_query(sql, params)
+    params = {
+        "date": date,
+        "limit": limit,
+        "language": language,
+        **after_values,
+    }
+    rows = await _cached_query("/trending/repos", sql, params, request)
+    return _page(rows, limit, _repo_key, TrendingRepo)
 
 @app.get("/trending/languages", response_model=List[TrendingLanguage])
-def trending_languages(
+async def trending_languages(
+    request: Request,
     date: str = Query(..., description="YYYY-MM-DD"),
-    limit: int = Query(20, ge=1, le=200)
+    limit: int = Query(20, ge=1, le=200),
+    window: str = Query("1d", pattern=WINDOW_PATTERN, description="1d, or a rolling window ending on date"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
 ):
+    after, after_values = _after(cursor, LANGUAGE_KEYSET)
+    if window != "1d":
+        params = {"date": date, "window_days": ROLLUP_WINDOWS[window], "limit": limit, **after_values}
+        rows = await _cached_query("/trending/languages", LANGUAGE_ROLLUP_SQL.format(after=after), params, request)
+        return _page(rows, limit, _language_key, TrendingLanguage)
+
+    snap = _snapshot(date) if cursor is None else None
+    if snap is not None:
+        return _page(snap.trending_languages(limit), limit, _language_key, TrendingLanguage)
+
     sql = f"""
     SELECT
         CAST(event_date AS STRING) AS event_date,
@@ -75,25 +296,71 @@ def trending_languages(
         stars_today_total,
         avg_trend_score,
         total_trend_score,
-        top_repos
+        top_repos,
+        CAST(NULL AS INT64) AS window_days,
+        {FINAL_COLUMN}
     FROM `{MART_DATASET}.trending_languages_daily`
     WHERE event_date = DATE(@date)
-    ORDER BY total_trend_score DESC
+        AND {after}
+    ORDER BY {order_by(LANGUAGE_KEYSET)}
     LIMIT @limit;
     """
-    params = [
-        bigquery.ScalarQueryParameter("date", "STRING", date),
-        bigquery.ScalarQueryParameter("limit", "INT64", limit),
-    ]
-    return _run_query(sql, params)
+    params = {
+        "date": date,
+        "limit": limit,
+        **after_values,
+    }
+    rows = await _cached_query("/trending/languages", sql, params, request)
+    return _page(rows, limit, _language_key, TrendingLanguage)
+
+@app.get("/languages/top-repos", response_model=LanguageTopRepos)
+async def language_top_repos(
+    request: Request,
+    language: str = Query(..., description="Primary language, e.g. Go"),
+    date_from: str = Query(..., alias="from", description="YYYY-MM-DD"),
+    date_to: str = Query(..., alias="to", description="YYYY-MM-DD"),
+    metric: str = Query("events", pattern="^(events|stars)$"),
+    k: int = Query(10, ge=1, le=settings.heavy_hitters_capacity),
+    exact: bool = Query(False, description="Sum daily_repo_activity instead of merging the summaries"),
+):
+    """The language's top k repos by events or stars over [from, to], from the heavy-hitter summaries."""
+    try:
+        days = days_between(date_from, date_to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from and to must be YYYY-MM-DD")
+    if not days:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    params = {"date_from": date_from, "date_to": date_to, "language": language, "metric": metric}
+    window = merge_rows(await _run_query(SUMMARIES_SQL, params, request), settings.heavy_hitters_capacity)
+    if exact:
+        repos = await _run_query(EXACT_TOP_SQL, {**params, "k": k}, request)
+    else:
+        repos = [{"repo_name": r, "value": v, "error": e} for r, v, e in window.top(k)]
+    return JSONBytesResponse({
+        "primary_language": language,
+        "metric": metric,
+        "date_from": date_from,
+        "date_to": date_to,
+        "exact": exact,
+        "total": window.total,
+        "max_error": 0 if exact else window.max_error(),
+        "repos": repos,
+    })
 
 @app.get("/alerts", response_model=List[AlertItem])
-def alerts(
+async def alerts(
+    request: Request,
     date: str = Query(..., description="YYYY-MM-DD"),
     alert_type: Optional[str] = Query(None, description="repo|language"),
     severity: Optional[str] = Query(None, description="low|medium|high"),
-    limit: int = Query(100, ge=1, le=500)
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
 ):
+    after, after_values = _after(cursor, ALERT_KEYSET)
+    snap = _snapshot(date) if cursor is None else None
+    if snap is not None:
+        return _page(snap.alerts(alert_type, severity, limit), limit, _alert_key, AlertItem)
+
     sql = f"""
     SELECT
         CAST(event_date AS STRING) AS event_date,
@@ -107,52 +374,174 @@ def alerts(
         actors_today,
         stars_today,
         primary_language,
-        CAST(created_at AS STRING) AS created_at
+        CAST(created_at AS STRING) AS created_at,
+        {FINAL_COLUMN}
     FROM `{MART_DATASET}.alerts_daily`
     WHERE event_date = DATE(@date)
         AND (@alert_type IS NULL OR alert_type = @alert_type)
         AND (@severity IS NULL OR severity = @severity)
-    ORDER BY 
-        CASE severity
-            WHEN 'high' THEN 3
-            WHEN 'medium' THEN 2
-            WHEN 'low' THEN 1
-            ELSE 0
-        END DESC,
-        COALESCE(trend_score, 0) DESC
+        AND {after}
+    ORDER BY {order_by(ALERT_KEYSET)}
     LIMIT @limit;
     """
-    params = [
-        bigquery.ScalarQueryParameter("date", "STRING", date),
-        bigquery.ScalarQueryParameter("alert_type", "STRING", alert_type),
-        bigquery.ScalarQueryParameter("severity", "STRING", severity),
-        bigquery.ScalarQueryParameter("limit", "INT64", limit),
-    ]
-    return _run_query(sql, params)
+    params = {
+        "date": date,
+        "alert_type": alert_type,
+        "severity": severity,
+        "limit": limit,
+        **after_values,
+    }
+    rows = await _cached_query("/alerts", sql, params, request)
+    return _page(rows, limit, _alert_key, AlertItem)
 
 @app.get("/summary", response_model=Optional[DailySummary])
-def summary(date: str = Query(..., description="YYYY-MM-DD")):
+async def summary(request: Request, date: str = Query(..., description="YYYY-MM-DD")):
+    snap = _snapshot(date)
     sql = f"""
     SELECT
         CAST(event_date AS STRING) AS event_date,
         summary_text,
         top_repos,
         top_languages,
-        CAST(created_at AS STRING) AS created_at
+        CAST(created_at AS STRING) AS created_at,
+        provisional IS NOT TRUE AS _final
     FROM `{MART_DATASET}.daily_summary`
     WHERE event_date = DATE(@date)
     LIMIT 1;
     """
-    params = [
-        bigquery.ScalarQueryParameter("date", "STRING", date),
-    ]
-    rows = _run_query(sql, params)
+    params = {
+        "date": date,
+    }
+    rows = snap.summary() if snap is not None else await _cached_query("/summary", sql, params, request)
     if not rows:
-        return {
+        return JSONBytesResponse({
             "event_date": date,
             "summary_text": "No summary available for this date.",
             "top_repos": [],
             "top_languages": [],
             "created_at": "",
-        }
-    return rows[0]
\ No newline at end of file
+        })
+    return JSONBytesResponse(rows[0])
+
+@app.get("/intraday", response_model=IntradayStatus)
+async def intraday(
+    request: Request,
+    date: Optional[str] = Query(None, description="YYYY-MM-DD; default today (UTC)"),
+):
+    """Whether a date's rows are provisional (pipeline.hourly) and how much of the day they cover."""
+    # pipeline.hourly brings NumPy and the transform modules, which nothing else here needs
+    from pipeline.hourly import INTRADAY_STATUS_SQL
+
+    date = date or datetime.now(timezone.utc).date().isoformat()
+    row = (await _cached_query("/intraday", INTRADAY_STATUS_SQL, {"date": date}, request))[0]
+    hours = row["hours"] or 0
+    return JSONBytesResponse({
+        "event_date": date,
+        "hours": hours,
+        "last_hour": row["last_hour"],
+        "day_fraction": hours / 24,
+        "provisional": hours > 0 and not row["final"],
+    })
+
+async def _history(repos: list[str], date_from: str, date_to: str, request: Request) -> list[dict]:
+    """Each repo's points in [date_from, date_to]; days missing from the history cache in one query."""
+    try:
+        days = days_between(date_from, date_to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from and to must be YYYY-MM-DD")
+    if not 1 <= len(days) <= HISTORY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"from..to must span 1 to {HISTORY_MAX_DAYS} days")
+    repos = list(dict.fromkeys(repos))
+    if not 1 <= len(repos) <= HISTORY_MAX_REPOS:
+        raise HTTPException(status_code=400, detail=f"Ask for 1 to {HISTORY_MAX_REPOS} repos")
+
+    series, missing = history_cache.lookup(repos, days)
+    if missing:
+        gaps = sorted({d for ds in missing.values() for d in ds})
+        params = {"date_from": gaps[0], "date_to": gaps[-1], "repos": sorted(missing)}
+        rows = await _run_query(HISTORY_SQL, params, request)
+        fetched_days = days_between(gaps[0], gaps[-1])
+        for repo, points in history_cache.store(rows, sorted(missing), fetched_days).items():
+            series[repo].update(points)
+    return [
+        {"repo_name": repo, "points": [series[repo][d] for d in days if series[repo].get(d) is not None]}
+        for repo in repos
+    ]
+
+@app.get("/repos/history", response_model=List[RepoHistory])
+async def repos_history(
+    request: Request,
+    repo: List[str] = Query(..., description="owner/name; repeat for more repos"),
+    date_from: str = Query(..., alias="from", description="YYYY-MM-DD"),
+    date_to: str = Query(..., alias="to", description="YYYY-MM-DD"),
+):
+    return JSONBytesResponse(await _history(repo, date_from, date_to, request))
+
+@app.get("/repos/{owner}/{name}/history", response_model=RepoHistory)
+async def repo_history(
+    request: Request,
+    owner: str,
+    name: str,
+    date_from: str = Query(..., alias="from", description="YYYY-MM-DD"),
+    date_to: str = Query(..., alias="to", description="YYYY-MM-DD"),
+):
+    (history,) = await _history([f"{owner}/{name}"], date_from, date_to, request)
+    return JSONBytesResponse(history)
+
+async def _ndjson_chunks(batches: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in batch.to_pylist()).encode("utf-8")
+
+async def _arrow_chunks(batches: AsyncIterator[Any], schema: Any) -> AsyncIterator[bytes]:
+    """An Arrow IPC stream, one message per batch; nothing but the current batch is buffered."""
+    import pyarrow as pa
+
+    buffer = io.BytesIO()
+
+    def drain() -> bytes:
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    with pa.ipc.new_stream(buffer, schema) as writer:
+        async for batch in batches:
+            writer.write_batch(batch)
+            yield drain()
+    # End-of-stream marker
+    yield drain()
+
+async def _prepend(first: Any, rest: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    yield first
+    async for item in rest:
+        yield item
+
+@app.get("/export/{table}")
+async def export(
+    table: str,
+    date: str = Query(..., description="YYYY-MM-DD"),
+    format: str = Query("ndjson", pattern="^(ndjson|arrow)$", description="ndjson or arrow (IPC stream)"),
+):
+    """
+    Every row of a table for one date, streamed in chunks of EXPORT_BATCH_ROWS rows. The export
+    takes one of the API_MAX_CONCURRENT_QUERIES slots until the response is sent.
+    """
+    if table not in EXPORT_QUERIES:
+        raise HTTPException(status_code=404, detail=f"Exportable tables: {', '.join(EXPORT_QUERIES)}")
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Exports need pyarrow (poetry install --extras arrow)")
+
+    batches = async_runner.stream(EXPORT_QUERIES[table], {"date": date}, batch_rows=settings.export_batch_rows)
+    # Run the query before answering, so a failing one is an error status rather than a cut-off stream
+    first = await anext(batches, None)
+    if first is None:
+        raise HTTPException(status_code=404, detail=f"No {table} rows for {date}")
+    batches = _prepend(first, batches)
+    headers = {"Content-Disposition": f'attachment; filename="{table}-{date}.{format}"'}
+    if format == "arrow":
+        return StreamingResponse(
+            _arrow_chunks(batches, first.schema), media_type="application/vnd.apache.arrow.stream", headers=headers
+        )
+    return StreamingResponse(_ndjson_chunks(batches), media_type="application/x-ndjson", headers=headers)
@@ -5,11 +5,22 @@ from pathlib import Path
 
 from pipeline.config import Settings
 from pipeline.bq import BQQueryRunner
+from pipeline.telemetry import record_run
 
 
 SQL_ROOT = Path(__file__).resolve().parents[1] / "sql"
 SETUP_DIR = SQL_ROOT / "00_setup"
 
+# Tables that carry the typed payload columns from Settings.payload_fields
+PAYLOAD_TABLES = ["${RAW_DATASET}.events", "${STG_DATASET}.stg_github_events"]
+
+
+def ensure_payload_columns(bq: BQQueryRunner, settings: Settings) -> None:
+    """Add any configured payload column that is missing; existing columns are left untouched."""
+    for table in PAYLOAD_TABLES:
+        for field in settings.payload_fields:
+            bq.run(f"ALTER TABLE `{table}` ADD COLUMN IF NOT EXISTS {field.column} {field.bq_type};", step="payload_columns")
+
 
 def main() -> None:
     parser = argparse.ArgumentParser()
@@ -30,14 +41,22 @@ def main() -> None:
     if args.dry_run:
         return
     
-    for file in files:
+    with record_run(bq, settings, "setup", vars(args)):
+        run_setup(bq, settings, files)
+
+def run_setup(bq: BQQueryRunner, settings: Settings, files: list[Path] | None = None) -> None:
+    """Run the setup SQL files (default: all of sql/00_setup) and add the payload columns."""
+    for file in files if files is not None else sorted(SETUP_DIR.rglob("*.sql")):
         sql = file.read_text(encoding="utf-8").strip()
         if not sql:
             continue
         print(f"\nRunning: {file.relative_to(SQL_ROOT)}")
-        res = bq.run(sql)
+        res = bq.run(sql, step=file.relative_to(SQL_ROOT).as_posix())
         print(f"\nCompleted: {file.relative_to(SQL_ROOT)}")
 
+    if settings.payload_fields:
+        print(f"\nEnsuring payload columns: {', '.join(f.column for f in settings.payload_fields)}")
+        ensure_payload_columns(bq, settings)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+Per-date serving snapshots.
+
+After compute, a date's mart rows are small and read-only. `write_snapshot` stores them as Arrow IPC
+files under SNAPSHOT_DIR/YYYY-MM-DD/ (a symlink to the latest write), already in the order the API
+returns them:
+
+    repos.arrow           trending_repos_enriched, by trend_score DESC
+    language_index.arrow  primary_language -> row ids into repos.arrow (still in trend order)
+    languages.arrow       trending_languages_daily, by total_trend_score DESC
+    alerts.arrow          alerts_daily, by severity then trend_score
+    summary.arrow         daily_summary
+
+`SnapshotStore` memory-maps them, so every endpoint is answered without running a query.
+pyarrow is an optional dependency (poetry install --extras arrow).
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Any, Optional
+
+SNAPSHOT_QUERIES = {
+    "repos": """
+    SELECT
+        CAST(event_date AS STRING) AS event_date,
+        repo_name,
+        primary_language,
+        license,
+        events_today,
+        actors_today,
+        stars_today,
+        growth_events_ratio,
+        z_events,
+        trend_score
+    FROM `${MART_DATASET}.trending_repos_enriched`
+    WHERE event_date = DATE(@date)
+    ORDER BY trend_score DESC, repo_name;
+    """,
+    "languages": """
+    SELECT
+        CAST(event_date AS STRING) AS event_date,
+        primary_language,
+        trending_repos_count,
+        events_today_total,
+        actors_today_total,
+        stars_today_total,
+        avg_trend_score,
+        total_trend_score,
+        top_repos
+    FROM `${MART_DATASET}.trending_languages_daily`
+    WHERE event_date = DATE(@date)
+    ORDER BY total_trend_score DESC, primary_language;
+    """,
+    "alerts": """
+    SELECT
+        CAST(event_date AS STRING) AS event_date,
+        alert_type,
+        entity,
+        severity,
+        trend_score,
+        z_events,
+        growth_events_ratio,
+        events_today,
+        actors_today,
+        stars_today,
+        primary_language,
+        CAST(created_at AS STRING) AS created_at
+    FROM `${MART_DATASET}.alerts_daily`
+    WHERE event_date = DATE(@date)
+    ORDER BY
+        CASE severity
+            WHEN 'high' THEN 3
+            WHEN 'medium' THEN 2
+            WHEN 'low' THEN 1
+            ELSE 0
+        END DESC,
+        COALESCE(trend_score, 0) DESC,
+        entity;
+    """,
+    "summary": """
+    SELECT
+        CAST(event_date AS STRING) AS event_date,
+        summary_text,
+        top_repos,
+        top_languages,
+        CAST(created_at AS STRING) AS created_at
+    FROM `${MART_DATASET}.daily_summary`
+    WHERE event_date = DATE(@date)
+    LIMIT 1;
+    """,
+}
+
+
+def _write_table(table: Any, path: Path) -> None:
+    import pyarrow as pa
+
+    with pa.OSFile(str(path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def write_snapshot(bq, event_date: str, snapshot_dir: str | Path) -> Path:
+    """Query the marts for event_date and (re)write its snapshot directory. Returns the directory."""
+    import pyarrow as pa  # optional dependency: poetry install --extras arrow
+
+    tables = {
+        name: pa.Table.from_pylist(bq.query(sql, params={"date": event_date}))
+        for name, sql in SNAPSHOT_QUERIES.items()
+    }
+
+    index: dict[str, list[int]] = {}
+    if tables["repos"].num_rows:
+        for i, language in enumerate(tables["repos"].column("primary_language").to_pylist()):
+            index.setdefault(language, []).append(i)
+    tables["language_index"] = pa.table({
+        "primary_language": pa.array(list(index), type=pa.string()),
+        "row_ids": pa.array(list(index.values()), type=pa.list_(pa.int32())),
+    })
+
+    # Each write goes to its own hidden directory. SNAPSHOT_DIR/YYYY-MM-DD is a symlink to the current
+    # one and is replaced in a single rename, so readers always find either the old or the new snapshot
+    root = Path(snapshot_dir)
+    target = root / event_date
+    version = root / f".{event_date}.{time.time_ns()}-{os.getpid()}"
+    version.mkdir(parents=True)
+    try:
+        for name, table in tables.items():
+            _write_table(table, version / f"{name}.arrow")
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+
+    previous = root / os.readlink(target) if target.is_symlink() else None
+    if target.is_dir() and previous is None:
+        # A plain directory written by an older version cannot be replaced by a symlink in one rename
+        shutil.rmtree(target)
+    link = root / f".{event_date}.link-{os.getpid()}"
+    link.unlink(missing_ok=True)
+    link.symlink_to(version.name)
+    os.replace(link, target)
+    if previous is not None:
+        # Readers that mapped the old files keep them until they are done
+        shutil.rmtree(previous, ignore_errors=True)
+    return target
+
+
+def _head(table: Any, limit: int) -> list[dict]:
+    # Empty query results give zero-column tables, whose slice() does not stay empty
+    return table.slice(0, limit).to_pylist() if table.num_rows else []
+
+
+class Snapshot:
+    """One date's memory-mapped tables; rows are materialized only for the slice a request returns."""
+
+    def __init__(self, path: Path):
+        import pyarrow as pa
+
+        self.path = path
+        self.tables = {}
+        for file in path.glob("*.arrow"):
+            # The tables keep referencing the mapped file, so the data is paged in lazily by the OS
+            self.tables[file.stem] = pa.ipc.open_file(pa.memory_map(str(file), "r")).read_all()
+        index = self.tables["language_index"]
+        self.language_rows: dict[str, list[int]] = dict(zip(
+            index.column("primary_language").to_pylist(),
+            index.column("row_ids").to_pylist(),
+        ))
+
+    def trending_repos(self, limit: int, language: Optional[str] = None) -> list[dict]:
+        repos = self.tables["repos"]
+        if language is None:
+            return _head(repos, limit)
+        import pyarrow as pa
+
+        row_ids = pa.array(self.language_rows.get(language, [])[:limit], type=pa.int32())
+        return repos.take(row_ids).to_pylist()
+
+    def trending_languages(self, limit: int) -> list[dict]:
+        return _head(self.tables["languages"], limit)
+
+    def alerts(self, alert_type: Optional[str], severity: Optional[str], limit: int) -> list[dict]:
+        alerts = self.tables["alerts"]
+        if not alerts.num_rows:
+            return []
+        import pyarrow.compute as pc
+
+        # Filter in Arrow; only the returned page becomes Python rows
+        mask = None
+        for column, value in (("alert_type", alert_type), ("severity", severity)):
+            if value is not None:
+                match = pc.equal(alerts.column(column), value)
+                mask = match if mask is None else pc.and_(mask, match)
+        return _head(alerts if mask is None else alerts.filter(mask), limit)
+
+    def summary(self) -> list[dict]:
+        return _head(self.tables["summary"], 1)
+
+
+class SnapshotStore:
+    """
+    Loads snapshots on first use and reloads a date when compute has pointed its symlink at a new directory.
+    Keeps the max_dates most recently used dates mapped.
+    """
+
+    def __init__(self, snapshot_dir: str | Path, max_dates: int = 8):
+        import pyarrow  # noqa: F401  - fail at startup rather than on the first request
+
+        self.root = Path(snapshot_dir)
+        self.max_dates = max_dates
+        self._loaded: OrderedDict[str, tuple[tuple[int, int], Snapshot]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, event_date: str) -> Snapshot | None:
+        try:
+            # Normalizing also keeps the request parameter from naming anything outside root
+            day = date.fromisoformat(event_date).isoformat()
+            # Load from the version the date's symlink points to now, not through the link
+            path = (self.root / day).resolve(strict=True)
+            stat = path.stat()
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        version = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            loaded = self._loaded.get(day)
+            if loaded is None or loaded[0] != version:
+                try:
+                    loaded = (version, Snapshot(path))
+                except (OSError, KeyError):
+                    # Swapped out while loading, or written by an older version
+                    self.misses += 1
+                    return None
+                self._loaded[day] = loaded
+                while len(self._loaded) > self.max_dates:
+                    # Requests still holding an evicted Snapshot keep its mapping alive until they finish
+                    self._loaded.popitem(last=False)
+            self._loaded.move_to_end(day)
+        self.hits += 1
+        return loaded[1]
+
+    def snapshot(self) -> dict:
+        return {"dir": str(self.root), "loaded": len(self._loaded), "hits": self.hits, "misses": self.misses}
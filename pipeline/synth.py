@@ -0,0 +1,332 @@
+"""
+Seeded synthetic GH Archive workload.
+
+Writes hourly `YYYY-MM-DD-H.json.gz` files shaped like GH Archive (the fields the pipeline reads,
+plus payloads for the typed payload columns) into <out>/<SOURCE_EVENTS_DATASET>/, and repository
+languages/licenses into <out>/github_repos/, so LOCAL_DATA_DIR=<out> runs the whole pipeline.
+
+- Background traffic: repo popularity follows a Zipf law (rank k gets weight 1 / k**zipf_s),
+  actors a flatter one, event types the configured mix.
+- Planted trending repos: a small steady baseline, then a burst of mostly stars and forks from new
+  actors on one of the last days. `planted_repos` says which repo bursts on which day, so the
+  trending marts can be checked against it.
+
+Every (day, hour) file has its own RNG stream derived from the seed, so the output does not depend
+on the number of worker processes. Sizes range from 10k events (tests) to 100M (benchmarks).
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import random
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+# Share of GH Archive events by type, roughly as seen in 2024-2025
+DEFAULT_EVENT_MIX = {
+    "PushEvent": 0.46,
+    "CreateEvent": 0.12,
+    "PullRequestEvent": 0.08,
+    "WatchEvent": 0.08,
+    "IssueCommentEvent": 0.07,
+    "DeleteEvent": 0.04,
+    "PullRequestReviewEvent": 0.04,
+    "PullRequestReviewCommentEvent": 0.03,
+    "IssuesEvent": 0.03,
+    "ForkEvent": 0.02,
+    "ReleaseEvent": 0.01,
+    "GollumEvent": 0.01,
+    "MemberEvent": 0.01,
+}
+# What a planted repo's burst is made of
+BURST_EVENT_MIX = {"WatchEvent": 0.7, "ForkEvent": 0.15, "IssuesEvent": 0.1, "PushEvent": 0.05}
+
+LANGUAGES = ["JavaScript", "Python", "TypeScript", "Go", "Java", "Rust", "C++", "C", "Ruby", "PHP", "Shell", "Kotlin"]
+LICENSES = ["mit", "apache-2.0", "gpl-3.0", "bsd-3-clause", "mpl-2.0"]
+_OWNER_WORDS = ["open", "data", "cloud", "fast", "micro", "hyper", "neo", "deep", "tiny", "meta", "quantum", "pixel"]
+_NAME_WORDS = ["kit", "db", "lab", "flow", "hub", "core", "forge", "stack", "graph", "lens", "ops", "ui"]
+
+# Actors are much less skewed than repos
+ACTOR_ZIPF_S = 0.8
+
+
+@dataclass
+class SynthConfig:
+    seed: int = 42
+    start: date = date(2025, 10, 1)
+    days: int = 20
+    events_per_day: int = 100_000
+    # Background repos and actors; 0 derives them from events_per_day
+    repos: int = 0
+    actors: int = 0
+    zipf_s: float = 1.1
+    hours: int = 24
+    event_mix: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_EVENT_MIX))
+    # Planted trending repos: baseline events per day, burst multiplier and floor, days bursts fall in
+    trending: int = 5
+    trending_baseline: float = 6.0
+    burst_multiplier: float = 25.0
+    burst_min_events: int = 200
+    burst_window: int = 3
+
+    def __post_init__(self) -> None:
+        self.repos = self.repos or max(self.events_per_day // 10, 100)
+        self.actors = self.actors or max(self.events_per_day // 4, 100)
+
+    @property
+    def dates(self) -> list[date]:
+        return [self.start + timedelta(days=i) for i in range(self.days)]
+
+
+@dataclass(frozen=True)
+class PlantedRepo:
+    repo_name: str
+    burst_date: date
+
+
+def repo_name(i: int) -> str:
+    """Deterministic, unique owner/name for background repo i."""
+    w = len(_OWNER_WORDS)
+    owner = f"{_OWNER_WORDS[i % w]}{_NAME_WORDS[(i // w) % w]}{i // (w * w) or ''}"
+    return f"{owner}/{_NAME_WORDS[(i * 7) % w]}-{_OWNER_WORDS[(i * 5) % w]}"
+
+
+def planted_repos(config: SynthConfig) -> list[PlantedRepo]:
+    """The trending repos and their burst dates, spread over the last burst_window days."""
+    window = max(min(config.burst_window, config.days - 1), 1)
+    return [
+        PlantedRepo(f"trending-{i}/rising-star-{i}", config.dates[-1 - i % window])
+        for i in range(config.trending)
+    ]
+
+
+@lru_cache(maxsize=4)
+def _zipf_cdf(n: int, s: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** s
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def _mix(event_mix: dict[str, float]) -> tuple[list[str], np.ndarray]:
+    types = list(event_mix)
+    p = np.asarray([event_mix[t] for t in types], dtype=np.float64)
+    return types, p / p.sum()
+
+
+def _payload(event_type: str, number: int, rnd: random.Random) -> dict:
+    if event_type == "PushEvent":
+        size = 1
+        while rnd.random() < 0.4:
+            size += 1
+        commits = [{"sha": f"{rnd.getrandbits(160):040x}", "message": f"Update {number}-{i}", "distinct": True} for i in range(min(size, 3))]
+        return {"push_id": number, "size": size, "distinct_size": size, "ref": "refs/heads/main", "commits": commits}
+    if event_type == "PullRequestEvent":
+        action = "closed" if rnd.random() < 0.45 else "opened"
+        merged = action == "closed" and rnd.random() < 0.7
+        return {
+            "action": action,
+            "number": number,
+            "pull_request": {"number": number, "state": "closed" if action == "closed" else "open", "merged": merged},
+        }
+    if event_type == "IssuesEvent":
+        action = "closed" if rnd.random() < 0.4 else "opened"
+        return {"action": action, "issue": {"number": number, "state": "closed" if action == "closed" else "open"}}
+    if event_type == "IssueCommentEvent":
+        return {"action": "created", "issue": {"number": number}, "comment": {"id": number, "body": "Thanks!"}}
+    if event_type == "WatchEvent":
+        return {"action": "started"}
+    if event_type == "CreateEvent":
+        return {"ref": f"feature-{number}", "ref_type": "branch", "master_branch": "main"}
+    if event_type == "ReleaseEvent":
+        return {"action": "published", "release": {"tag_name": f"v{number % 20}.{number % 7}.0"}}
+    return {"action": "created"} if event_type.endswith("CommentEvent") else {}
+
+
+def _event(
+    event_id: int,
+    event_type: str,
+    repo_id: int,
+    repo: str,
+    actor_id: int,
+    actor: str,
+    created_at: str,
+    rnd: random.Random,
+) -> dict:
+    return {
+        "id": str(event_id),
+        "type": event_type,
+        "actor": {"id": actor_id, "login": actor, "url": f"https://api.github.com/users/{actor}"},
+        "repo": {"id": repo_id, "name": repo, "url": f"https://api.github.com/repos/{repo}"},
+        "payload": _payload(event_type, event_id % 100_000, rnd),
+        "public": True,
+        "created_at": created_at,
+    }
+
+
+def _timestamp(day: date, second: int) -> str:
+    # strftime is a noticeable share of the generation time
+    return f"{day.isoformat()}T{second // 3600:02d}:{second % 3600 // 60:02d}:{second % 60:02d}Z"
+
+
+def _hour_count(total: int, hours: int, hour: int) -> int:
+    return total // hours + (1 if hour < total % hours else 0)
+
+
+def generate_hour(config: SynthConfig, day_index: int, hour: int) -> Iterator[dict]:
+    """The events of one hour file, in created_at order."""
+    rng = np.random.default_rng([config.seed, day_index, hour])
+    # Per-event details use the (much faster for scalars) stdlib generator, seeded from the stream
+    rnd = random.Random(int(rng.integers(0, 2**63)))
+    day = config.dates[day_index]
+    hour_start = hour * 86400 // config.hours
+    seconds_per_file = 86400 // config.hours
+    event_base = (day_index * config.hours + hour) * 10**9
+
+    # Background traffic, vectorized
+    n = _hour_count(config.events_per_day, config.hours, hour)
+    repo_ids = np.searchsorted(_zipf_cdf(config.repos, config.zipf_s), rng.random(n), side="right")
+    actor_ids = np.searchsorted(_zipf_cdf(config.actors, ACTOR_ZIPF_S), rng.random(n), side="right")
+    types, p = _mix(config.event_mix)
+    type_ids = rng.choice(len(types), size=n, p=p)
+    events: list[tuple[int, str, int, str, int, str]] = [
+        (int(r), repo_name(int(r)), int(a), f"user{int(a)}", t, "")
+        for r, a, t in zip(repo_ids, actor_ids, type_ids)
+    ]
+    all_types = list(types)
+
+    # Planted repos: a steady trickle, and their burst on the burst date
+    burst_types, burst_p = _mix(BURST_EVENT_MIX)
+    for i, planted in enumerate(planted_repos(config)):
+        repo_id = config.repos + i
+        if planted.burst_date == day:
+            mean = max(config.trending_baseline * config.burst_multiplier, config.burst_min_events)
+            for k in range(int(rng.poisson(mean / config.hours))):
+                t = rnd.choices(burst_types, weights=burst_p)[0]
+                # New actors: stargazers that found the repo today
+                events.append((repo_id, planted.repo_name, 0, f"fan{day_index}h{hour}r{i}n{k}", -1, t))
+        else:
+            for _ in range(int(rng.poisson(config.trending_baseline / config.hours))):
+                a = rnd.randint(1, 19)
+                events.append((repo_id, planted.repo_name, a, f"maintainer{i}-{a}", -1, "PushEvent"))
+
+    offsets = np.sort(rng.integers(0, seconds_per_file, size=len(events)))
+    order = rng.permutation(len(events))
+    for offset, j in zip(offsets, order):
+        repo_id, repo, actor_id, actor, t, planted_type = events[j]
+        event_type = planted_type or all_types[t]
+        yield _event(
+            event_base + int(j), event_type, repo_id, repo, actor_id, actor,
+            _timestamp(day, hour_start + int(offset)), rnd,
+        )
+
+
+def write_hour(config: SynthConfig, day_index: int, hour: int, events_dir: Path) -> tuple[Path, int]:
+    """Worker entry point: write one hour file, return its path and event count."""
+    path = events_dir / f"{config.dates[day_index].isoformat()}-{hour * 24 // config.hours}.json.gz"
+    count = 0
+    # Low compression: readers do not care and it is most of the generation time otherwise
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=1) as f:
+        for event in generate_hour(config, day_index, hour):
+            f.write(json.dumps(event, separators=(",", ":")) + "\n")
+            count += 1
+    return path, count
+
+
+def write_repo_metadata(config: SynthConfig, repos_dir: Path) -> None:
+    """languages / licenses tables for every background and planted repo (see local_engine.EMPTY_REPO_SOURCES)."""
+    # A stream no (day, hour) file uses
+    rng = np.random.default_rng([config.seed, config.days, config.hours])
+    names = [repo_name(i) for i in range(config.repos)] + [p.repo_name for p in planted_repos(config)]
+    languages = rng.zipf(1.6, size=len(names)) % len(LANGUAGES)
+    sizes = rng.integers(1, 10**6, size=len(names))
+    licenses = rng.integers(0, len(LICENSES), size=len(names))
+    repos_dir.mkdir(parents=True, exist_ok=True)
+    with gzip.open(repos_dir / "languages.json.gz", "wt", encoding="utf-8") as f:
+        for name, language, size in zip(names, languages, sizes):
+            f.write(json.dumps({"repo_name": name, "language": [{"name": LANGUAGES[language], "bytes": int(size)}]}) + "\n")
+    with gzip.open(repos_dir / "licenses.json.gz", "wt", encoding="utf-8") as f:
+        for name, license_id in zip(names, licenses):
+            f.write(json.dumps({"repo_name": name, "license": LICENSES[license_id]}) + "\n")
+
+
+def generate(
+    config: SynthConfig,
+    out_dir: str | Path,
+    events_dataset: str = "day",
+    repos_dataset: str = "github_repos",
+    workers: int | None = None,
+) -> int:
+    """Write the whole workload under out_dir (a LOCAL_DATA_DIR) and return the number of events."""
+    out = Path(out_dir)
+    events_dir = out / events_dataset
+    events_dir.mkdir(parents=True, exist_ok=True)
+    write_repo_metadata(config, out / repos_dataset)
+    (out / "synth.json").write_text(json.dumps({
+        "config": asdict(config),
+        "planted": [asdict(p) for p in planted_repos(config)],
+    }, indent=2, default=str), encoding="utf-8")
+
+    tasks = [(d, h) for d in range(config.days) for h in range(config.hours)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers == 1:
+        return sum(write_hour(config, d, h, events_dir)[1] for d, h in tasks)
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(write_hour, config, d, h, events_dir) for d, h in tasks]
+        for future in as_completed(futures):
+            total += future.result()[1]
+    return total
+
+
+def _parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        event_type, _, share = item.partition("=")
+        mix[event_type] = float(share)
+    return mix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", default="local/data", help="Directory to use as LOCAL_DATA_DIR.")
+    parser.add_argument("--from", dest="date_from", default="2025-10-01", help="First day, YYYY-MM-DD.")
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--events-per-day", type=int, default=100_000)
+    parser.add_argument("--repos", type=int, default=0, help="Background repos (default: events per day / 10).")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of repo popularity.")
+    parser.add_argument("--trending", type=int, default=5, help="Planted trending repos.")
+    parser.add_argument("--mix", help="Event type mix, e.g. PushEvent=0.5,WatchEvent=0.3,ForkEvent=0.2.")
+    parser.add_argument("--hours", type=int, default=24, help="Hour files per day.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    args = parser.parse_args()
+
+    config = SynthConfig(
+        seed=args.seed,
+        start=date.fromisoformat(args.date_from),
+        days=args.days,
+        events_per_day=args.events_per_day,
+        repos=args.repos,
+        zipf_s=args.zipf,
+        hours=args.hours,
+        trending=args.trending,
+        **({"event_mix": _parse_mix(args.mix)} if args.mix else {}),
+    )
+    print(f"Generating {config.days * config.events_per_day:,} events for {config.days} days into {args.out} ...")
+    total = generate(config, args.out, workers=args.workers)
+    print(f"Done. Wrote {total:,} events. Planted trending repos:")
+    for planted in planted_repos(config):
+        print(f" - {planted.repo_name} bursts on {planted.burst_date}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Run manifests: what every pipeline command cost and how long each step took.
+
+`record_run` wraps a command. When it exits it collects the QueryResults that the command's
+BQQueryRunner produced and writes a JSON manifest to RUN_MANIFEST_DIR. The manifest has per-step
+wall/queue/slot time, bytes, rows affected, cache hits and job ids, plus totals and a diff against
+the previous successful run of the same command. With RECORD_RUNS=true it is also appended to
+`${MART_DATASET}.pipeline_runs`.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from pipeline.bq import BQQueryRunner, QueryResult
+from pipeline.config import Settings
+
+STEP_FIELDS = [
+    "step", "job_id", "wall_ms", "queue_ms", "slot_ms",
+    "bytes_processed", "bytes_billed", "estimated_bytes", "rows_affected", "cache_hit",
+]
+TOTAL_FIELDS = ["wall_ms", "slot_ms", "bytes_processed", "bytes_billed", "rows_affected"]
+# Flag a step in the diff when bytes or wall time grew by more than this fraction
+REGRESSION_THRESHOLD = 0.2
+# ... and, for wall time, by at least this much (small steps jitter by far more than 20%)
+REGRESSION_MIN_WALL_MS = 1000
+
+
+def step_rows(results: list[QueryResult]) -> list[dict]:
+    return [{k: v for k, v in asdict(r).items() if k in STEP_FIELDS} for r in results]
+
+
+def totals_by_step(steps: list[dict]) -> dict[str, dict[str, int]]:
+    """Per step name totals; per-date models run one job per day under the same step."""
+    out: dict[str, dict[str, int]] = {}
+    for s in steps:
+        entry = out.setdefault(s["step"] or "(unnamed)", {"jobs": 0, **{f: 0 for f in TOTAL_FIELDS}})
+        entry["jobs"] += 1
+        for f in TOTAL_FIELDS:
+            entry[f] += s[f]
+    return out
+
+
+def _change(before: int, after: int) -> float | None:
+    return (after - before) / before if before else None
+
+
+def diff_runs(previous: dict, current: dict) -> list[dict]:
+    """Step-by-step comparison of wall time and bytes processed with the previous manifest."""
+    before = totals_by_step(previous["steps"])
+    after = totals_by_step(current["steps"])
+    rows = []
+    for step in list(after) + [s for s in before if s not in after]:
+        b, a = before.get(step), after.get(step)
+        row: dict[str, Any] = {"step": step, "status": "new" if b is None else "removed" if a is None else "changed"}
+        for field in ("wall_ms", "bytes_processed"):
+            row[f"{field}_before"] = b[field] if b else None
+            row[f"{field}_after"] = a[field] if a else None
+            row[f"{field}_change"] = _change(b[field], a[field]) if a and b else None
+        row["regression"] = (row["bytes_processed_change"] or 0) > REGRESSION_THRESHOLD or (
+            (row["wall_ms_change"] or 0) > REGRESSION_THRESHOLD
+            and row["wall_ms_after"] - row["wall_ms_before"] >= REGRESSION_MIN_WALL_MS
+        )
+        rows.append(row)
+    return rows
+
+
+def previous_manifest(manifest_dir: Path, command: str, args: dict[str, Any]) -> dict | None:
+    """Latest successful run of the command, preferring one with the same arguments."""
+    fallback = None
+    for path in sorted(manifest_dir.glob(f"*-{command}-*.json"), reverse=True):
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        if manifest.get("status") != "ok":
+            continue
+        if manifest.get("args") == args:
+            return manifest
+        fallback = fallback or manifest
+    return fallback
+
+
+def build_manifest(
+    command: str,
+    args: dict[str, Any],
+    engine: str,
+    status: str,
+    started_at: datetime,
+    wall_ms: int,
+    results: list[QueryResult],
+) -> dict:
+    steps = step_rows(results)
+    totals = {f: sum(s[f] for s in steps) for f in TOTAL_FIELDS}
+    # End to end wall time includes Python work between jobs; per-step wall times overlap in parallel runs
+    totals["wall_ms"] = wall_ms
+    totals["jobs"] = len(steps)
+    totals["cache_hits"] = sum(1 for s in steps if s["cache_hit"])
+    return {
+        "run_id": uuid.uuid4().hex[:12],
+        "command": command,
+        "args": {k: v for k, v in args.items() if v is not None},
+        "engine": engine,
+        "status": status,
+        "started_at": started_at.isoformat(),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "totals": totals,
+        "steps": steps,
+    }
+
+
+def print_summary(manifest: dict) -> None:
+    t = manifest["totals"]
+    print(
+        f"\nRun {manifest['run_id']} ({manifest['command']}, {manifest['status']}): "
+        f"{t['jobs']} jobs, wall {t['wall_ms'] / 1000:.1f}s, slot {t['slot_ms'] / 1000:.1f}s, "
+        f"processed {t['bytes_processed']:,} B, billed {t['bytes_billed']:,} B, "
+        f"{t['rows_affected']:,} rows affected, {t['cache_hits']} cache hits"
+    )
+    if manifest.get("previous_run_id"):
+        print(f"Compared with run {manifest['previous_run_id']}:")
+        for row in manifest["diff"]:
+            if row["status"] != "changed":
+                detail = row["status"]
+            else:
+                detail = f"wall {_pct(row['wall_ms_change'])}, bytes {_pct(row['bytes_processed_change'])}"
+            flag = "  <-- regression" if row["regression"] else ""
+            print(f" - {row['step']}: {detail}{flag}")
+
+
+def _pct(change: float | None) -> str:
+    return "n/a" if change is None else f"{change:+.0%}"
+
+
+def pipeline_runs_row(manifest: dict) -> dict:
+    t = manifest["totals"]
+    return {
+        "run_id": manifest["run_id"],
+        "command": manifest["command"],
+        "args": json.dumps(manifest["args"]),
+        "engine": manifest["engine"],
+        "status": manifest["status"],
+        "started_at": manifest["started_at"],
+        "finished_at": manifest["finished_at"],
+        **{f: t[f] for f in TOTAL_FIELDS},
+        "steps": manifest["steps"],
+    }
+
+
+@contextmanager
+def record_run(bq: BQQueryRunner, settings: Settings, command: str, args: dict[str, Any]) -> Iterator[None]:
+    """Write the manifest of everything `bq` ran inside the block, also when the command fails."""
+    started_at = datetime.now(timezone.utc)
+    started = time.monotonic()
+    first_result = len(bq.results)
+    status = "failed"
+    try:
+        yield
+        status = "ok"
+    finally:
+        manifest = build_manifest(
+            command, args, settings.engine, status, started_at,
+            int((time.monotonic() - started) * 1000), bq.results[first_result:],
+        )
+        manifest_dir = Path(settings.run_manifest_dir)
+        previous = previous_manifest(manifest_dir, command, manifest["args"]) if manifest_dir.exists() else None
+        if previous is not None:
+            manifest["previous_run_id"] = previous["run_id"]
+            manifest["diff"] = diff_runs(previous, manifest)
+
+        manifest_dir.mkdir(parents=True, exist_ok=True)
+        path = manifest_dir / f"{started_at:%Y%m%dT%H%M%S%f}-{command}-{manifest['run_id']}.json"
+        path.write_text(json.dumps(manifest, indent=2, default=str), encoding="utf-8")
+        print_summary(manifest)
+        print(f"Run manifest: {path}")
+
+        if settings.record_runs:
+            try:
+                bq.load_rows("${MART_DATASET}.pipeline_runs", [pipeline_runs_row(manifest)])
+            except Exception as e:
+                # Telemetry must not fail (or mask the error of) the command itself
+                print(f"Could not record run in pipeline_runs: {e}")
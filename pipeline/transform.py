@@ -1,13 +1,34 @@
 from __future__ import annotations
 
 import argparse
+import time
+from datetime import date
 from pathlib import Path
+from typing import Callable
 
 from pipeline.config import Settings
 from pipeline.bq import BQQueryRunner
+from pipeline.repo_cache import update_repo_dim
+from pipeline.telemetry import record_run
+from pipeline.dag import Node, levels, link, print_report, run_dag, table_refs
+from pipeline.utils.dates import MIN_DATE, MAX_DATE, iter_dates, resolve_date_range
 
 SQL_ROOT = Path(__file__).resolve().parents[1] / "sql"
 ORDERED_DIRS = ["10_staging", "20_models", "30_marts"]
+# Models that produce daily_repo_activity from raw events; `extract --source-dir` loads it directly
+ACTIVITY_MODELS = ["10_staging/stg_github_events.sql", "20_models/daily_repo_activity.sql"]
+# Model that SCORING_ENGINE=numpy replaces with pipeline.scoring (same inputs and output table)
+SCORING_MODEL = "30_marts/00_trending_repos_daily.sql"
+# Rolling state read only by SCORING_MODEL; NumPy scoring keeps its own windows, so it is skipped
+# then. pipeline.hourly builds the states it scores against itself (hourly.ensure_baseline)
+BASELINE_MODEL = "20_models/repo_baseline_state.sql"
+# Model that the local engine replaces with pipeline.repo_cache (lookups through the SQLite cache)
+REPO_DIM_MODEL = "20_models/repo_dim.sql"
+
+RAW_BOUNDS_SQL = """
+SELECT MIN(event_date) AS min_date, MAX(event_date) AS max_date
+FROM `${RAW_DATASET}.events`
+"""
 
 def iter_sql_files() -> list[Path]:
     files: list[Path] = []
@@ -18,41 +39,211 @@ def iter_sql_files() -> list[Path]:
         files.extend(sorted(folder.rglob("*.sql")))
     return files
 
+def is_per_date(sql: str) -> bool:
+    """
+    Models that reference ${DATE} (e.g. the rolling baseline state) build on the previous
+    day's output, so they run once per day in date order instead of once for the whole range.
+    """
+    return "${DATE}" in sql
+
+def step_dates(bq_runner: BQQueryRunner, date_from: date, date_to: date) -> list[date]:
+    """Days to step per-date models through; an open-ended range is clamped to the loaded raw data."""
+    if date_from == MIN_DATE or date_to == MAX_DATE:
+        bounds = bq_runner.query(RAW_BOUNDS_SQL)[0]
+        if bounds["min_date"] is None:
+            return []
+        date_from = max(date_from, bounds["min_date"])
+        date_to = min(date_to, bounds["max_date"])
+    return iter_dates(date_from, date_to)
+
+def build_nodes(
+    bq_runner: BQQueryRunner,
+    sql_files: list[Path],
+    date_extra: dict[str, str],
+    days: Callable[[], list[date]],
+) -> list[Node]:
+    """One DAG node per model file; files that do not write a table (explore queries) are skipped."""
+    nodes: list[Node] = []
+    for sql_file in sql_files:
+        name = sql_file.relative_to(SQL_ROOT).as_posix()
+        sql = sql_file.read_text(encoding="utf-8")
+        reads, writes = table_refs(sql)
+        if not writes:
+            print(f"Skipping non-model SQL file: {name}")
+            continue
+        if name == SCORING_MODEL and bq_runner.settings.scoring_engine == "numpy":
+            run = _scoring_runner(bq_runner, name, days)
+            # scoring.load_activity reads the activity directly rather than the rolling state
+            reads = {"STG.daily_repo_activity"}
+        elif name == REPO_DIM_MODEL and bq_runner.settings.engine == "duckdb" and bq_runner.settings.repo_cache:
+            run = _repo_dim_runner(bq_runner, name, date_extra)
+        else:
+            run = _model_runner(bq_runner, name, sql, date_extra, days)
+        nodes.append(Node(name, run, reads=reads, writes=writes))
+    return link(nodes)
+
+def _model_runner(
+    bq_runner: BQQueryRunner,
+    name: str,
+    sql: str,
+    date_extra: dict[str, str],
+    days: Callable[[], list[date]],
+) -> Callable[[], None]:
+    max_bytes = bq_runner.settings.max_bytes_transform
+
+    def run() -> None:
+        print(f"Running: {name}")
+        if is_per_date(sql):
+            for d in days():
+                print(f"  {name} {d.isoformat()}")
+                bq_runner.run(sql, extra={**date_extra, "DATE": d.isoformat()}, step=name, max_bytes=max_bytes)
+        else:
+            bq_runner.run(sql, extra=date_extra, step=name, max_bytes=max_bytes)
+        print(f"Completed: {name}")
+    return run
+
+def _scoring_runner(bq_runner: BQQueryRunner, name: str, days: Callable[[], list[date]]) -> Callable[[], None]:
+    def run() -> None:
+        from pipeline.scoring import score_range  # NumPy, only with SCORING_ENGINE=numpy
+
+        print(f"Running: {name} (NumPy scoring)")
+        steps = days()
+        if steps:
+            score_range(bq_runner, bq_runner.settings, steps[0], steps[-1])
+        print(f"Completed: {name}")
+    return run
+
+def _repo_dim_runner(bq_runner: BQQueryRunner, name: str, date_extra: dict[str, str]) -> Callable[[], None]:
+    def run() -> None:
+        print(f"Running: {name} (repo cache)")
+        update_repo_dim(bq_runner, bq_runner.settings, date_extra["DATE_FROM"], date_extra["DATE_TO"])
+        print(f"Completed: {name}")
+    return run
+
+def estimate_bytes(
+    bq_runner: BQQueryRunner,
+    sql_files: list[Path],
+    date_extra: dict[str, str],
+    days: Callable[[], list[date]],
+) -> dict[str, list[int]]:
+    """Dry-run estimates per model file: one per job, i.e. one per day for per-date models."""
+    estimates: dict[str, list[int]] = {}
+    for sql_file in sql_files:
+        name = sql_file.relative_to(SQL_ROOT).as_posix()
+        sql = sql_file.read_text(encoding="utf-8")
+        if not table_refs(sql)[1]:
+            continue
+        if is_per_date(sql):
+            estimates[name] = [bq_runner.dry_run(sql, extra={**date_extra, "DATE": d.isoformat()}) for d in days()]
+        else:
+            estimates[name] = [bq_runner.dry_run(sql, extra=date_extra)]
+    return estimates
+
+def print_estimates(estimates: dict[str, list[int]], max_bytes: int) -> None:
+    print("\nEstimated bytes processed (dry run):")
+    for name, jobs in estimates.items():
+        over = [b for b in jobs if max_bytes and b > max_bytes]
+        flag = f"  <-- {len(over)} of {len(jobs)} jobs over budget" if over else ""
+        per_job = f" in {len(jobs)} jobs (max {max(jobs, default=0):,})" if len(jobs) != 1 else ""
+        print(f" - {name}: {sum(jobs):,} B{per_job}{flag}")
+    total = sum(sum(jobs) for jobs in estimates.values())
+    budget = f"{max_bytes:,} B per job" if max_bytes else "none"
+    print(f"Total: {total:,} B (MAX_BYTES_TRANSFORM: {budget})")
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--dry-run",
         action="store_true",
-        help="If set, SQL files will be printed but not executed.",
+        help="If set, print the plan and each file's dry-run estimate of bytes processed, but run nothing.",
     )
+    parser.add_argument("--date", help="YYYY-MM-DD (UTC). Rebuild only this date's partitions.")
+    parser.add_argument("--from", dest="date_from", help="YYYY-MM-DD (UTC). Start of an inclusive date range.")
+    parser.add_argument("--to", dest="date_to", help="YYYY-MM-DD (UTC). End of an inclusive date range.")
+    parser.add_argument(
+        "--skip-activity",
+        action="store_true",
+        help="Skip the models that build daily_repo_activity (already loaded by `extract --source-dir`).",
+    )
+    parser.add_argument("--jobs", type=int, help="Models to run concurrently (default: MAX_JOBS).")
     args = parser.parse_args()
 
+    try:
+        date_from, date_to = resolve_date_range(args.date, args.date_from, args.date_to)
+    except ValueError as e:
+        parser.error(str(e))
+
     settings = Settings.load()
     bq_runner = BQQueryRunner(settings)
+    if args.dry_run:
+        # Dry runs are free and run no jobs; keep them out of the run manifests
+        run_transform(bq_runner, settings, date_from, date_to, skip_activity=args.skip_activity, dry_run=True)
+        return
+    with record_run(bq_runner, settings, "transform", vars(args)):
+        run_transform(
+            bq_runner, settings, date_from, date_to,
+            jobs=args.jobs, skip_activity=args.skip_activity,
+        )
 
+def run_transform(
+    bq_runner: BQQueryRunner,
+    settings: Settings,
+    date_from: date,
+    date_to: date,
+    jobs: int | None = None,
+    skip_activity: bool = False,
+    dry_run: bool = False,
+) -> list[Node]:
+    """Rebuild the model partitions for [date_from, date_to] (MIN_DATE/MAX_DATE = everything)."""
     sql_files = iter_sql_files()
+    if skip_activity:
+        sql_files = [f for f in sql_files if f.relative_to(SQL_ROOT).as_posix() not in ACTIVITY_MODELS]
+    if settings.scoring_engine == "numpy":
+        sql_files = [f for f in sql_files if f.relative_to(SQL_ROOT).as_posix() != BASELINE_MODEL]
     if not sql_files:
         raise SystemExit("No SQL files found to execute.")
     
-    print("SQL execution order:")
-    for sql_file in sql_files:
-        print(f" - {sql_file.relative_to(SQL_ROOT)}")
+    if (date_from, date_to) == (MIN_DATE, MAX_DATE):
+        print("No date given - rebuilding all partitions.")
+    else:
+        print(f"Rebuilding partitions from {date_from} to {date_to}.")
 
-    if args.dry_run:
+    # Every model is scoped to this inclusive range of event_date partitions
+    date_extra = {"DATE_FROM": date_from.isoformat(), "DATE_TO": date_to.isoformat()}
+
+    # Per-date models step through the same days; resolved once, on first use
+    step_days: list[list[date]] = []
+    def days() -> list[date]:
+        if not step_days:
+            step_days.append(step_dates(bq_runner, date_from, date_to))
+        return step_days[0]
+
+    nodes = build_nodes(bq_runner, sql_files, date_extra, days)
+
+    print("SQL execution plan:")
+    for i, wave in enumerate(levels(nodes), start=1):
+        for node in wave:
+            after = f" (after {', '.join(sorted(node.deps))})" if node.deps else ""
+            print(f" {i}. {node.name}{after}")
+
+    if dry_run:
         print("\nDry run mode - SQL files will not be executed.")
-        return
-    
-    for sql_file in sql_files:
-        sql = sql_file.read_text(encoding="utf-8")
-        if not sql.strip():
-            print(f"Skipping empty SQL file: {sql_file.relative_to(SQL_ROOT)}")
-            continue
-        
-        print(f"\nRunning: {sql_file.relative_to(SQL_ROOT)}")
-        res = bq_runner.run(sql)
-        print(f"\nCompleted: {sql_file.relative_to(SQL_ROOT)}")
+        print_estimates(estimate_bytes(bq_runner, sql_files, date_extra, days), settings.max_bytes_transform)
+        if settings.engine == "duckdb":
+            print("(The local engine only checks that the SQL translates; it has no scan estimates.)")
+        return nodes
+
+    # Resolve the stepped days up front rather than from concurrently starting nodes
+    if any(is_per_date(f.read_text(encoding="utf-8")) for f in sql_files) or settings.scoring_engine == "numpy":
+        days()
 
+    jobs = jobs or settings.max_jobs
+    print(f"\nRunning {len(nodes)} models with up to {jobs} concurrent jobs.")
+    started = time.monotonic()
+    run_dag(nodes, max_jobs=jobs)
+    print_report(nodes, time.monotonic() - started)
+    return nodes
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+# Bounds used when no date range is given, i.e. a full rebuild over all history.
+MIN_DATE = date(1970, 1, 1)
+MAX_DATE = date(9999, 12, 31)
+
+
+def resolve_date_range(
+    date_str: str | None,
+    from_str: str | None,
+    to_str: str | None,
+) -> tuple[date, date]:
+    """
+    Turn --date / --from / --to CLI arguments into an inclusive (start, end) range.
+    No arguments at all means the full history.
+    """
+    if date_str and (from_str or to_str):
+        raise ValueError("--date cannot be combined with --from/--to.")
+    if date_str:
+        d = date.fromisoformat(date_str)
+        return d, d
+    if bool(from_str) != bool(to_str):
+        raise ValueError("--from and --to must be given together.")
+    if from_str and to_str:
+        start, end = date.fromisoformat(from_str), date.fromisoformat(to_str)
+        if start > end:
+            raise ValueError(f"--from {start} is after --to {end}.")
+        return start, end
+    return MIN_DATE, MAX_DATE
+
+
+def iter_dates(start: date, end: date) -> list[date]:
+    """Inclusive list of days from start to end."""
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
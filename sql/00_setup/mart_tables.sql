@@ -1,3 +1,110 @@
+CREATE TABLE IF NOT EXISTS `${MART_DATASET}.trending_repos_daily` (
+    event_date DATE,
+    repo_id INT64,
+    events_today INT64,
+    actors_today INT64,
+    stars_today INT64,
+    avg_events_prev FLOAT64,
+    std_events_prev FLOAT64,
+    growth_events_ratio FLOAT64,
+    z_events FLOAT64,
+    avg_actors_prev FLOAT64,
+    std_actors_prev FLOAT64,
+    growth_actors_ratio FLOAT64,
+    z_actors FLOAT64,
+    avg_stars_prev FLOAT64,
+    std_stars_prev FLOAT64,
+    growth_stars_ratio FLOAT64,
+    z_stars FLOAT64,
+    trend_score FLOAT64
+)
+PARTITION BY event_date
+CLUSTER BY repo_id;
+
+ALTER TABLE `${MART_DATASET}.trending_repos_daily` ADD COLUMN IF NOT EXISTS repo_id INT64;
+
+-- Where repo names are resolved from stg.repo_names; every mart after it and the API use names
+CREATE TABLE IF NOT EXISTS `${MART_DATASET}.trending_repos_enriched` (
+    event_date DATE,
+    repo_id INT64,
+    repo_name STRING,
+    primary_language STRING,
+    license STRING,
+    events_today INT64,
+    actors_today INT64,
+    stars_today INT64,
+    growth_events_ratio FLOAT64,
+    z_events FLOAT64,
+    trend_score FLOAT64
+)
+PARTITION BY event_date
+CLUSTER BY primary_language, repo_name;
+
+ALTER TABLE `${MART_DATASET}.trending_repos_enriched` ADD COLUMN IF NOT EXISTS repo_id INT64;
+
+CREATE TABLE IF NOT EXISTS `${MART_DATASET}.trending_languages_daily` (
+    event_date DATE,
+    primary_language STRING,
+    trending_repos_count INT64,
+    events_today_total INT64,
+    actors_today_total INT64,
+    stars_today_total INT64,
+    avg_trend_score FLOAT64,
+    total_trend_score FLOAT64,
+    top_repos ARRAY<STRUCT<
+        repo_name STRING,
+        trend_score FLOAT64,
+        events_today INT64,
+        actors_today INT64,
+        stars_today INT64
+    >>,
+    -- Merged HLL sketch of the actors of the language's trending repos
+    actors_hll BYTES
+)
+PARTITION BY event_date
+CLUSTER BY primary_language;
+
+ALTER TABLE `${MART_DATASET}.trending_languages_daily` ADD COLUMN IF NOT EXISTS actors_hll BYTES;
+
+-- Rolling 7/30-day windows ending on event_date, maintained incrementally by pipeline.compute
+CREATE TABLE IF NOT EXISTS `${MART_DATASET}.trending_repos_rollup` (
+    event_date DATE,
+    window_days INT64,
+    repo_name STRING,
+    primary_language STRING,
+    license STRING,
+    -- Days in the window the repo was in trending_repos_enriched; the totals and trend_score sum those days
+    trending_days INT64,
+    events_total INT64,
+    actors_total INT64,
+    stars_total INT64,
+    trend_score FLOAT64
+)
+PARTITION BY event_date
+CLUSTER BY window_days, primary_language, repo_name;
+
+CREATE TABLE IF NOT EXISTS `${MART_DATASET}.trending_languages_rollup` (
+    event_date DATE,
+    window_days INT64,
+    primary_language STRING,
+    trending_repos_count INT64,
+    events_total INT64,
+    -- Distinct actors over the window (merged daily sketches)
+    actors_total INT64,
+    stars_total INT64,
+    avg_trend_score FLOAT64,
+    total_trend_score FLOAT64,
+    top_repos ARRAY<STRUCT<
+        repo_name STRING,
+        trend_score FLOAT64,
+        events_today INT64,
+        actors_today INT64,
+        stars_today INT64
+    >>
+)
+PARTITION BY event_date
+CLUSTER BY window_days, primary_language;
+
 CREATE TABLE IF NOT EXISTS `${MART_DATASET}.alerts_daily` (
     event_date DATE,
     alert_type STRING,
@@ -20,6 +127,54 @@ CREATE TABLE IF NOT EXISTS `${MART_DATASET}.daily_summary` (
     summary_text STRING,
     top_repos ARRAY<STRING>,
     top_languages ARRAY<STRING>,
-    created_at TIMESTAMP
+    created_at TIMESTAMP,
+    -- TRUE while pipeline.hourly publishes a day still in progress; the daily compute clears it
+    provisional BOOL
+)
+PARTITION BY event_date;
+
+ALTER TABLE `${MART_DATASET}.daily_summary` ADD COLUMN IF NOT EXISTS provisional BOOL;
+
+-- One row per pipeline command run with per-step job telemetry (see pipeline/telemetry.py)
+CREATE TABLE IF NOT EXISTS `${MART_DATASET}.pipeline_runs` (
+    run_id STRING,
+    command STRING,
+    args STRING,
+    engine STRING,
+    status STRING,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    wall_ms INT64,
+    slot_ms INT64,
+    bytes_processed INT64,
+    bytes_billed INT64,
+    rows_affected INT64,
+    steps ARRAY<STRUCT<
+        step STRING,
+        job_id STRING,
+        wall_ms INT64,
+        queue_ms INT64,
+        slot_ms INT64,
+        bytes_processed INT64,
+        bytes_billed INT64,
+        estimated_bytes INT64,
+        rows_affected INT64,
+        cache_hit BOOL
+    >>
 )
-PARTITION BY event_date;
\ No newline at end of file
+PARTITION BY DATE(started_at);
+
+-- Heavy-hitter summaries: the top `capacity` repos of each language by events and by stars, per day
+-- (hour NULL, sql/30_marts/03_language_top_repos.sql) or per hour of a provisional day (pipeline.hourly).
+-- pipeline/heavy_hitters.py merges them into the top repos of any window; see its error bounds.
+CREATE TABLE IF NOT EXISTS `${MART_DATASET}.language_top_repos` (
+    event_date DATE,
+    hour INT64,
+    primary_language STRING,
+    metric STRING,
+    capacity INT64,
+    total INT64,
+    top ARRAY<STRUCT<repo_name STRING, value INT64, error INT64>>
+)
+PARTITION BY event_date
+CLUSTER BY primary_language, metric;
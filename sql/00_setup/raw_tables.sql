@@ -4,7 +4,13 @@ CREATE TABLE IF NOT EXISTS `${RAW_DATASET}.events` (
     type STRING,
     repo_name STRING,
     actor_login STRING,
+    -- FARM_FINGERPRINT of the name and login (pipeline/dictionary.py), computed by extract
+    repo_id INT64,
+    actor_id INT64,
     payload JSON
 )
 PARTITION BY event_date
-CLUSTER BY repo_name;
\ No newline at end of file
+CLUSTER BY repo_name;
+
+ALTER TABLE `${RAW_DATASET}.events` ADD COLUMN IF NOT EXISTS repo_id INT64;
+ALTER TABLE `${RAW_DATASET}.events` ADD COLUMN IF NOT EXISTS actor_id INT64;
@@ -0,0 +1,169 @@
+-- Repo and actor ids are FARM_FINGERPRINT(name) (pipeline/dictionary.py). Everything below joins and
+-- clusters on the ids; names are resolved in trending_repos_enriched.
+-- The name of every repo id extract has seen. Append-only; overlapping extracts can record a repo
+-- twice, so readers go through repo_names.
+CREATE TABLE IF NOT EXISTS `${STG_DATASET}.repo_ids` (
+    repo_id INT64,
+    repo_name STRING,
+    first_seen DATE
+)
+CLUSTER BY repo_id;
+
+CREATE OR REPLACE VIEW `${STG_DATASET}.repo_names` AS
+SELECT repo_id, ANY_VALUE(repo_name) AS repo_name
+FROM `${STG_DATASET}.repo_ids`
+GROUP BY repo_id;
+
+CREATE TABLE IF NOT EXISTS `${STG_DATASET}.stg_github_events` (
+    event_date DATE,
+    created_at TIMESTAMP,
+    event_type STRING,
+    repo_id INT64,
+    actor_id INT64
+)
+PARTITION BY event_date
+CLUSTER BY repo_id;
+
+-- Staging carries the typed payload columns (added by pipeline.setup) instead of the raw JSON
+ALTER TABLE `${STG_DATASET}.stg_github_events` DROP COLUMN IF EXISTS payload;
+-- Tables created with name columns keep them (NULL in new rows) and their clustering until recreated
+ALTER TABLE `${STG_DATASET}.stg_github_events` ADD COLUMN IF NOT EXISTS repo_id INT64;
+ALTER TABLE `${STG_DATASET}.stg_github_events` ADD COLUMN IF NOT EXISTS actor_id INT64;
+
+CREATE TABLE IF NOT EXISTS `${STG_DATASET}.daily_repo_activity` (
+    event_date DATE,
+    repo_id INT64,
+    events_total INT64,
+    actors_unique INT64,
+    -- HLL sketch of actor_id (HLL_COUNT.INIT; pipeline/hll.py offline)
+    actors_hll BYTES,
+    pushes INT64,
+    pull_requests INT64,
+    issues INT64,
+    stars INT64,
+    forks INT64
+)
+PARTITION BY event_date
+CLUSTER BY repo_id;
+
+ALTER TABLE `${STG_DATASET}.daily_repo_activity` ADD COLUMN IF NOT EXISTS actors_hll BYTES;
+ALTER TABLE `${STG_DATASET}.daily_repo_activity` ADD COLUMN IF NOT EXISTS repo_id INT64;
+
+-- Repository metadata, append-only: one row per lookup, readers take each repo's latest looked_up_at.
+-- Filled incrementally by sql/20_models/repo_dim.sql (pipeline/repo_cache.py with the local engine).
+CREATE TABLE IF NOT EXISTS `${STG_DATASET}.repo_dim` (
+    repo_id INT64,
+    primary_language STRING,
+    all_languages ARRAY<STRUCT<name STRING, bytes INT64>>,
+    license STRING,
+    looked_up_at TIMESTAMP
+)
+CLUSTER BY repo_id;
+
+-- Tables rebuilt by the old full-refresh model have no lookup time; their rows are looked up again
+ALTER TABLE `${STG_DATASET}.repo_dim` ADD COLUMN IF NOT EXISTS looked_up_at TIMESTAMP;
+-- Rows from before repo ids have no repo_id; those repos are looked up again
+ALTER TABLE `${STG_DATASET}.repo_dim` ADD COLUMN IF NOT EXISTS repo_id INT64;
+
+-- Per-repo running sums over the LOOKBACK_DAYS window that ends the day before baseline_date.
+-- Rolled forward one day at a time by sql/20_models/repo_baseline_state.sql.
+CREATE TABLE IF NOT EXISTS `${STG_DATASET}.repo_baseline_state` (
+    baseline_date DATE,
+    repo_id INT64,
+    days_active INT64,
+    sum_events INT64,
+    sumsq_events INT64,
+    sum_actors INT64,
+    sumsq_actors INT64,
+    sum_stars INT64,
+    sumsq_stars INT64
+)
+PARTITION BY baseline_date
+CLUSTER BY repo_id;
+
+ALTER TABLE `${STG_DATASET}.repo_baseline_state` ADD COLUMN IF NOT EXISTS repo_id INT64;
+
+-- Running per-repo counters of a day that is still in progress, folded in one GH Archive hour at a
+-- time by pipeline.hourly. Each hour adds a row (the day's totals so far) for the repos active in it,
+-- replacing that hour's rows if it is folded again, and readers take each repo's latest updated_hour. actors_hll is a pipeline/hll.py
+-- sketch, merged in Python. The daily run replaces the provisional marts, so old days expire.
+CREATE TABLE IF NOT EXISTS `${STG_DATASET}.intraday_repo_activity` (
+    event_date DATE,
+    repo_id INT64,
+    updated_hour INT64,
+    events_total INT64,
+    actors_unique INT64,
+    actors_hll BYTES,
+    pushes INT64,
+    pull_requests INT64,
+    issues INT64,
+    stars INT64,
+    forks INT64
+)
+PARTITION BY event_date
+CLUSTER BY repo_id
+OPTIONS (partition_expiration_days = 7);
+
+ALTER TABLE `${STG_DATASET}.intraday_repo_activity` ADD COLUMN IF NOT EXISTS repo_id INT64;
+
+-- Hours folded into intraday_repo_activity, one row per date and hour (re-folding an hour replaces it)
+CREATE TABLE IF NOT EXISTS `${STG_DATASET}.intraday_hours` (
+    event_date DATE,
+    hour INT64,
+    events INT64,
+    repos INT64,
+    folded_at TIMESTAMP
+)
+PARTITION BY event_date
+OPTIONS (partition_expiration_days = 7);
+
+-- Repo alerts scored by SCORING_ENGINE=numpy, one partition per date; compute publishes them to
+-- alerts_daily together with the language alerts and the summary (pipeline.compute.publish_date)
+CREATE TABLE IF NOT EXISTS `${STG_DATASET}.repo_alerts_staging` (
+    event_date DATE,
+    alert_type STRING,
+    entity STRING,
+    severity STRING,
+    trend_score FLOAT64,
+    z_events FLOAT64,
+    growth_events_ratio FLOAT64,
+    events_today INT64,
+    actors_today INT64,
+    stars_today INT64,
+    primary_language STRING,
+    created_at TIMESTAMP
+)
+PARTITION BY event_date
+OPTIONS (partition_expiration_days = 7);
+
+-- trending_repos_daily rows scored by SCORING_ENGINE=numpy for a transform range; pipeline.scoring
+-- swaps them into the mart in one transaction and clears the range again
+CREATE TABLE IF NOT EXISTS `${STG_DATASET}.trending_repos_staging` (
+    event_date DATE,
+    repo_id INT64,
+    events_today INT64,
+    actors_today INT64,
+    stars_today INT64,
+    avg_events_prev FLOAT64,
+    std_events_prev FLOAT64,
+    growth_events_ratio FLOAT64,
+    z_events FLOAT64,
+    avg_actors_prev FLOAT64,
+    std_actors_prev FLOAT64,
+    growth_actors_ratio FLOAT64,
+    z_actors FLOAT64,
+    avg_stars_prev FLOAT64,
+    std_stars_prev FLOAT64,
+    growth_stars_ratio FLOAT64,
+    z_stars FLOAT64,
+    trend_score FLOAT64
+)
+PARTITION BY event_date;
+
+-- Backfill progress: one row per date and finished stage (extract, transform, compute).
+-- Written by pipeline.backfill so an interrupted backfill resumes where it stopped.
+CREATE TABLE IF NOT EXISTS `${STG_DATASET}.backfill_checkpoints` (
+    event_date DATE,
+    stage STRING,
+    completed_at TIMESTAMP
+);
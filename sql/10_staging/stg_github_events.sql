@@ -1,13 +1,16 @@
-CREATE OR REPLACE TABLE `${STG_DATASET}.stg_github_events`
-PARTITION BY event_date
-CLUSTER BY repo_name AS
+DELETE FROM `${STG_DATASET}.stg_github_events`
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}");
+
+INSERT INTO `${STG_DATASET}.stg_github_events`
+(event_date, created_at, event_type, repo_id, actor_id${PAYLOAD_COLUMNS})
 SELECT
     event_date,
     created_at,
     type AS event_type,
-    repo_name,
-    actor_login,
-    payload
+    repo_id,
+    actor_id${PAYLOAD_COLUMNS}
 FROM `${RAW_DATASET}.events`
-WHERE repo_name IS NOT NULL
-    AND actor_login IS NOT NULL;
\ No newline at end of file
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
+    -- Extract gives every named repo and actor an id (pipeline/dictionary.py); older rows have none
+    AND repo_id IS NOT NULL
+    AND actor_id IS NOT NULL;
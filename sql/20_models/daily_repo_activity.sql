@@ -1,12 +1,17 @@
-CREATE OR REPLACE TABLE `${STG_DATASET}.daily_repo_activity`
-PARTITION BY event_date
-CLUSTER BY repo_name AS
+DELETE FROM `${STG_DATASET}.daily_repo_activity`
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}");
+
+INSERT INTO `${STG_DATASET}.daily_repo_activity`
+(event_date, repo_id, events_total, actors_unique, actors_hll, pushes, pull_requests, issues, stars, forks)
 SELECT
     event_date,
-    repo_name,
+    repo_id,
 
     COUNT(*) AS events_total,
-    COUNT(DISTINCT actor_login) AS actors_unique,
+    -- Exact COUNT(DISTINCT actor_id), or the sketch's estimate with EXACT_ACTOR_COUNTS=false
+    ${ACTORS_UNIQUE} AS actors_unique,
+    -- Mergeable sketch of the actors: unique actors over several repos or days without rescanning events
+    HLL_COUNT.INIT(actor_id, ${HLL_PRECISION}) AS actors_hll,
 
     COUNTIF(event_type = 'PushEvent') AS pushes,
     COUNTIF(event_type = 'PullRequestEvent') AS pull_requests,
@@ -15,4 +20,5 @@ SELECT
     COUNTIF(event_type = 'ForkEvent') AS forks
 
 FROM `${STG_DATASET}.stg_github_events`
-GROUP BY event_date, repo_name;
\ No newline at end of file
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
+GROUP BY event_date, repo_id;
@@ -0,0 +1,77 @@
+-- Rolling baseline for a single ${DATE}: stats over [DATE - LOOKBACK_DAYS, DATE - 1].
+-- Run once per day in date order; each run only reads the previous state and two activity partitions.
+DELETE FROM `${STG_DATASET}.repo_baseline_state`
+WHERE baseline_date = DATE("${DATE}");
+
+IF EXISTS (
+    SELECT 1
+    FROM `${STG_DATASET}.repo_baseline_state`
+    WHERE baseline_date = DATE_SUB(DATE("${DATE}"), INTERVAL 1 DAY)
+) THEN
+    -- Roll yesterday's state forward: add the day entering the window, subtract the day leaving it
+    INSERT INTO `${STG_DATASET}.repo_baseline_state`
+    (
+        baseline_date, repo_id, days_active,
+        sum_events, sumsq_events, sum_actors, sumsq_actors, sum_stars, sumsq_stars
+    )
+    SELECT
+        DATE("${DATE}") AS baseline_date,
+        repo_id,
+        SUM(days_active) AS days_active,
+        SUM(sum_events) AS sum_events,
+        SUM(sumsq_events) AS sumsq_events,
+        SUM(sum_actors) AS sum_actors,
+        SUM(sumsq_actors) AS sumsq_actors,
+        SUM(sum_stars) AS sum_stars,
+        SUM(sumsq_stars) AS sumsq_stars
+    FROM (
+        SELECT
+            repo_id, days_active,
+            sum_events, sumsq_events, sum_actors, sumsq_actors, sum_stars, sumsq_stars
+        FROM `${STG_DATASET}.repo_baseline_state`
+        WHERE baseline_date = DATE_SUB(DATE("${DATE}"), INTERVAL 1 DAY)
+
+        UNION ALL
+
+        SELECT
+            repo_id, 1,
+            events_total, events_total * events_total,
+            actors_unique, actors_unique * actors_unique,
+            stars, stars * stars
+        FROM `${STG_DATASET}.daily_repo_activity`
+        WHERE event_date = DATE_SUB(DATE("${DATE}"), INTERVAL 1 DAY)
+
+        UNION ALL
+
+        SELECT
+            repo_id, -1,
+            -events_total, -(events_total * events_total),
+            -actors_unique, -(actors_unique * actors_unique),
+            -stars, -(stars * stars)
+        FROM `${STG_DATASET}.daily_repo_activity`
+        WHERE event_date = DATE_SUB(DATE_SUB(DATE("${DATE}"), INTERVAL ${LOOKBACK_DAYS} DAY), INTERVAL 1 DAY)
+    )
+    GROUP BY repo_id
+    HAVING SUM(days_active) > 0;
+ELSE
+    -- No state for the previous day (first run or a gap): sum the whole window once
+    INSERT INTO `${STG_DATASET}.repo_baseline_state`
+    (
+        baseline_date, repo_id, days_active,
+        sum_events, sumsq_events, sum_actors, sumsq_actors, sum_stars, sumsq_stars
+    )
+    SELECT
+        DATE("${DATE}") AS baseline_date,
+        repo_id,
+        COUNT(*) AS days_active,
+        SUM(events_total) AS sum_events,
+        SUM(events_total * events_total) AS sumsq_events,
+        SUM(actors_unique) AS sum_actors,
+        SUM(actors_unique * actors_unique) AS sumsq_actors,
+        SUM(stars) AS sum_stars,
+        SUM(stars * stars) AS sumsq_stars
+    FROM `${STG_DATASET}.daily_repo_activity`
+    WHERE event_date BETWEEN DATE_SUB(DATE("${DATE}"), INTERVAL ${LOOKBACK_DAYS} DAY)
+        AND DATE_SUB(DATE("${DATE}"), INTERVAL 1 DAY)
+    GROUP BY repo_id;
+END IF;
@@ -1,33 +1,53 @@
-CREATE OR REPLACE TABLE `${STG_DATASET}.repo_dim` AS
-WITH active_repos AS (
-    SELECT DISTINCT repo_name
-    from `${STG_DATASET}.daily_repo_activity`
-),
+-- Append-only repository dimension. Only repos active in the range that have no row yet, or whose
+-- latest lookup is older than REPO_DIM_REFRESH_DAYS (0 = never refresh), are looked up; readers use
+-- each repo's latest row. The metadata tables are not read at all when there is nothing to look up.
+-- The metadata tables are keyed by name, so the todo list carries each repo's name from repo_names.
+CREATE TEMP TABLE repo_dim_todo AS
+SELECT a.repo_id, n.repo_name
+FROM (
+    SELECT DISTINCT repo_id
+    FROM `${STG_DATASET}.daily_repo_activity`
+    WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
+) a
+JOIN `${STG_DATASET}.repo_names` n ON a.repo_id = n.repo_id
+LEFT JOIN (
+    SELECT repo_id, MAX(looked_up_at) AS looked_up_at
+    FROM `${STG_DATASET}.repo_dim`
+    GROUP BY repo_id
+) k ON a.repo_id = k.repo_id
+WHERE k.repo_id IS NULL
+    OR k.looked_up_at IS NULL
+    OR (${REPO_DIM_REFRESH_DAYS} > 0
+        AND k.looked_up_at < TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL ${REPO_DIM_REFRESH_DAYS} DAY));
 
-langs AS (
-    SELECT
-        repo_name,
-        language AS languages,
-    FROM `bigquery-public-data.github_repos.languages`
-    WHERE repo_name IN (SELECT repo_name FROM active_repos)
-),
+IF EXISTS (SELECT 1 FROM repo_dim_todo) THEN
+    INSERT INTO `${STG_DATASET}.repo_dim` (repo_id, primary_language, all_languages, license, looked_up_at)
+    WITH langs AS (
+        SELECT
+            repo_name,
+            language AS languages
+        FROM `${SOURCE_REPOS_DATASET}.languages`
+        WHERE repo_name IN (SELECT repo_name FROM repo_dim_todo)
+    ),
 
-lic AS (
-    SELECT
-        repo_name,
-        license
-    FROM `bigquery-public-data.github_repos.licenses`
-    WHERE repo_name IN (SELECT repo_name FROM active_repos)
-)
+    lic AS (
+        SELECT
+            repo_name,
+            license
+        FROM `${SOURCE_REPOS_DATASET}.licenses`
+        WHERE repo_name IN (SELECT repo_name FROM repo_dim_todo)
+    )
 
-SELECT
-    a.repo_name,
-    (SELECT l.name
-        FROM UNNEST(langs.languages) AS l
-        ORDER BY l.bytes DESC
-        LIMIT 1) AS primary_language,
-    langs.languages AS all_languages,
-    lic.license
-FROM active_repos a 
-LEFT JOIN langs ON a.repo_name = langs.repo_name
-LEFT JOIN lic ON a.repo_name = lic.repo_name; 
\ No newline at end of file
+    SELECT
+        t.repo_id,
+        (SELECT l.name
+            FROM UNNEST(langs.languages) AS l
+            ORDER BY l.bytes DESC
+            LIMIT 1) AS primary_language,
+        langs.languages AS all_languages,
+        lic.license,
+        CURRENT_TIMESTAMP() AS looked_up_at
+    FROM repo_dim_todo t
+    LEFT JOIN langs ON t.repo_name = langs.repo_name
+    LEFT JOIN lic ON t.repo_name = lic.repo_name;
+END IF;
@@ -1,53 +1,69 @@
-CREATE OR REPLACE TABLE `${MART_DATASET}.trending_repos_daily`
-PARTITION BY event_date
-CLUSTER BY repo_name AS
+DELETE FROM `${MART_DATASET}.trending_repos_daily`
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}");
+
+INSERT INTO `${MART_DATASET}.trending_repos_daily`
+(
+    event_date, repo_id,
+    events_today, actors_today, stars_today,
+    avg_events_prev, std_events_prev, growth_events_ratio, z_events,
+    avg_actors_prev, std_actors_prev, growth_actors_ratio, z_actors,
+    avg_stars_prev, std_stars_prev, growth_stars_ratio, z_stars,
+    trend_score
+)
 WITH base  AS (
     SELECT
         event_date,
-        repo_name,
+        repo_id,
         events_total,
         actors_unique,
-        pushes,
-        pull_requests,
-        issues,
-        stars,
-        forks
+        stars
     FROM `${STG_DATASET}.daily_repo_activity`
+    WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
 ),
 
+-- Running sums for the LOOKBACK_DAYS window before each date (see repo_baseline_state.sql)
+state AS (
+    SELECT
+        baseline_date,
+        repo_id,
+        days_active AS n,
+        sum_events,
+        sumsq_events,
+        sum_actors,
+        sumsq_actors,
+        sum_stars,
+        sumsq_stars
+    FROM `${STG_DATASET}.repo_baseline_state`
+    WHERE baseline_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
+),
+
+-- Same values as AVG / STDDEV_SAMP over the window; the variance numerator is exact integer math
 baseline AS (
     SELECT
         b.event_date,
-        b.repo_name,
+        b.repo_id,
 
         b.events_total AS events_today,
         b.actors_unique AS actors_today,
         b.stars AS stars_today,
 
-        AVG(prev.events_total) AS avg_events_prev,
-        STDDEV_SAMP(prev.events_total) AS std_events_prev,
-        AVG(prev.actors_unique) AS avg_actors_prev,
-        STDDEV_SAMP(prev.actors_unique) AS std_actors_prev,
-        AVG(prev.stars) AS avg_stars_prev,
-        STDDEV_SAMP(prev.stars) AS std_stars_prev
+        SAFE_DIVIDE(s.sum_events, s.n) AS avg_events_prev,
+        SQRT(SAFE_DIVIDE(s.n * s.sumsq_events - s.sum_events * s.sum_events, s.n * (s.n - 1))) AS std_events_prev,
+        SAFE_DIVIDE(s.sum_actors, s.n) AS avg_actors_prev,
+        SQRT(SAFE_DIVIDE(s.n * s.sumsq_actors - s.sum_actors * s.sum_actors, s.n * (s.n - 1))) AS std_actors_prev,
+        SAFE_DIVIDE(s.sum_stars, s.n) AS avg_stars_prev,
+        SQRT(SAFE_DIVIDE(s.n * s.sumsq_stars - s.sum_stars * s.sum_stars, s.n * (s.n - 1))) AS std_stars_prev
 
     FROM base b
-    LEFT JOIN base prev
-        ON prev.repo_name = b.repo_name
-        AND prev.event_date < b.event_date
-        AND prev.event_date >= DATE_SUB(b.event_date, INTERVAL ${LOOKBACK_DAYS} DAY)
-    GROUP BY
-        b.event_date,
-        b.repo_name,
-        b.events_total,
-        b.actors_unique,
-        b.stars
+    LEFT JOIN state s
+        ON s.repo_id = b.repo_id
+        AND s.baseline_date = b.event_date
 ),
 
 scored AS (
     SELECT
         event_date,
-        repo_name,
+        repo_id,
 
         events_today,
         actors_today,
@@ -72,7 +88,7 @@ scored AS (
 
 SELECT
     event_date,
-    repo_name,
+    repo_id,
 
     events_today,
     actors_today,
@@ -94,10 +110,10 @@ SELECT
     z_stars,
 
     (
-        COALESCE(z_events, 0) * 0.6 +
-        COALESCE(z_actors, 0) * 0.3 +
-        COALESCE(z_stars, 0) * 0.1
+        COALESCE(z_events, 0) * ${TREND_WEIGHT_EVENTS} +
+        COALESCE(z_actors, 0) * ${TREND_WEIGHT_ACTORS} +
+        COALESCE(z_stars, 0) * ${TREND_WEIGHT_STARS}
     ) AS trend_score
 
 FROM scored
-WHERE events_today >= ${MIN_EVENTS_THRESHOLD}
\ No newline at end of file
+WHERE events_today >= ${MIN_EVENTS_THRESHOLD};
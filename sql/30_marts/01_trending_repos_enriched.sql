@@ -1,9 +1,17 @@
-CREATE OR REPLACE TABLE `${MART_DATASET}.trending_repos_enriched`
-PARTITION BY event_date
-CLUSTER BY primary_language, repo_name AS
+DELETE FROM `${MART_DATASET}.trending_repos_enriched`
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}");
+
+-- Repo names are resolved here from stg.repo_names; the marts after this one and the API use them
+INSERT INTO `${MART_DATASET}.trending_repos_enriched`
+(
+    event_date, repo_id, repo_name, primary_language, license,
+    events_today, actors_today, stars_today,
+    growth_events_ratio, z_events, trend_score
+)
 SELECT
     t.event_date,
-    t.repo_name,
+    t.repo_id,
+    n.repo_name,
 
     COALESCE(d.primary_language, 'Unknown') AS primary_language,
     COALESCE(d.license, 'Unknown') AS license,
@@ -17,5 +25,14 @@ SELECT
     t.trend_score
 
 FROM `${MART_DATASET}.trending_repos_daily` t
-LEFT JOIN `${STG_DATASET}.repo_dim` d
-ON t.repo_name = d.repo_name;
\ No newline at end of file
+JOIN `${STG_DATASET}.repo_names` n
+ON t.repo_id = n.repo_id
+LEFT JOIN (
+    -- repo_dim is append-only: the latest lookup of each repo
+    SELECT repo_id, primary_language, license
+    FROM `${STG_DATASET}.repo_dim`
+    WHERE true
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY repo_id ORDER BY looked_up_at DESC) = 1
+) d
+ON t.repo_id = d.repo_id
+WHERE t.event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}");
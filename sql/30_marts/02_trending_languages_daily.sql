@@ -1,17 +1,29 @@
-CREATE OR REPLACE TABLE `${MART_DATASET}.trending_languages_daily`
-PARTITION BY event_date
-CLUSTER BY primary_language AS
+DELETE FROM `${MART_DATASET}.trending_languages_daily`
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}");
+
+INSERT INTO `${MART_DATASET}.trending_languages_daily`
+(
+    event_date, primary_language, trending_repos_count,
+    events_today_total, actors_today_total, stars_today_total,
+    avg_trend_score, total_trend_score, top_repos, actors_hll
+)
 WITH base AS (
     SELECT
-        event_date,
-        primary_language,
-        repo_name,
-        events_today,
-        actors_today,
-        stars_today,
-        trend_score
-    FROM `${MART_DATASET}.trending_repos_enriched`
-    WHERE primary_language IS NOT NULL
+        e.event_date,
+        e.primary_language,
+        e.repo_name,
+        e.events_today,
+        e.actors_today,
+        e.stars_today,
+        e.trend_score,
+        a.actors_hll
+    FROM `${MART_DATASET}.trending_repos_enriched` e
+    LEFT JOIN `${STG_DATASET}.daily_repo_activity` a
+        ON a.event_date = e.event_date
+        AND a.repo_id = e.repo_id
+        AND a.event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
+    WHERE e.event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
+        AND e.primary_language IS NOT NULL
 )
 
 SELECT
@@ -20,7 +32,10 @@ SELECT
 
     COUNT(*) AS trending_repos_count,
     SUM(events_today) AS events_today_total,
-    SUM(actors_today) AS actors_today_total,
+    -- Distinct actors across the language's trending repos: an actor active in several of them
+    -- counts once. Repo-days without a sketch (loaded by `extract --source-dir` into BigQuery)
+    -- fall back to the sum of the per-repo counts.
+    IF(COUNT(actors_hll) = COUNT(*), HLL_COUNT.MERGE(actors_hll), SUM(actors_today)) AS actors_today_total,
     SUM(stars_today) AS stars_today_total,
 
     AVG(trend_score) AS avg_trend_score,
@@ -30,6 +45,8 @@ SELECT
         STRUCT(repo_name, trend_score, events_today, actors_today, stars_today)
         ORDER BY trend_score DESC
         LIMIT 5
-    ) AS top_repos
+    ) AS top_repos,
+
+    HLL_COUNT.MERGE_PARTIAL(actors_hll) AS actors_hll
 FROM base
-GROUP BY event_date, primary_language;
\ No newline at end of file
+GROUP BY event_date, primary_language;
@@ -0,0 +1,58 @@
+-- Per language and day, the HEAVY_HITTERS_CAPACITY repos with the most events and with the most stars.
+-- A day's summary is exact (error 0); every repo left out has at most the smallest kept value, which
+-- is what pipeline/heavy_hitters.py needs to merge days into a window with bounded error.
+-- Replaces the per-hour summaries of provisional days (pipeline.hourly) once the day is final.
+DELETE FROM `${MART_DATASET}.language_top_repos`
+WHERE event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}");
+
+INSERT INTO `${MART_DATASET}.language_top_repos`
+(
+    event_date, hour, primary_language, metric, capacity, total, top
+)
+WITH activity AS (
+    SELECT
+        a.event_date,
+        n.repo_name,
+        COALESCE(d.primary_language, 'Unknown') AS primary_language,
+        a.events_total,
+        a.stars
+    FROM `${STG_DATASET}.daily_repo_activity` a
+    -- The summaries are served as they are, so they hold names
+    JOIN `${STG_DATASET}.repo_names` n
+    ON a.repo_id = n.repo_id
+    LEFT JOIN (
+        -- repo_dim is append-only: the latest lookup of each repo
+        SELECT repo_id, primary_language
+        FROM `${STG_DATASET}.repo_dim`
+        WHERE true
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY repo_id ORDER BY looked_up_at DESC) = 1
+    ) d
+    ON a.repo_id = d.repo_id
+    WHERE a.event_date BETWEEN DATE("${DATE_FROM}") AND DATE("${DATE_TO}")
+),
+
+metrics AS (
+    SELECT event_date, primary_language, 'events' AS metric, repo_name, events_total AS value
+    FROM activity
+
+    UNION ALL
+
+    SELECT event_date, primary_language, 'stars' AS metric, repo_name, stars AS value
+    FROM activity
+    WHERE stars > 0
+)
+
+SELECT
+    event_date,
+    CAST(NULL AS INT64) AS hour,
+    primary_language,
+    metric,
+    ${HEAVY_HITTERS_CAPACITY} AS capacity,
+    SUM(value) AS total,
+    ARRAY_AGG(
+        STRUCT(repo_name, value, 0 AS error)
+        ORDER BY value DESC, repo_name
+        LIMIT ${HEAVY_HITTERS_CAPACITY}
+    ) AS top
+FROM metrics
+GROUP BY event_date, primary_language, metric;
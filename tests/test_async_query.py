@@ -0,0 +1,128 @@
+import asyncio
+import threading
+
+import pytest
+
+from pipeline.async_query import AsyncQueryRunner, ClientDisconnected, QueryTimeout
+
+
+class FakeJob:
+    def __init__(self, release: threading.Event, rows: list[dict]):
+        self.release = release
+        self.rows = rows
+        self.cancelled = False
+
+    def result(self) -> list[dict]:
+        self.release.wait(5)
+        return self.rows
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        self.release.set()
+
+
+class FakeRunner:
+    def __init__(self):
+        self.release = threading.Event()
+        self.jobs: list[FakeJob] = []
+
+    def submit_query(self, sql, params=None):
+        job = FakeJob(self.release, [{"sql": sql, **params}])
+        self.jobs.append(job)
+        return job
+
+
+def test_identical_requests_share_one_job():
+    runner = FakeRunner()
+    aq = AsyncQueryRunner(runner, poll_interval_s=0.01)
+
+    async def main():
+        calls = [aq.query("SELECT 1", {"date": "d"}) for _ in range(5)] + [aq.query("SELECT 1", {"date": "e"})]
+        tasks = [asyncio.create_task(c) for c in calls]
+        await asyncio.sleep(0.05)
+        runner.release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(main())
+    assert len(runner.jobs) == 2
+    assert results[0] == results[4] == [{"sql": "SELECT 1", "date": "d"}]
+    assert aq.stats.coalesced == 4
+    assert aq.snapshot()["in_flight"] == 0
+
+
+def test_timeout_cancels_job_without_waiters():
+    runner = FakeRunner()
+    aq = AsyncQueryRunner(runner, timeout_s=0.05, poll_interval_s=0.01)
+
+    async def main():
+        with pytest.raises(QueryTimeout):
+            await aq.query("SELECT 1", {"date": "d"})
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert runner.jobs[0].cancelled
+    assert aq.stats.timeouts == 1 and aq.stats.cancelled == 1
+
+
+def test_disconnect_only_cancels_when_last_waiter_leaves():
+    runner = FakeRunner()
+    aq = AsyncQueryRunner(runner, poll_interval_s=0.01)
+
+    async def gone() -> bool:
+        return True
+
+    async def main():
+        staying = asyncio.create_task(aq.query("SELECT 1", {"date": "d"}))
+        await asyncio.sleep(0.02)
+        with pytest.raises(ClientDisconnected):
+            await aq.query("SELECT 1", {"date": "d"}, is_disconnected=gone)
+        assert not runner.jobs[0].cancelled
+        runner.release.set()
+        return await staying
+
+    assert asyncio.run(main()) == [{"sql": "SELECT 1", "date": "d"}]
+    assert len(runner.jobs) == 1
+
+
+def test_cancel_during_submit_cancels_the_job_and_keeps_the_slot():
+    runner = FakeRunner()
+    submitting = threading.Event()
+    submit_query = runner.submit_query
+    runner.submit_query = lambda sql, params=None: submitting.wait(5) and submit_query(sql, params)
+    aq = AsyncQueryRunner(runner, max_concurrency=1, poll_interval_s=0.01)
+
+    async def gone() -> bool:
+        return True
+
+    async def main():
+        with pytest.raises(ClientDisconnected):
+            await aq.query("SELECT 1", {"date": "d"}, is_disconnected=gone)
+        # The first submit is still running on its thread, so the next query waits for the slot
+        second = asyncio.create_task(aq.query("SELECT 2", {"date": "d"}))
+        await asyncio.sleep(0.05)
+        assert runner.jobs == []
+        submitting.set()
+        rows = await second
+        assert runner.jobs[0].cancelled and not runner.jobs[1].cancelled
+        return rows
+
+    assert asyncio.run(main()) == [{"sql": "SELECT 2", "date": "d"}]
+    assert aq.stats.cancelled == 1
+
+
+def test_stream_holds_a_slot_until_it_is_closed():
+    runner = FakeRunner()
+    runner.stream = lambda sql, params=None, batch_rows=10_000: iter([["a"], ["b"]])
+    aq = AsyncQueryRunner(runner, max_concurrency=1, poll_interval_s=0.01)
+
+    async def main():
+        batches = aq.stream("SELECT 1", {"date": "d"})
+        assert await anext(batches) == ["a"]
+        query = asyncio.create_task(aq.query("SELECT 2", {"date": "d"}))
+        await asyncio.sleep(0.05)
+        assert runner.jobs == []
+        await batches.aclose()
+        runner.release.set()
+        return await query
+
+    assert asyncio.run(main()) == [{"sql": "SELECT 2", "date": "d"}]
@@ -0,0 +1,14 @@
+from datetime import date
+
+from pipeline.backfill import batches
+from pipeline.utils.dates import iter_dates
+
+
+def test_batches_split_gaps_and_long_runs():
+    days = iter_dates(date(2025, 1, 1), date(2025, 1, 5)) + iter_dates(date(2025, 1, 8), date(2025, 1, 9))
+    assert batches(days, max_days=3) == [
+        (date(2025, 1, 1), date(2025, 1, 3)),
+        (date(2025, 1, 4), date(2025, 1, 5)),
+        (date(2025, 1, 8), date(2025, 1, 9)),
+    ]
+    assert batches([], max_days=3) == []
@@ -0,0 +1,54 @@
+import pytest
+from google.cloud import bigquery
+
+from pipeline.bq import BQQueryRunner, BytesBudgetExceeded, QueryResult
+from pipeline.config import Settings
+
+
+class FakeEngine:
+    def __init__(self, estimate):
+        self.estimate = estimate
+        self.ran = []
+
+    def dry_run(self, sql, job_config=None):
+        return self.estimate
+
+    def run(self, sql, job_config=None):
+        self.ran.append((sql, job_config))
+        return QueryResult(job_id="job", bytes_processed=self.estimate, bytes_billed=self.estimate)
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setenv("PIPELINE_ENGINE", "duckdb")
+    return Settings.load()
+
+
+def test_run_rejects_step_over_budget_without_running_it(settings):
+    engine = FakeEngine(estimate=5000)
+    bq = BQQueryRunner(settings, engine=engine)
+    with pytest.raises(BytesBudgetExceeded) as e:
+        bq.run("SELECT 1", step="stg_github_events.sql", max_bytes=1000)
+    assert e.value.estimated_bytes == 5000 and e.value.step == "stg_github_events.sql"
+    assert engine.ran == [] and bq.results == []
+
+
+def test_run_within_budget_sets_maximum_bytes_billed(settings):
+    engine = FakeEngine(estimate=500)
+    bq = BQQueryRunner(settings, engine=engine)
+    job_config = bigquery.QueryJobConfig(labels={"step": "extract"})
+    result = bq.run("SELECT 1", job_config=job_config, max_bytes=1000)
+
+    sent = engine.ran[0][1]
+    assert sent.maximum_bytes_billed == 1000 and sent.labels == {"step": "extract"}
+    assert job_config.maximum_bytes_billed is None
+    assert result.step == "extract" and result.estimated_bytes == 500
+
+
+def test_run_labels_build_the_job_config(settings):
+    engine = FakeEngine(estimate=500)
+    bq = BQQueryRunner(settings, engine=engine)
+    result = bq.run("SELECT 1", labels={"step": "compute"})
+
+    assert engine.ran[0][1].labels == {"step": "compute"}
+    assert result.step == "compute"
@@ -0,0 +1,72 @@
+from pipeline.cache import ResponseCache, make_key
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _cache(**kwargs) -> tuple[ResponseCache, FakeClock]:
+    clock = FakeClock()
+    return ResponseCache(clock=clock, **kwargs), clock
+
+
+def test_make_key_ignores_param_order():
+    assert make_key("/alerts", {"date": "d", "limit": 5}) == make_key("/alerts", {"limit": 5, "date": "d"})
+
+
+def test_final_dates_use_the_long_ttl_and_others_the_volatile_one():
+    cache, clock = _cache(volatile_ttl_s=60, final_ttl_s=3600)
+    cache.put(("final",), [{"a": 1}], "2025-10-19", final=True)
+    # An old date is still volatile until its daily compute has published it
+    cache.put(("provisional",), [{"a": 1}], "2025-10-19")
+    cache.put(("empty",), [], "2025-10-19", final=True)
+    assert cache.snapshot()["final_entries"] == 2
+
+    clock.now = 61
+    assert cache.get(("final",)) == (True, [{"a": 1}])
+    assert cache.get(("provisional",)) == (False, None)
+    assert cache.get(("empty",)) == (False, None)
+    assert cache.stats.expirations == 2
+
+    clock.now = 3601
+    assert cache.get(("final",)) == (False, None)
+
+    # Without a final TTL, only eviction or invalidation drops final entries
+    forever, clock = _cache(final_ttl_s=None)
+    forever.put(("final",), [1], "2025-10-19", final=True)
+    clock.now = 10 ** 9
+    assert forever.get(("final",)) == (True, [1])
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache, _ = _cache(max_entries=2)
+    cache.put(("a",), [1], "2025-10-01")
+    cache.put(("b",), [2], "2025-10-01")
+    cache.get(("a",))                       # b is now least recently used
+    cache.put(("c",), [3], "2025-10-01")
+    assert cache.get(("b",))[0] is False
+    assert cache.get(("a",))[0] and cache.get(("c",))[0]
+    assert cache.stats.evictions == 1
+
+    small, _ = _cache(max_bytes=10)
+    small.put(("a",), ["xxxx"], "2025-10-01")
+    small.put(("b",), ["yyyy"], "2025-10-01")
+    assert small.snapshot()["entries"] == 1
+
+
+def test_invalidate_by_date():
+    cache, _ = _cache()
+    loads = []
+    load = lambda: loads.append(1) or [{"x": 1}]
+    cache.get_or_load(("a",), "2025-10-01", load)
+    cache.get_or_load(("a",), "2025-10-01", load)
+    cache.put(("b",), [1], "2025-10-02")
+    assert len(loads) == 1
+
+    assert cache.invalidate("2025-10-01") == 1
+    cache.get_or_load(("a",), "2025-10-01", load)
+    assert len(loads) == 2
+    assert cache.snapshot()["hits"] == 1
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from pipeline.bq import BQQueryRunner
+from pipeline.compute import compute_date
+from pipeline.config import Settings
+from pipeline.setup import SETUP_DIR, run_setup
+
+pytest.importorskip("duckdb")
+
+DAY = "2025-10-02"
+ALERTS_SQL = """
+SELECT alert_type, entity, severity, ROUND(trend_score, 9) AS t
+FROM `${MART_DATASET}.alerts_daily`
+WHERE event_date = DATE(@date)
+ORDER BY alert_type, entity
+"""
+SUMMARY_SQL = """
+SELECT summary_text, top_repos, top_languages, provisional
+FROM `${MART_DATASET}.daily_summary`
+WHERE event_date = DATE(@date)
+"""
+
+
+@pytest.fixture
+def bq(monkeypatch, tmp_path):
+    monkeypatch.setenv("PIPELINE_ENGINE", "duckdb")
+    monkeypatch.setenv("LOCAL_DB_PATH", str(tmp_path / "t.duckdb"))
+    monkeypatch.setenv("PAYLOAD_FIELDS", "")
+    monkeypatch.setenv("API_URL", "")
+    monkeypatch.setenv("MAX_REPO_ALERTS", "5")
+    settings = Settings.load()
+    runner = BQQueryRunner(settings)
+    run_setup(runner, settings, [SETUP_DIR / n for n in ("datasets.sql", "stg_tables.sql", "mart_tables.sql")])
+    rng = random.Random(9)
+    runner.load_rows("${MART_DATASET}.trending_repos_enriched", [
+        {
+            "event_date": DAY,
+            "repo_name": f"r{r}",
+            "primary_language": "Go" if r % 2 else "Rust",
+            "license": "mit",
+            "events_today": rng.randint(50, 500),
+            "actors_today": rng.randint(1, 50),
+            "stars_today": rng.randint(0, 20),
+            "growth_events_ratio": rng.choice([None, rng.uniform(0, 6)]),
+            "z_events": rng.uniform(-1, 8),
+            "trend_score": rng.uniform(-2, 9),
+        }
+        for r in range(12)
+    ])
+    runner.load_rows("${MART_DATASET}.trending_languages_daily", [
+        {"event_date": DAY, "primary_language": lang, "trending_repos_count": 6, "events_today_total": 900,
+         "actors_today_total": 90, "stars_today_total": 9, "avg_trend_score": score, "total_trend_score": 6 * score,
+         "top_repos": [], "actors_hll": None}
+        for lang, score in (("Go", 4.0), ("Rust", 1.5))
+    ])
+    return runner
+
+
+def test_publish_replaces_the_date_and_counts_the_new_alerts(bq, monkeypatch):
+    compute_date(bq, bq.settings, DAY, max_jobs=1, rollups=False, provisional=True)
+    alerts = bq.query(ALERTS_SQL, params={"date": DAY})
+    assert bq.query(SUMMARY_SQL, params={"date": DAY})[0]["provisional"] is True
+    # Recomputing replaces the date's rows instead of adding to them, and the daily run makes it final
+    compute_date(bq, bq.settings, DAY, max_jobs=1, rollups=False)
+    assert bq.query(ALERTS_SQL, params={"date": DAY}) == alerts
+
+    repo_alerts = [a for a in alerts if a["alert_type"] == "repo"]
+    assert 0 < len(repo_alerts) <= 5 and len(alerts) - len(repo_alerts) == 2
+    (summary,) = bq.query(SUMMARY_SQL, params={"date": DAY})
+    assert f"Repo alerts: {len(repo_alerts)}. Language alerts: 2." in summary["summary_text"]
+    assert summary["top_languages"] == ["Go", "Rust"] and len(summary["top_repos"]) == 5
+    assert summary["provisional"] is False
+
+    # The NumPy path stages its repo alerts and publishes the same rows
+    monkeypatch.setenv("SCORING_ENGINE", "numpy")
+    compute_date(bq, Settings.load(), DAY, max_jobs=1, rollups=False)
+    assert bq.query(ALERTS_SQL, params={"date": DAY}) == alerts
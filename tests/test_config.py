@@ -0,0 +1,19 @@
+import pytest
+
+from pipeline.config import DEFAULT_PAYLOAD_FIELDS, PayloadField, _payload_fields
+
+
+def test_payload_fields_default_spec():
+    fields = _payload_fields(DEFAULT_PAYLOAD_FIELDS)
+    assert [f.column for f in fields] == ["push_commits", "pr_action", "pr_merged", "issue_action"]
+    assert fields[2] == PayloadField("pr_merged", "BOOL", "PullRequestEvent", "$.pull_request.merged")
+
+
+def test_payload_fields_empty_spec_disables_projection():
+    assert _payload_fields("") == ()
+
+
+@pytest.mark.parametrize("spec", ["a:INT64:PushEvent", "a:JSON:PushEvent:size", "a-b:INT64:PushEvent:size"])
+def test_payload_fields_rejects_bad_entries(spec):
+    with pytest.raises(ValueError):
+        _payload_fields(spec)
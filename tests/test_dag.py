@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from pipeline.dag import Node, critical_path, link, run_dag, table_refs
+from pipeline.transform import SQL_ROOT
+
+
+def test_table_refs_from_model_sql():
+    sql = (SQL_ROOT / "30_marts" / "01_trending_repos_enriched.sql").read_text()
+    reads, writes = table_refs(sql)
+    assert writes == {"MART.trending_repos_enriched"}
+    assert reads == {"MART.trending_repos_daily", "STG.repo_dim", "STG.repo_names"}
+
+    assert table_refs((SQL_ROOT / "10_staging" / "00_explore_source.sql").read_text()) == (set(), set())
+
+
+def test_link_orders_writers_and_readers():
+    nodes = link([
+        Node("create", lambda: None, writes={"STG.t"}),
+        Node("append", lambda: None, writes={"STG.t"}),
+        Node("reader", lambda: None, reads={"STG.t"}, writes={"MART.m"}),
+        Node("other", lambda: None, reads={"RAW.events"}, writes={"STG.o"}),
+    ])
+    deps = {n.name: n.deps for n in nodes}
+    assert deps == {"create": set(), "append": {"create"}, "reader": {"create", "append"}, "other": set()}
+
+
+def test_link_rejects_cycles():
+    with pytest.raises(ValueError, match="cycle"):
+        link([
+            Node("a", lambda: None, reads={"STG.b"}, writes={"STG.a"}),
+            Node("b", lambda: None, reads={"STG.a"}, writes={"STG.b"}),
+        ])
+
+
+def test_run_dag_runs_independent_nodes_concurrently():
+    both_running = threading.Barrier(2, timeout=5)
+    order = []
+
+    def work(name):
+        def run():
+            if name in ("left", "right"):
+                both_running.wait()     # deadlocks unless they overlap
+                time.sleep(0.02 if name == "left" else 0.05)
+            order.append(name)
+        return run
+
+    nodes = [
+        Node("root", work("root")),
+        Node("left", work("left"), deps={"root"}),
+        Node("right", work("right"), deps={"root"}),
+        Node("join", work("join"), deps={"left", "right"}),
+    ]
+    run_dag(nodes, max_jobs=2)
+    assert order[0] == "root" and order[-1] == "join"
+    assert [n.name for n in critical_path(nodes)] == ["root", "right", "join"]
+
+
+def test_run_dag_stops_scheduling_after_failure():
+    ran = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    nodes = [Node("a", fail), Node("b", lambda: ran.append("b"), deps={"a"})]
+    with pytest.raises(RuntimeError, match="boom"):
+        run_dag(nodes, max_jobs=2)
+    assert ran == []
@@ -0,0 +1,30 @@
+from datetime import date
+
+import pytest
+
+from pipeline.utils.dates import MAX_DATE, MIN_DATE, resolve_date_range
+
+
+def test_single_date():
+    assert resolve_date_range("2025-10-01", None, None) == (date(2025, 10, 1), date(2025, 10, 1))
+
+
+def test_range():
+    assert resolve_date_range(None, "2025-10-01", "2025-10-07") == (date(2025, 10, 1), date(2025, 10, 7))
+
+
+def test_no_arguments_means_full_history():
+    assert resolve_date_range(None, None, None) == (MIN_DATE, MAX_DATE)
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ("2025-10-01", "2025-10-01", None),
+        (None, "2025-10-01", None),
+        (None, "2025-10-07", "2025-10-01"),
+    ],
+)
+def test_invalid_combinations(args):
+    with pytest.raises(ValueError):
+        resolve_date_range(*args)
@@ -0,0 +1,44 @@
+import pytest
+
+from pipeline.bq import BQQueryRunner
+from pipeline.config import Settings
+from pipeline.dictionary import RepoNames, name_id, record_sql
+from pipeline.farmhash import fingerprint64
+from pipeline.setup import SETUP_DIR, run_setup
+
+NAMES_SQL = "SELECT repo_id, repo_name FROM `${STG_DATASET}.repo_names` ORDER BY repo_name"
+
+
+def test_fingerprint_matches_bigquery_farm_fingerprint():
+    # FARM_FINGERPRINT examples from the BigQuery documentation
+    assert fingerprint64("1footrue") == -1541654101129638711
+    assert fingerprint64("2applefalse") == 2794438866806483259
+    assert fingerprint64("3true") == -4880158226897771312
+    assert name_id("torvalds/linux") == fingerprint64("torvalds/linux".encode("utf-8"))
+
+
+def test_overlapping_extracts_agree_on_ids_and_names(monkeypatch, tmp_path):
+    pytest.importorskip("duckdb")
+    monkeypatch.setenv("PIPELINE_ENGINE", "duckdb")
+    monkeypatch.setenv("LOCAL_DB_PATH", str(tmp_path / "t.duckdb"))
+    monkeypatch.setenv("PAYLOAD_FIELDS", "")
+    settings = Settings.load()
+    bq = BQQueryRunner(settings)
+    run_setup(bq, settings, [SETUP_DIR / "datasets.sql", SETUP_DIR / "stg_tables.sql"])
+
+    ids = RepoNames(bq).ids(["b/y", "a/x"], "2025-10-01")
+    assert ids == {"a/x": name_id("a/x"), "b/y": name_id("b/y")}
+    # An overlapping extract that looked b/y up before it was recorded records it again
+    bq.load_rows("${STG_DATASET}.repo_ids", [{"repo_id": ids["b/y"], "repo_name": "b/y", "first_seen": "2025-10-01"}])
+    assert RepoNames(bq).ids(["b/y"], "2025-10-02") == {"b/y": ids["b/y"]}
+
+    # The SQL extract computes the same ids and records only the names it has not seen
+    bq.run(
+        "CREATE TEMP TABLE extracted AS SELECT * FROM (VALUES"
+        " (DATE '2025-10-02', 'c/z'), (DATE '2025-10-02', 'a/x'), (DATE '2025-10-03', NULL))"
+        " AS t(event_date, repo_name);"
+        + record_sql("extracted")
+    )
+    assert bq.query(NAMES_SQL) == [
+        {"repo_id": name_id(name), "repo_name": name} for name in ("a/x", "b/y", "c/z")
+    ]
@@ -0,0 +1,44 @@
+import json
+from datetime import date
+
+import pytest
+
+from pipeline.bq import BQQueryRunner
+from pipeline.config import Settings
+from pipeline.encoding import JSONBytesResponse, dumps
+from pipeline.setup import SETUP_DIR, run_setup
+
+pytest.importorskip("duckdb")
+
+LANGUAGES_SQL = """
+SELECT CAST(event_date AS STRING) AS event_date, primary_language, total_trend_score, top_repos
+FROM `${MART_DATASET}.trending_languages_daily`
+ORDER BY primary_language
+"""
+
+
+def test_dumps_is_compact_json():
+    value = [{"a": 1.5, "b": None, "top": [{"repo_name": "x/y", "trend_score": 2.0}], "d": date(2025, 10, 3)}]
+    assert json.loads(dumps(value)) == [{**value[0], "d": "2025-10-03"}]
+    assert JSONBytesResponse(value).body == dumps(value)
+    assert b" " not in dumps({"a": [1, 2]})
+
+
+def test_columnar_rows_match_row_by_row(monkeypatch, tmp_path):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setenv("PIPELINE_ENGINE", "duckdb")
+    monkeypatch.setenv("LOCAL_DB_PATH", str(tmp_path / "t.duckdb"))
+    monkeypatch.setenv("PAYLOAD_FIELDS", "")
+    settings = Settings.load()
+    bq = BQQueryRunner(settings)
+    run_setup(bq, settings, [SETUP_DIR / "datasets.sql", SETUP_DIR / "mart_tables.sql"])
+    bq.load_rows("${MART_DATASET}.trending_languages_daily", [
+        {"event_date": "2025-10-03", "primary_language": lang, "trending_repos_count": 2, "events_today_total": 9,
+         "actors_today_total": 3, "stars_today_total": 1, "avg_trend_score": 1.0, "total_trend_score": 2.0,
+         "top_repos": [{"repo_name": f"{lang}/a", "trend_score": 1.5}, {"repo_name": f"{lang}/b", "trend_score": 0.5}]}
+        for lang in ["Go", "Rust"]
+    ])
+    rows = bq.submit_query(LANGUAGES_SQL).result()
+    assert len(rows) == 2
+    assert bq.submit_query(LANGUAGES_SQL).arrow().to_pylist() == rows
+    assert json.loads(dumps(rows)) == json.loads(json.dumps(rows))
@@ -0,0 +1,91 @@
+import random
+from collections import Counter
+
+import pytest
+
+from pipeline.bq import BQQueryRunner
+from pipeline.config import Settings
+from pipeline.dictionary import RepoNames
+from pipeline.heavy_hitters import EXACT_TOP_SQL, SUMMARIES_SQL, SpaceSaving, merge_rows
+from pipeline.setup import SETUP_DIR, run_setup
+from pipeline.transform import SQL_ROOT
+
+
+def _check_bounds(summary: SpaceSaving, truth: Counter) -> None:
+    n, m = sum(truth.values()), summary.capacity
+    assert summary.total == n
+    for item, (value, error) in summary.counters.items():
+        assert value - error <= truth[item] <= value
+        assert error <= n / m
+    assert summary.min_value() <= n / m
+    for item, count in truth.items():
+        if count > n / m:
+            assert item in summary.counters
+
+
+def test_space_saving_bounds_hold_for_streams_and_merges():
+    rng = random.Random(3)
+    # Zipf-like weights over 500 repos, split over 6 "workers"
+    stream = [(f"r{int(rng.paretovariate(1.2)) % 500}", rng.randint(1, 5)) for _ in range(6000)]
+    parts = [stream[i::6] for i in range(6)]
+
+    merged = SpaceSaving(20)
+    for part in parts:
+        summary = SpaceSaving(20).update(part)
+        part_truth = Counter()
+        for item, weight in part:
+            part_truth[item] += weight
+        _check_bounds(summary, part_truth)
+        merged.merge(summary)
+
+    truth = Counter()
+    for item, weight in stream:
+        truth[item] += weight
+    _check_bounds(merged, truth)
+    assert len(merged.counters) == 20
+    # The heaviest repos stand out, so the top 3 are certain and right
+    top = merged.top(4)
+    assert [item for item, _, _ in top[:3]] == [item for item, _ in truth.most_common(3)]
+    assert top[2][1] - top[2][2] >= top[3][1]
+
+    restored = SpaceSaving.from_row(**merged.to_row())
+    assert restored.top(20) == merged.top(20)
+
+
+@pytest.fixture
+def bq(monkeypatch, tmp_path):
+    pytest.importorskip("duckdb")
+    monkeypatch.setenv("PIPELINE_ENGINE", "duckdb")
+    monkeypatch.setenv("LOCAL_DB_PATH", str(tmp_path / "t.duckdb"))
+    monkeypatch.setenv("PAYLOAD_FIELDS", "")
+    monkeypatch.setenv("HEAVY_HITTERS_CAPACITY", "4")
+    settings = Settings.load()
+    runner = BQQueryRunner(settings)
+    run_setup(runner, settings, [SETUP_DIR / n for n in ("datasets.sql", "stg_tables.sql", "mart_tables.sql")])
+    rng = random.Random(11)
+    ids = RepoNames(runner).ids([f"go/r{i}" for i in range(12)], "2025-10-01")
+    runner.load_rows("${STG_DATASET}.repo_dim", [
+        {"repo_id": ids[f"go/r{i}"], "primary_language": "Go", "all_languages": None, "license": None,
+         "looked_up_at": "2025-10-01T00:00:00"}
+        for i in range(12)
+    ])
+    runner.load_rows("${STG_DATASET}.daily_repo_activity", [
+        {"event_date": f"2025-10-0{d}", "repo_id": ids[f"go/r{i}"], "events_total": rng.randint(1, 40) * (12 - i),
+         "actors_unique": 1, "pushes": 0, "pull_requests": 0, "issues": 0, "stars": rng.randint(0, 3), "forks": 0}
+        for d in (1, 2, 3) for i in range(12)
+    ])
+    model = (SQL_ROOT / "30_marts" / "03_language_top_repos.sql").read_text(encoding="utf-8")
+    runner.run(model, extra={"DATE_FROM": "2025-10-01", "DATE_TO": "2025-10-03"})
+    return runner
+
+
+def test_window_summary_bounds_the_exact_totals(bq):
+    params = {"date_from": "2025-10-01", "date_to": "2025-10-03", "language": "Go", "metric": "events"}
+    rows = bq.query(SUMMARIES_SQL, params=params)
+    assert len(rows) == 3 and all(len(r["top"]) == 4 and r["hour"] is None for r in rows)
+    window = merge_rows(rows, 4)
+
+    exact = {r["repo_name"]: r["value"] for r in bq.query(EXACT_TOP_SQL, params={**params, "k": 100})}
+    _check_bounds(window, Counter(exact))
+    assert max(exact, key=exact.get) in window.counters
+    assert window.total == sum(exact.values())
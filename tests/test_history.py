@@ -0,0 +1,81 @@
+import pytest
+
+from pipeline.bq import BQQueryRunner
+from pipeline.config import Settings
+from pipeline.dictionary import RepoNames
+from pipeline.history import HISTORY_SQL, HistoryCache, days_between
+from pipeline.setup import SETUP_DIR, run_setup
+
+DAYS = days_between("2025-10-01", "2025-10-03")
+
+
+def _point(day, repo, score):
+    return {"event_date": day, "repo_name": repo, "events_today": 10, "actors_today": 2, "stars_today": 1,
+            "growth_events_ratio": None, "z_events": None, "trend_score": score}
+
+
+def _computed(day, final=True):
+    return {**_point(day, None, None), "events_today": None, "actors_today": None, "stars_today": None,
+            "final": final}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_final_days_are_kept_longer_than_provisional_ones():
+    clock = Clock()
+    cache = HistoryCache(volatile_ttl_s=60, final_ttl_s=3600, clock=clock)
+    _, missing = cache.lookup(["a/x", "b/y"], DAYS)
+    assert missing == {"a/x": DAYS, "b/y": DAYS}
+
+    # 10-02 is computed by the hourly run only, 10-03 not at all; b/y did not trend on 10-02
+    rows = [_computed("2025-10-01"), _computed("2025-10-02", final=False),
+            _point("2025-10-01", "a/x", 1.0), _point("2025-10-02", "a/x", 2.0), _point("2025-10-01", "b/y", 3.0)]
+    points = cache.store(rows, ["a/x", "b/y"], DAYS)
+    assert sorted(points["a/x"]) == ["2025-10-01", "2025-10-02"] and list(points["b/y"]) == ["2025-10-01"]
+
+    cached, missing = cache.lookup(["a/x", "b/y"], DAYS)
+    assert missing == {}
+    assert cached["b/y"]["2025-10-02"] is None and cached["a/x"]["2025-10-02"]["trend_score"] == 2.0
+
+    clock.now = 61
+    _, missing = cache.lookup(["a/x", "b/y"], DAYS)
+    assert missing == {"a/x": ["2025-10-02", "2025-10-03"], "b/y": ["2025-10-02", "2025-10-03"]}
+
+    clock.now = 3601
+    assert cache.lookup(["a/x"], DAYS)[1] == {"a/x": DAYS}
+
+    cache.store(rows, ["a/x", "b/y"], DAYS)
+    assert cache.invalidate("2025-10-01") == 2
+    assert cache.lookup(["a/x"], DAYS)[1] == {"a/x": ["2025-10-01"]}
+
+
+def test_history_query_reads_repos_and_computed_days(monkeypatch, tmp_path):
+    pytest.importorskip("duckdb")
+    monkeypatch.setenv("PIPELINE_ENGINE", "duckdb")
+    monkeypatch.setenv("LOCAL_DB_PATH", str(tmp_path / "t.duckdb"))
+    monkeypatch.setenv("PAYLOAD_FIELDS", "")
+    settings = Settings.load()
+    bq = BQQueryRunner(settings)
+    run_setup(bq, settings, [SETUP_DIR / n for n in ("datasets.sql", "stg_tables.sql", "mart_tables.sql")])
+    ids = RepoNames(bq).ids(["a/x", "b/y", "c/z"], "2025-10-01")
+    points = [_point("2025-10-01", "a/x", 1.0), _point("2025-10-02", "c/z", 2.0), _point("2025-10-02", "b/y", 4.0)]
+    bq.load_rows("${MART_DATASET}.trending_repos_daily", [
+        {**{k: v for k, v in p.items() if k != "repo_name"}, "repo_id": ids[p["repo_name"]]} for p in points
+    ])
+    # 10-02 is still provisional (pipeline.hourly)
+    bq.load_rows("${MART_DATASET}.daily_summary", [
+        {"event_date": "2025-10-01", "provisional": False}, {"event_date": "2025-10-02", "provisional": True},
+    ])
+    rows = bq.query(HISTORY_SQL, params={"date_from": "2025-10-01", "date_to": "2025-10-03", "repos": ["a/x", "b/y"]})
+    assert sorted((r["event_date"], r["repo_name"]) for r in rows if r["repo_name"]) == [
+        ("2025-10-01", "a/x"), ("2025-10-02", "b/y"),
+    ]
+    assert sorted((r["event_date"], r["final"]) for r in rows if r["repo_name"] is None) == [
+        ("2025-10-01", True), ("2025-10-02", False),
+    ]
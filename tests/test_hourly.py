@@ -0,0 +1,94 @@
+import gzip
+import json
+
+import pytest
+
+from pipeline.bq import BQQueryRunner
+from pipeline.config import Settings
+from pipeline.dictionary import RepoNames
+from pipeline.hourly import INTRADAY_STATUS_SQL, run_hour
+from pipeline.setup import SETUP_DIR, run_setup
+
+pytest.importorskip("duckdb")
+
+DAY = "2025-10-05"
+
+
+@pytest.fixture
+def bq(monkeypatch, tmp_path):
+    monkeypatch.setenv("PIPELINE_ENGINE", "duckdb")
+    monkeypatch.setenv("LOCAL_DB_PATH", str(tmp_path / "t.duckdb"))
+    monkeypatch.setenv("PAYLOAD_FIELDS", "")
+    monkeypatch.setenv("MIN_EVENTS_THRESHOLD", "24")
+    monkeypatch.setenv("LOOKBACK_DAYS", "3")
+    settings = Settings.load()
+    runner = BQQueryRunner(settings)
+    run_setup(runner, settings, [SETUP_DIR / n for n in ("datasets.sql", "stg_tables.sql", "mart_tables.sql")])
+    # org/hot usually has 48 events a day from 2-4 actors, org/calm exactly 24
+    ids = RepoNames(runner).ids(["org/hot", "org/calm"], "2025-10-02")
+    runner.load_rows("${STG_DATASET}.daily_repo_activity", [
+        {"event_date": f"2025-10-0{d}", "repo_id": ids[repo], "events_total": events, "actors_unique": actors,
+         "pushes": events, "pull_requests": 0, "issues": 0, "stars": 0, "forks": 0}
+        for d, hot, calm in [(2, (40, 2), (24, 1)), (3, (48, 3), (24, 1)), (4, (56, 4), (24, 1))]
+        for repo, (events, actors) in [("org/hot", hot), ("org/calm", calm)]
+    ])
+    return runner
+
+
+def _hour_file(tmp_path, hour, events):
+    path = tmp_path / f"{DAY}-{hour}.json.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for repo, actor, event_type in events:
+            f.write(json.dumps({"created_at": f"{DAY}T{hour:02d}:10:00Z", "type": event_type,
+                                "repo": {"name": repo}, "actor": {"login": actor}}) + "\n")
+    return path
+
+
+def _trending(bq):
+    return {r["repo_name"]: r for r in bq.query(
+        "SELECT n.repo_name, t.* FROM `${MART_DATASET}.trending_repos_daily` t "
+        "JOIN `${STG_DATASET}.repo_names` n ON t.repo_id = n.repo_id WHERE t.event_date = DATE(@date)",
+        params={"date": DAY},
+    )}
+
+
+def _hour_rows(bq, hour):
+    return {
+        table: bq.query(
+            f"SELECT COUNT(*) AS n FROM `${{{dataset}}}.{table}` WHERE event_date = DATE(@date) AND {column} = @hour",
+            params={"date": DAY, "hour": hour},
+        )[0]["n"]
+        for dataset, table, column in [
+            ("STG_DATASET", "intraday_repo_activity", "updated_hour"),
+            ("MART_DATASET", "language_top_repos", "hour"),
+            ("STG_DATASET", "intraday_hours", "hour"),
+        ]
+    }
+
+
+def test_hours_fold_into_running_totals_and_scaled_scores(bq, tmp_path):
+    hour0 = [("org/hot", f"u{i % 3}", "PushEvent") for i in range(30)] + [("org/calm", "c", "PushEvent")]
+    run_hour(bq, bq.settings, DAY, 0, _hour_file(tmp_path, 0, hour0))
+    rows = _trending(bq)
+    # One hour in: the threshold is 1 event and the baseline mean of 48 events becomes 2
+    assert set(rows) == {"org/hot", "org/calm"}
+    assert rows["org/hot"]["avg_events_prev"] == pytest.approx(2.0)
+    assert rows["org/hot"]["z_events"] == pytest.approx((30 - 2.0) / (8.0 / 24))
+    assert rows["org/hot"]["trend_score"] > 0
+
+    hour1 = [("org/hot", "u9", "WatchEvent"), ("org/new", "n", "PushEvent")]
+    path1 = _hour_file(tmp_path, 1, hour1)
+    run_hour(bq, bq.settings, DAY, 1, path1)
+    written = _hour_rows(bq, 1)
+    # Re-folding the latest hour replaces its rows and gives the same totals
+    run_hour(bq, bq.settings, DAY, 1, path1)
+    assert _hour_rows(bq, 1) == written and written["intraday_hours"] == 1
+    hot = _trending(bq)["org/hot"]
+    assert (hot["events_today"], hot["actors_today"], hot["stars_today"]) == (31, 4, 1)
+    assert hot["avg_events_prev"] == pytest.approx(4.0)
+    assert bq.query("SELECT COUNT(*) AS n FROM `${MART_DATASET}.alerts_daily` WHERE entity = 'org/hot'")[0]["n"] == 1
+
+    with pytest.raises(SystemExit):
+        run_hour(bq, bq.settings, DAY, 3, path1)
+    status = bq.query(INTRADAY_STATUS_SQL, params={"date": DAY})[0]
+    assert (status["hours"], status["last_hour"], status["final"]) == (2, 1, False)
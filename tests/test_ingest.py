@@ -0,0 +1,69 @@
+import base64
+import gzip
+import json
+
+from pipeline import hll, ingest
+
+
+def _write_hour(path, events):
+    with gzip.open(path, "wt") as f:
+        for e in events:
+            f.write(json.dumps(e) + "\n")
+
+
+def _event(repo, actor, type_, created_at="2025-10-01T10:00:00Z"):
+    return {"type": type_, "repo": {"name": repo}, "actor": {"login": actor}, "created_at": created_at, "payload": {}}
+
+
+def test_aggregates_hour_files_like_daily_repo_activity(tmp_path):
+    _write_hour(tmp_path / "2025-10-01-0.json.gz", [
+        _event("a/x", "u1", "PushEvent"),
+        _event("a/x", "u2", "WatchEvent"),
+        _event("b/y", "u1", "ForkEvent"),
+        _event("b/y", None, "ForkEvent"),
+        _event("b/y", "u9", "PushEvent", created_at="2025-09-30T23:59:59Z"),
+    ])
+    _write_hour(tmp_path / "2025-10-01-1.json.gz", [
+        _event("a/x", "u1", "PullRequestEvent"),
+        _event("a/x", "u3", "IssuesEvent"),
+    ])
+    _write_hour(tmp_path / "2025-10-02-0.json.gz", [_event("c/z", "u1", "PushEvent", "2025-10-02T00:00:00Z")])
+
+    files = ingest.hour_files(tmp_path, "2025-10-01")
+    assert [f.name for f in files] == ["2025-10-01-0.json.gz", "2025-10-01-1.json.gz"]
+
+    repo_ids = {"a/x": 2, "b/y": 1}
+    encoded = []
+    for workers in (1, 2):
+        counters = ingest.aggregate_files(
+            files, "2025-10-01", workers=workers, encode=lambda c: ingest.encode_ids(c, repo_ids)
+        )
+        assert counters[2].actors.count() == 3
+        encoded.append(ingest.to_activity_rows("2025-10-01", counters))
+    serial, parallel = encoded
+    assert serial == parallel
+    assert serial == [
+        {"event_date": "2025-10-01", "repo_id": 1, "events_total": 1, "actors_unique": 1,
+         "pushes": 0, "pull_requests": 0, "issues": 0, "stars": 0, "forks": 1},
+        {"event_date": "2025-10-01", "repo_id": 2, "events_total": 4, "actors_unique": 3,
+         "pushes": 1, "pull_requests": 1, "issues": 1, "stars": 1, "forks": 0},
+    ]
+
+
+def test_activity_rows_carry_mergeable_actor_sketches():
+    day1 = ingest.aggregate(iter([("a/x", "u1", "PushEvent"), ("a/x", "u2", "PushEvent")]), precision=12)
+    day2 = ingest.aggregate(iter([("a/x", "u2", "PushEvent"), ("a/x", "u3", "WatchEvent")]), precision=12)
+    sketches = [
+        base64.b64decode(ingest.to_activity_rows(d, c, sketches=True)[0]["actors_hll"])
+        for d, c in [("2025-10-01", day1), ("2025-10-02", day2)]
+    ]
+    assert [hll.extract(s) for s in sketches] == [2, 2]
+    assert hll.merge(sketches) == 3
+
+
+def test_repo_state_is_bounded_by_the_sketch():
+    # 20,000 distinct actors on one repo: the state is one sketch, not a set of actors
+    counters = ingest.aggregate((("a/x", f"u{i}", "PushEvent") for i in range(20_000)), precision=8)
+    sketch = counters["a/x"].actors
+    assert sketch.registers is not None and len(sketch.to_bytes()) == 3 + 2 ** 8
+    assert abs(sketch.count() - 20_000) < 0.15 * 20_000
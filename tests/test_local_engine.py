@@ -0,0 +1,73 @@
+import pytest
+
+from pipeline.config import Settings
+from pipeline.local_engine import IfBlock, LocalEngine, translate_sql
+
+duckdb = pytest.importorskip("duckdb")
+
+
+def test_translates_bigquery_constructs():
+    (stmt,), tables = translate_sql(
+        'SELECT SAFE_DIVIDE(a, b) AS r, COUNTIF(t = "x") AS n '
+        'FROM `proj.ds.tbl` WHERE d >= DATE_SUB(DATE("2025-10-01"), INTERVAL 14 DAY)'
+    )
+    assert tables == [("ds", "tbl")]
+    assert '"ds"."tbl"' in stmt
+    assert "count_if(t = 'x')" in stmt
+    assert "CAST('2025-10-01' AS DATE) - (14)" in stmt
+    assert "SAFE_DIVIDE" not in stmt
+
+
+def test_create_table_drops_partitioning_and_maps_types():
+    (stmt,), _ = translate_sql(
+        "CREATE TABLE IF NOT EXISTS `ds.t` (d DATE, n INT64, tags ARRAY<STRUCT<name STRING, w FLOAT64>>)\n"
+        "PARTITION BY d\nCLUSTER BY n"
+    )
+    assert "PARTITION" not in stmt and "CLUSTER" not in stmt
+    assert "n BIGINT" in stmt
+    assert "STRUCT(name VARCHAR, w DOUBLE)[]" in stmt
+
+
+def test_if_block_runs_one_branch():
+    program, _ = translate_sql(
+        "CREATE TABLE t (x INT64);\n"
+        "IF EXISTS (SELECT 1 FROM t) THEN\n"
+        "    INSERT INTO t VALUES (1);\n"
+        "ELSE\n"
+        "    INSERT INTO t VALUES (2);\n"
+        "    INSERT INTO t VALUES (3);\n"
+        "END IF;"
+    )
+    assert isinstance(program[1], IfBlock)
+    con = duckdb.connect()
+    con.execute(program[0])
+    (cond,) = con.execute(f"SELECT ({program[1].condition})").fetchone()
+    for stmt in program[1].then if cond else program[1].otherwise:
+        con.execute(stmt)
+    assert sorted(r[0] for r in con.execute("SELECT x FROM t").fetchall()) == [2, 3]
+
+
+def test_array_agg_limit_and_struct():
+    (stmt,), _ = translate_sql(
+        "SELECT ARRAY_AGG(STRUCT(name, score) ORDER BY score DESC LIMIT 2) AS top "
+        "FROM (SELECT 'a' AS name, 1 AS score UNION ALL SELECT 'b', 3 UNION ALL SELECT 'c', 2)"
+    )
+    (top,) = duckdb.connect().execute(stmt).fetchone()
+    assert [t["name"] for t in top] == ["b", "c"]
+
+
+def test_failed_load_rolls_back_and_removes_the_spool(tmp_path, monkeypatch):
+    monkeypatch.setenv("PIPELINE_ENGINE", "duckdb")
+    monkeypatch.setenv("LOCAL_DB_PATH", str(tmp_path / "t.duckdb"))
+    engine = LocalEngine(Settings.load())
+    engine.con.execute("CREATE SCHEMA s; CREATE TABLE s.t (event_date DATE, n BIGINT)")
+    engine.load_rows("s.t", [{"event_date": "2025-10-01", "n": 1}])
+    spool_dir = tmp_path / "spool"
+    spool_dir.mkdir()
+    monkeypatch.setattr("tempfile.tempdir", str(spool_dir))
+    with pytest.raises(duckdb.Error):
+        engine.load_rows("s.t", [{"event_date": "2025-10-01", "n": "not a number"}], partition_date="2025-10-01")
+    # The replaced partition is back and the spool file is gone
+    assert engine.con.execute("SELECT n FROM s.t").fetchall() == [(1,)]
+    assert list(spool_dir.iterdir()) == []
+    engine.load_rows("s.t", [{"event_date": "2025-10-02", "n": 2}])
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from pipeline.bq import BQQueryRunner
+from pipeline.config import Settings
+from pipeline.pagination import after_condition, after_params, decode_cursor, encode_cursor, order_by
+from pipeline.setup import SETUP_DIR, run_setup
+
+pytest.importorskip("duckdb")
+
+KEYS = [("trend_score", "DESC"), ("repo_name", "ASC")]
+PAGE_SQL = """
+SELECT repo_name, trend_score
+FROM `${MART_DATASET}.trending_repos_enriched`
+WHERE event_date = DATE(@date) AND ${AFTER}
+ORDER BY ${ORDER_BY}
+LIMIT @limit
+"""
+
+
+@pytest.fixture
+def bq(monkeypatch, tmp_path):
+    monkeypatch.setenv("PIPELINE_ENGINE", "duckdb")
+    monkeypatch.setenv("LOCAL_DB_PATH", str(tmp_path / "t.duckdb"))
+    monkeypatch.setenv("PAYLOAD_FIELDS", "")
+    settings = Settings.load()
+    runner = BQQueryRunner(settings)
+    run_setup(runner, settings, [SETUP_DIR / "datasets.sql", SETUP_DIR / "mart_tables.sql"])
+    rng = random.Random(7)
+    runner.load_rows("${MART_DATASET}.trending_repos_enriched", [
+        {"event_date": "2025-10-03", "repo_name": f"org/r{i:02d}", "primary_language": "Go", "license": "mit",
+         "events_today": 10, "actors_today": 1, "stars_today": 0,
+         # Few distinct scores, so pages split ties
+         "trend_score": rng.choice([1.5, 2.0, 3.25])}
+        for i in range(23)
+    ])
+    return runner
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    assert decode_cursor(encode_cursor([3.25, "org/r1"]), KEYS) == [3.25, "org/r1"]
+    for bad in ["%%%", encode_cursor([1.0]), encode_cursor([None, "x"]), encode_cursor({"a": 1})]:
+        with pytest.raises(ValueError):
+            decode_cursor(bad, KEYS)
+
+
+def test_keyset_pages_cover_every_row_once(bq):
+    everything = bq.query(PAGE_SQL, extra={"AFTER": "TRUE", "ORDER_BY": order_by(KEYS)},
+                          params={"date": "2025-10-03", "limit": 100})
+    pages, cursor = [], None
+    while True:
+        values = decode_cursor(cursor, KEYS) if cursor else None
+        extra = {"AFTER": after_condition(KEYS) if values else "TRUE", "ORDER_BY": order_by(KEYS)}
+        page = bq.query(PAGE_SQL, extra=extra, params={"date": "2025-10-03", "limit": 5, **after_params(values or [])})
+        pages.append(page)
+        if len(page) < 5:
+            break
+        cursor = encode_cursor([page[-1]["trend_score"], page[-1]["repo_name"]])
+    assert [len(p) for p in pages] == [5, 5, 5, 5, 3]
+    assert [r for p in pages for r in p] == everything
+
+
+def test_stream_yields_arrow_batches(bq):
+    pytest.importorskip("pyarrow")
+    batches = list(bq.stream(PAGE_SQL, extra={"AFTER": "TRUE", "ORDER_BY": order_by(KEYS)},
+                             params={"date": "2025-10-03", "limit": 100}, batch_rows=10))
+    assert sum(b.num_rows for b in batches) == 23
+    assert batches[0].schema.names == ["repo_name", "trend_score"]
@@ -0,0 +1,71 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from pipeline.bq import BQQueryRunner
+from pipeline.config import Settings
+from pipeline.dictionary import RepoNames
+from pipeline.repo_cache import RepoCache, update_repo_dim
+from pipeline.setup import SETUP_DIR, run_setup
+
+pytest.importorskip("duckdb")
+
+
+def _row(name, language="Go", looked_up_at=None):
+    return {
+        "repo_name": name,
+        "primary_language": language,
+        "all_languages": [{"name": language, "bytes": 10}] if language else None,
+        "license": "mit" if language else None,
+        "looked_up_at": looked_up_at or datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def test_cache_returns_fresh_entries_only(tmp_path):
+    cache = RepoCache(tmp_path / "c.sqlite")
+    old = (datetime.now(timezone.utc) - timedelta(days=40)).isoformat()
+    cache.put([_row("a/new"), _row("b/old", looked_up_at=old), _row("c/none", language=None)])
+    assert set(cache.get(["a/new", "b/old", "c/none", "d/missing"], max_age_days=30)) == {"a/new", "c/none"}
+    assert set(cache.get(["b/old"], max_age_days=0)) == {"b/old"}
+    assert cache.get(["a/new"])["a/new"]["all_languages"] == [{"name": "Go", "bytes": 10}]
+
+
+def test_update_repo_dim_looks_up_new_repos_once(monkeypatch, tmp_path):
+    monkeypatch.setenv("PIPELINE_ENGINE", "duckdb")
+    monkeypatch.setenv("LOCAL_DB_PATH", str(tmp_path / "t.duckdb"))
+    monkeypatch.setenv("LOCAL_DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("REPO_CACHE_PATH", str(tmp_path / "repos.sqlite"))
+    monkeypatch.setenv("PAYLOAD_FIELDS", "")
+    repos_dir = tmp_path / "data" / "github_repos"
+    repos_dir.mkdir(parents=True)
+    (repos_dir / "languages.json").write_text(
+        json.dumps({"repo_name": "a/x", "language": [{"name": "C", "bytes": 1}, {"name": "Go", "bytes": 9}]}) + "\n"
+    )
+    (repos_dir / "licenses.json").write_text(json.dumps({"repo_name": "a/x", "license": "mit"}) + "\n")
+
+    settings = Settings.load()
+    bq = BQQueryRunner(settings)
+    run_setup(bq, settings, [SETUP_DIR / "datasets.sql", SETUP_DIR / "stg_tables.sql"])
+    ids = RepoNames(bq).ids(["a/x", "b/y", "c/z"], "2025-10-01")
+    bq.load_rows("${STG_DATASET}.daily_repo_activity", [
+        {"event_date": day, "repo_id": ids[name], "events_total": 1}
+        for day, name in [("2025-10-01", "a/x"), ("2025-10-01", "b/y"), ("2025-10-02", "a/x"), ("2025-10-02", "c/z")]
+    ])
+
+    assert update_repo_dim(bq, settings, "2025-10-01", "2025-10-01")["cache_misses"] == 2
+    # Only c/z is new on the second day
+    assert update_repo_dim(bq, settings, "2025-10-02", "2025-10-02") == {"lookups": 1, "cache_hits": 0, "cache_misses": 1}
+    dim = bq.query(
+        "SELECT n.repo_name, d.primary_language, d.license FROM `${STG_DATASET}.repo_dim` d "
+        "JOIN `${STG_DATASET}.repo_names` n ON d.repo_id = n.repo_id ORDER BY n.repo_name"
+    )
+    assert dim == [
+        {"repo_name": "a/x", "primary_language": "Go", "license": "mit"},
+        {"repo_name": "b/y", "primary_language": None, "license": None},
+        {"repo_name": "c/z", "primary_language": None, "license": None},
+    ]
+
+    # A rebuilt database looks the same repos up in the cache, not in the metadata files
+    bq.run("DELETE FROM `${STG_DATASET}.repo_dim` WHERE true")
+    assert update_repo_dim(bq, settings, "2025-10-01", "2025-10-02")["cache_hits"] == 3
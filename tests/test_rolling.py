@@ -0,0 +1,114 @@
+import random
+import statistics
+
+import numpy as np
+import pytest
+
+from pipeline.rolling import RollingBaseline, rolling_stats, score, sparse_rolling_stats
+
+LOOKBACK = 3
+WEIGHTS = (0.5, 0.2, 0.3)
+
+
+def _random_activity(seed: int, repos: int = 6, days: int = 12):
+    """{day: {repo: (events, actors, stars)}} with gaps, like daily_repo_activity."""
+    rng = random.Random(seed)
+    activity = {}
+    for d in range(days):
+        activity[d] = {
+            f"r{r}": (rng.randint(1, 200), rng.randint(1, 20), rng.choice([0, 0, 1, 5]))
+            for r in range(repos)
+            if rng.random() < 0.7
+        }
+    return activity
+
+
+def _self_join_reference(activity, repo, d, metric):
+    """What the original self-join computed: AVG / STDDEV_SAMP over active days in the window."""
+    window = [activity[p][repo][metric] for p in range(d - LOOKBACK, d) if p in activity and repo in activity[p]]
+    avg = statistics.fmean(window) if window else None
+    std = statistics.stdev(window) if len(window) > 1 else None
+    return avg, std
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_incremental_state_matches_self_join(seed):
+    activity = _random_activity(seed)
+    baseline = RollingBaseline(LOOKBACK, WEIGHTS)
+    for d in sorted(activity):
+        if d > 0:
+            baseline.advance(activity[d - 1], activity.get(d - 1 - LOOKBACK, {}))
+        for repo, today in activity[d].items():
+            row = baseline.score(repo, today)
+            for i, metric in enumerate(("events", "actors", "stars")):
+                avg, std = _self_join_reference(activity, repo, d, i)
+                assert row[f"avg_{metric}_prev"] == pytest.approx(avg)
+                assert row[f"std_{metric}_prev"] == pytest.approx(std)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_vectorized_matches_incremental(seed):
+    activity = _random_activity(seed)
+    repos = sorted({r for day in activity.values() for r in day})
+    days = len(activity)
+    values = np.zeros((len(repos), days, 3), dtype=np.int64)
+    active = np.zeros((len(repos), days), dtype=bool)
+    for d, day in activity.items():
+        for repo, v in day.items():
+            values[repos.index(repo), d] = v
+            active[repos.index(repo), d] = True
+
+    _, mean, std = rolling_stats(values, active, LOOKBACK)
+    _, z, trend = score(values, mean, std, WEIGHTS)
+
+    baseline = RollingBaseline(LOOKBACK, WEIGHTS)
+    for d in range(days):
+        if d > 0:
+            baseline.advance(activity[d - 1], activity.get(d - 1 - LOOKBACK, {}))
+        for repo, today in activity[d].items():
+            row = baseline.score(repo, today)
+            r = repos.index(repo)
+            assert trend[r, d] == pytest.approx(row["trend_score"])
+            expected_z = row["z_events"]
+            assert (np.isnan(z[r, d, 0]) and expected_z is None) or z[r, d, 0] == pytest.approx(expected_z)
+
+
+def test_constant_series_has_zero_std_and_no_z():
+    values = np.full((1, 5, 3), 7, dtype=np.int64)
+    active = np.ones((1, 5), dtype=bool)
+    _, mean, std = rolling_stats(values, active, LOOKBACK)
+    _, z, trend = score(values, mean, std, WEIGHTS)
+    assert std[0, 4, 0] == 0.0
+    assert np.isnan(z[0, 4, 0])
+    assert trend[0, 4] == 0.0
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_sparse_matches_dense(seed):
+    activity = _random_activity(seed)
+    repos = sorted({r for day in activity.values() for r in day})
+    values = np.zeros((len(repos), len(activity), 3), dtype=np.int64)
+    active = np.zeros((len(repos), len(activity)), dtype=bool)
+    rows = []
+    for d, day in activity.items():
+        for repo, v in day.items():
+            values[repos.index(repo), d] = v
+            active[repos.index(repo), d] = True
+            rows.append((repos.index(repo), d, v))
+    rows.sort(key=lambda r: (r[0], r[1]))
+    group = np.array([r[0] for r in rows])
+    day = np.array([r[1] for r in rows])
+
+    n, mean, std = sparse_rolling_stats(group, day, np.array([r[2] for r in rows]), LOOKBACK)
+    dense_n, dense_mean, dense_std = rolling_stats(values, active, LOOKBACK)
+    np.testing.assert_array_equal(n, dense_n[group, day])
+    np.testing.assert_allclose(mean, dense_mean[group, day])
+    np.testing.assert_allclose(std, dense_std[group, day])
+
+
+def test_baseline_scores_with_its_weights():
+    baseline = RollingBaseline(LOOKBACK, (0.0, 0.0, 1.0))
+    baseline.advance({"r": (10, 2, 1)}, {})
+    baseline.advance({"r": (20, 4, 3)}, {})
+    row = baseline.score("r", (40, 8, 5))
+    assert row["trend_score"] == pytest.approx(row["z_stars"])
@@ -0,0 +1,81 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from pipeline.bq import BQQueryRunner
+from pipeline.compute import update_rollups
+from pipeline.config import Settings
+from pipeline.setup import SETUP_DIR, run_setup
+
+pytest.importorskip("duckdb")
+
+START = date(2025, 10, 1)
+# Long enough for days to leave the 30-day window
+DAYS = 33
+ROLLUP_SQL = """
+SELECT window_days, repo_name, primary_language, trending_days, events_total, stars_total, ROUND(trend_score, 9) AS t
+FROM `${MART_DATASET}.trending_repos_rollup`
+WHERE event_date = DATE(@date)
+ORDER BY window_days, repo_name
+"""
+
+
+@pytest.fixture
+def bq(monkeypatch, tmp_path):
+    monkeypatch.setenv("PIPELINE_ENGINE", "duckdb")
+    monkeypatch.setenv("LOCAL_DB_PATH", str(tmp_path / "t.duckdb"))
+    monkeypatch.setenv("PAYLOAD_FIELDS", "")
+    monkeypatch.setenv("API_URL", "")
+    settings = Settings.load()
+    runner = BQQueryRunner(settings)
+    run_setup(runner, settings, [SETUP_DIR / "datasets.sql", SETUP_DIR / "mart_tables.sql"])
+    rng = random.Random(5)
+    rows = [
+        {
+            "event_date": (START + timedelta(days=d)).isoformat(),
+            "repo_name": f"r{r}",
+            # r0's language changes; the rollups take the newest day's
+            "primary_language": "C" if r == 0 and d >= 20 else "Go" if r % 2 else "Rust",
+            "license": "mit",
+            "events_today": rng.randint(50, 500),
+            "actors_today": rng.randint(1, 50),
+            "stars_today": rng.randint(0, 20),
+            "growth_events_ratio": None,
+            "z_events": None,
+            "trend_score": rng.uniform(-2, 9),
+        }
+        for d in range(DAYS)
+        for r in range(6)
+        if rng.random() < 0.5
+    ]
+    runner.load_rows("${MART_DATASET}.trending_repos_enriched", rows)
+    return runner
+
+
+def test_rolled_forward_windows_match_a_full_resum(bq, monkeypatch):
+    # Roll every date forward; the periodic recompute takes the full-resum path below
+    monkeypatch.setattr("pipeline.compute.ROLLUP_RECOMPUTE_DAYS", 10 ** 6)
+    last = START + timedelta(days=DAYS - 1)
+    for d in range(DAYS):
+        update_rollups(bq, bq.settings, (START + timedelta(days=d)).isoformat(), max_jobs=1)
+    incremental = bq.query(ROLLUP_SQL, params={"date": last.isoformat()})
+
+    # Without the previous day's rollup the window is summed from scratch
+    bq.run(
+        'DELETE FROM `${MART_DATASET}.trending_repos_rollup` WHERE event_date < DATE("${DATE}")',
+        extra={"DATE": last.isoformat()},
+    )
+    update_rollups(bq, bq.settings, last.isoformat(), max_jobs=1)
+    assert incremental == bq.query(ROLLUP_SQL, params={"date": last.isoformat()})
+    assert {r["window_days"] for r in incremental} == {7, 30}
+    assert max(r["trending_days"] for r in incremental if r["window_days"] == 7) <= 7
+    assert {r["primary_language"] for r in incremental if r["repo_name"] == "r0"} == {"C"}
+
+    languages = bq.query(
+        "SELECT primary_language, trending_repos_count FROM `${MART_DATASET}.trending_languages_rollup` "
+        "WHERE event_date = DATE(@date) AND window_days = 30 ORDER BY primary_language",
+        params={"date": last.isoformat()},
+    )
+    assert [r["primary_language"] for r in languages] == ["C", "Go", "Rust"]
+    assert sum(r["trending_repos_count"] for r in languages) == 6
@@ -0,0 +1,117 @@
+import random
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from pipeline.bq import BQQueryRunner
+from pipeline.config import Settings
+from pipeline.rolling import RollingBaseline
+from pipeline.scoring import Activity, repo_alert_rows, score_activity, score_range, severity, to_rows
+from pipeline.setup import SETUP_DIR, run_setup
+
+START = date(2025, 10, 1)
+LOOKBACK = 3
+WEIGHTS = (0.5, 0.2, 0.3)
+
+
+def _activity_rows(seed: int, repos: int = 5, days: int = 10) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "event_date": START + timedelta(days=d),
+            "repo_id": r + 1,
+            "events_total": rng.randint(1, 100),
+            "actors_unique": rng.randint(1, 20),
+            "stars": rng.choice([0, 0, 3]),
+        }
+        for d in range(days)
+        for r in range(repos)
+        if rng.random() < 0.7
+    ]
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_score_activity_matches_incremental_baseline(seed):
+    rows = _activity_rows(seed)
+    date_from, date_to = START + timedelta(days=4), START + timedelta(days=9)
+    columns = score_activity(Activity.from_rows(rows, START), date_from, date_to, LOOKBACK, WEIGHTS, 20)
+
+    by_day: dict[date, dict[int, tuple]] = {}
+    for r in rows:
+        by_day.setdefault(r["event_date"], {})[r["repo_id"]] = (r["events_total"], r["actors_unique"], r["stars"])
+    expected = {}
+    baseline = RollingBaseline(LOOKBACK, WEIGHTS)
+    for d in range(10):
+        day = START + timedelta(days=d)
+        if d > 0:
+            baseline.advance(by_day.get(day - timedelta(days=1), {}), by_day.get(day - timedelta(days=1 + LOOKBACK), {}))
+        for repo, today in by_day.get(day, {}).items():
+            if date_from <= day <= date_to and today[0] >= 20:
+                expected[(day.isoformat(), repo)] = baseline.score(repo, today)["trend_score"]
+
+    got = dict(zip(zip(columns["event_date"].tolist(), columns["repo_id"].tolist()), columns["trend_score"].tolist()))
+    assert got.keys() == expected.keys()
+    for key, trend in expected.items():
+        assert got[key] == pytest.approx(trend)
+
+
+def test_severity_thresholds_and_nulls():
+    z = np.array([7.0, 4.5, 1.0, np.nan, np.nan])
+    growth = np.array([1.0, 1.0, 6.0, 12.0, np.nan])
+    assert severity(z, growth, 6, 4, 10, 5).tolist() == ["high", "medium", "medium", "high", "low"]
+
+
+def test_repo_alert_rows_filters_orders_and_limits():
+    settings = SimpleNamespace(
+        alert_z_threshold_low=3, alert_growth_threshold_low=3, max_repo_alerts=2,
+        severity_z_high=6, severity_z_medium=4, severity_growth_high=10, severity_growth_medium=5,
+    )
+    enriched = [
+        {"repo_name": name, "primary_language": "Go", "events_today": 60, "actors_today": 5, "stars_today": 1,
+         "z_events": z, "growth_events_ratio": g, "trend_score": t}
+        for name, z, g, t in [("a", 1.0, 1.0, 9.0), ("b", 5.0, None, 3.0), ("c", None, 11.0, 4.0), ("d", 3.5, 2.0, 1.0)]
+    ]
+    rows = repo_alert_rows(enriched, settings, "2025-10-05", "2025-10-06T00:00:00+00:00")
+    assert [(r["entity"], r["severity"]) for r in rows] == [("c", "high"), ("b", "medium")]
+    assert rows[0]["z_events"] is None and rows[0]["alert_type"] == "repo"
+
+
+def test_activity_cache_round_trip(tmp_path):
+    activity = Activity.from_rows(_activity_rows(3), START)
+    activity.save(tmp_path / "activity.npz")
+    loaded = Activity.load(tmp_path / "activity.npz")
+    assert loaded.start == START
+    assert loaded.repos.tolist() == activity.repos.tolist() and loaded.names is None
+    np.testing.assert_array_equal(loaded.values, activity.values)
+    rows = to_rows({"x": np.array([1.0, np.nan]), "y": np.array([1, 2])})
+    assert rows == [{"x": 1.0, "y": 1}, {"x": None, "y": 2}]
+
+
+def test_score_range_keeps_the_published_rows_when_the_load_fails(monkeypatch, tmp_path):
+    pytest.importorskip("duckdb")
+    monkeypatch.setenv("PIPELINE_ENGINE", "duckdb")
+    monkeypatch.setenv("LOCAL_DB_PATH", str(tmp_path / "t.duckdb"))
+    monkeypatch.setenv("PAYLOAD_FIELDS", "")
+    monkeypatch.setenv("LOOKBACK_DAYS", str(LOOKBACK))
+    monkeypatch.setenv("MIN_EVENTS_THRESHOLD", "20")
+    settings = Settings.load()
+    bq = BQQueryRunner(settings)
+    run_setup(bq, settings, [SETUP_DIR / n for n in ("datasets.sql", "stg_tables.sql", "mart_tables.sql")])
+    bq.load_rows("${STG_DATASET}.daily_repo_activity", _activity_rows(4))
+    date_from, date_to = START + timedelta(days=4), START + timedelta(days=9)
+    count_sql = "SELECT COUNT(*) AS n FROM `${MART_DATASET}.trending_repos_daily`"
+    staged_sql = "SELECT COUNT(*) AS n FROM `${STG_DATASET}.trending_repos_staging`"
+
+    scored = score_range(bq, settings, date_from, date_to)
+    assert scored > 0 and bq.query(count_sql)[0]["n"] == scored
+    assert bq.query(staged_sql)[0]["n"] == 0
+
+    def failing_load(*args, **kwargs):
+        raise RuntimeError("load failed")
+
+    monkeypatch.setattr(bq, "load_rows", failing_load)
+    with pytest.raises(RuntimeError):
+        score_range(bq, settings, date_from, date_to)
+    assert bq.query(count_sql)[0]["n"] == scored
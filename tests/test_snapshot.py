@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from pipeline.snapshot import SnapshotStore, write_snapshot
+
+REPOS = [
+    {"event_date": "2025-10-03", "repo_name": f"org/r{i}", "primary_language": lang,
+     "license": "MIT", "events_today": 10, "actors_today": 5, "stars_today": 1,
+     "growth_events_ratio": None, "z_events": None, "trend_score": 10.0 - i}
+    for i, lang in enumerate(["Go", "Rust", "Go", "Python", "Go"])
+]
+ALERTS = [
+    {"event_date": "2025-10-03", "alert_type": t, "entity": e, "severity": s, "trend_score": 1.0,
+     "z_events": None, "growth_events_ratio": None, "events_today": 1, "actors_today": 1,
+     "stars_today": 0, "primary_language": None, "created_at": "2025-10-04 00:00:00"}
+    for t, e, s in [("repo", "org/r0", "high"), ("repo", "org/r1", "low"), ("language", "Go", "low")]
+]
+
+
+class FakeRunner:
+    def __init__(self, repos=REPOS, alerts=ALERTS, summary=()):
+        self.rows = {"trending_repos_enriched": repos, "alerts_daily": alerts, "daily_summary": list(summary)}
+
+    def query(self, sql, params=None):
+        return next((rows for table, rows in self.rows.items() if table in sql), [])
+
+
+def test_snapshot_roundtrip(tmp_path):
+    write_snapshot(FakeRunner(), "2025-10-03", tmp_path)
+    snap = SnapshotStore(tmp_path).get("2025-10-03")
+
+    assert snap.trending_repos(2) == REPOS[:2]
+    assert [r["repo_name"] for r in snap.trending_repos(2, "Go")] == ["org/r0", "org/r2"]
+    assert snap.trending_repos(5, "Haskell") == []
+    assert [a["entity"] for a in snap.alerts("repo", None, 10)] == ["org/r0", "org/r1"]
+    assert [a["entity"] for a in snap.alerts(None, "low", 1)] == ["org/r1"]
+    assert snap.trending_languages(10) == [] and snap.summary() == []
+
+
+def test_store_reloads_rewritten_date_and_misses_unknown(tmp_path):
+    store = SnapshotStore(tmp_path)
+    assert store.get("2025-10-03") is None
+    assert store.get("../2025-10-03") is None
+
+    write_snapshot(FakeRunner(), "2025-10-03", tmp_path)
+    assert len(store.get("2025-10-03").trending_repos(10)) == 5
+    write_snapshot(FakeRunner(repos=REPOS[:1]), "2025-10-03", tmp_path)
+    assert len(store.get("2025-10-03").trending_repos(10)) == 1
+    # The date is a symlink to the latest write; the replaced version is removed
+    assert (tmp_path / "2025-10-03").is_symlink()
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".")] == [os.readlink(tmp_path / "2025-10-03")]
+
+
+def test_write_replaces_a_plain_snapshot_directory(tmp_path):
+    (tmp_path / "2025-10-03").mkdir()
+    (tmp_path / "2025-10-03" / "repos.arrow").write_bytes(b"")
+    write_snapshot(FakeRunner(), "2025-10-03", tmp_path)
+    assert len(SnapshotStore(tmp_path).get("2025-10-03").trending_repos(10)) == 5
+
+
+def test_store_keeps_the_most_recently_used_dates(tmp_path):
+    days = ["2025-10-01", "2025-10-02", "2025-10-03"]
+    for day in days:
+        write_snapshot(FakeRunner(), day, tmp_path)
+    store = SnapshotStore(tmp_path, max_dates=2)
+    first, second = store.get(days[0]), store.get(days[1])
+    assert store.get(days[0]) is first      # 2025-10-02 is now least recently used
+    store.get(days[2])
+    assert store.snapshot()["loaded"] == 2
+    assert store.get(days[0]) is first
+    # Evicted, so it is mapped again
+    assert store.get(days[1]) is not second
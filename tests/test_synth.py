@@ -0,0 +1,40 @@
+from collections import Counter
+from datetime import timedelta
+
+from pipeline.ingest import aggregate_files, hour_files
+from pipeline.synth import SynthConfig, generate, generate_hour, planted_repos
+
+
+def _config(**kwargs):
+    return SynthConfig(**{"days": 4, "events_per_day": 2000, "hours": 2, "trending": 2, **kwargs})
+
+
+def test_generation_is_seeded():
+    first = list(generate_hour(_config(), 1, 0))
+    assert first == list(generate_hour(_config(), 1, 0))
+    assert first != list(generate_hour(_config(seed=7), 1, 0))
+    assert [e["created_at"] for e in first] == sorted(e["created_at"] for e in first)
+
+
+def test_repo_popularity_is_zipf_skewed():
+    events = [e for h in range(2) for e in generate_hour(_config(), 0, h)]
+    counts = Counter(e["repo"]["name"] for e in events).most_common()
+    # The most popular repo alone gets more than the 50 repos ranked 101-150 together
+    assert counts[0][1] > sum(n for _, n in counts[100:150])
+
+
+def test_planted_repos_burst_on_their_date(tmp_path):
+    config = _config()
+    total = generate(config, tmp_path, workers=1)
+    assert total >= config.days * config.events_per_day
+    assert (tmp_path / "github_repos" / "languages.json.gz").exists()
+
+    for planted in planted_repos(config):
+        day = planted.burst_date.isoformat()
+        counters = aggregate_files(hour_files(tmp_path / "day", day), day, workers=1)
+        burst = counters[planted.repo_name]
+        assert burst.events_total >= config.burst_min_events * 0.8
+        assert burst.actors.count() > 0.9 * burst.events_total
+        before = (planted.burst_date - timedelta(days=2)).isoformat()
+        quiet = aggregate_files(hour_files(tmp_path / "day", before), before, workers=1)
+        assert quiet.get(planted.repo_name) is None or quiet[planted.repo_name].events_total < 30
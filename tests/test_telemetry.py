@@ -0,0 +1,61 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from pipeline.bq import QueryResult
+from pipeline.telemetry import diff_runs, record_run
+
+
+def _result(step, wall_ms, bytes_processed):
+    return QueryResult(job_id=f"job_{step}", bytes_processed=bytes_processed, bytes_billed=0,
+                       step=step, wall_ms=wall_ms)
+
+
+class FakeRunner:
+    def __init__(self):
+        self.results = []
+        self.loaded = []
+
+    def load_rows(self, table, rows, partition_date=None):
+        self.loaded.append((table, rows))
+
+
+def _settings(tmp_path, record_runs=False):
+    return SimpleNamespace(engine="duckdb", run_manifest_dir=str(tmp_path), record_runs=record_runs)
+
+
+def test_record_run_writes_manifest_and_diffs_previous_run(tmp_path):
+    bq = FakeRunner()
+    with record_run(bq, _settings(tmp_path), "transform", {"date": "2025-10-01"}):
+        bq.results += [_result("a.sql", 100, 1000), _result("a.sql", 100, 1000), _result("b.sql", 50, 10)]
+    with record_run(bq, _settings(tmp_path, record_runs=True), "transform", {"date": "2025-10-01"}):
+        bq.results += [_result("a.sql", 2500, 3000), _result("c.sql", 5, 0)]
+
+    first, second = [json.loads(p.read_text()) for p in sorted(tmp_path.glob("*-transform-*.json"))]
+    assert first["totals"]["jobs"] == 3 and first["totals"]["bytes_processed"] == 2010
+    assert "diff" not in first
+    assert second["previous_run_id"] == first["run_id"]
+    diff = {row["step"]: row for row in second["diff"]}
+    assert diff["a.sql"]["bytes_processed_before"] == 2000 and diff["a.sql"]["regression"]
+    assert diff["b.sql"]["status"] == "removed" and diff["c.sql"]["status"] == "new"
+    assert bq.loaded[0][0] == "${MART_DATASET}.pipeline_runs"
+
+
+def test_failed_runs_are_recorded_but_not_used_as_baseline(tmp_path):
+    bq = FakeRunner()
+    with pytest.raises(RuntimeError):
+        with record_run(bq, _settings(tmp_path), "compute", {}):
+            raise RuntimeError("boom")
+    with record_run(bq, _settings(tmp_path), "compute", {}):
+        pass
+    manifests = [json.loads(p.read_text()) for p in sorted(tmp_path.glob("*.json"))]
+    assert [m["status"] for m in manifests] == ["failed", "ok"]
+    assert "previous_run_id" not in manifests[1]
+
+
+def test_small_wall_time_jitter_is_not_a_regression():
+    before = {"steps": [{"step": "a", **{f: 0 for f in ("slot_ms", "bytes_billed", "rows_affected")},
+                         "wall_ms": 10, "bytes_processed": 100}]}
+    after = {"steps": [{**before["steps"][0], "wall_ms": 40}]}
+    assert diff_runs(before, after)[0]["regression"] is False